@@ -0,0 +1,66 @@
+"""Requests/sec under concurrent load against a running AnalogAPI server.
+
+Start the server (e.g. ``uvicorn analogapi.main:app --workers 1``) on the
+commit you want to measure, then run::
+
+    python benchmarks/bench_concurrency.py --url http://localhost:8000 --concurrency 64
+
+Run it once on the sync routers and once on the async ones to compare.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+DEFAULT_PATHS = ["/cameras/?limit=50", "/films/?limit=50", "/tags/", "/cameras/{camera_id}"]
+
+async def worker(client, paths, deadline, latencies, errors):
+    i = 0
+    while time.perf_counter() < deadline:
+        path = paths[i % len(paths)]
+        i += 1
+        start = time.perf_counter()
+        try:
+            response = await client.get(path)
+            if response.status_code >= 500:
+                errors.append(response.status_code)
+        except httpx.HTTPError as e:
+            errors.append(type(e).__name__)
+        latencies.append(time.perf_counter() - start)
+
+async def run(url, concurrency, duration, paths):
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=30) as client:
+        cameras = (await client.get("/cameras/?limit=1")).json()
+        camera_id = cameras[0]["id"] if cameras else 1
+        paths = [path.format(camera_id=camera_id) for path in paths]
+
+        # Warm up connection pools on both sides
+        await asyncio.gather(*(client.get(paths[0]) for _ in range(concurrency)))
+
+        latencies, errors = [], []
+        deadline = time.perf_counter() + duration
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(client, paths, deadline, latencies, errors) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    print(f"concurrency={concurrency} duration={elapsed:.1f}s requests={len(latencies)} errors={len(errors)}")
+    print(f"requests/sec: {len(latencies) / elapsed:.1f}")
+    print(f"latency p50={statistics.median(latencies) * 1000:.1f}ms "
+          f"p95={latencies[int(len(latencies) * 0.95)] * 1000:.1f}ms "
+          f"p99={latencies[int(len(latencies) * 0.99)] * 1000:.1f}ms")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--path", action="append", dest="paths", help="Path to request (repeatable)")
+    args = parser.parse_args()
+    asyncio.run(run(args.url, args.concurrency, args.duration, args.paths or DEFAULT_PATHS))
+
+if __name__ == "__main__":
+    main()
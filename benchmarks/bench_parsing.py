@@ -0,0 +1,92 @@
+"""Pages/sec of the scraper parsing stage over a corpus of saved pages.
+
+Save a corpus once (camera-wiki category and camera pages plus the Wikipedia
+film list), then parse it as often as needed without touching the network::
+
+    python benchmarks/bench_parsing.py --corpus bench_corpus --download 200
+    python benchmarks/bench_parsing.py --corpus bench_corpus --workers 4
+
+Every page is parsed inline on one thread and then through the process pool.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from src.analogapi.scrapers.crawler import AsyncCrawler  # noqa: E402
+from src.analogapi.scrapers.parsing import (  # noqa: E402
+    CAMERA_WIKI_URL,
+    WIKIPEDIA_URL,
+    parse_camera_page,
+    parse_category_page,
+    parse_film_page,
+)
+from src.analogapi.scrapers.scrape_cameras import FILM_FORMAT_CATEGORIES  # noqa: E402
+
+async def download(corpus, pages):
+    corpus.mkdir(parents=True, exist_ok=True)
+    async with AsyncCrawler() as crawler:
+        film_list = await crawler.fetch(f"{WIKIPEDIA_URL}/wiki/List_of_photographic_films")
+        (corpus / "film_list.html").write_text(film_list)
+    # camera-wiki.org's certificate chain doesn't verify
+    async with AsyncCrawler(verify=False) as crawler:
+        camera_urls = []
+        for category in FILM_FORMAT_CATEGORIES:
+            html = await crawler.fetch(f"{CAMERA_WIKI_URL}/wiki/{category}")
+            (corpus / f"category_{category.split(':')[1]}.html").write_text(html)
+            camera_urls.extend(url for _, url in parse_category_page(html)[0])
+        camera_urls = camera_urls[:pages]
+
+        async def save(i, url):
+            try:
+                (corpus / f"camera_{i:05d}.html").write_text(await crawler.fetch(url))
+            except Exception as e:
+                print(f"Error fetching {url}: {e}")
+
+        await asyncio.gather(*(save(i, url) for i, url in enumerate(camera_urls)))
+
+def parse_file(path):
+    html = Path(path).read_text()
+    name = Path(path).name
+    if name.startswith("film_list"):
+        return len(parse_film_page(html, WIKIPEDIA_URL, 10 ** 6))
+    if name.startswith("category_"):
+        return len(parse_category_page(html)[0])
+    return int(parse_camera_page(html, "Canon Camera", f"{CAMERA_WIKI_URL}/wiki/Camera", "Category:35mm_film") is not None)
+
+def report(label, pages, elapsed):
+    print(f"{label:<12} pages={pages} elapsed={elapsed:.2f}s pages/sec={pages / elapsed:.1f}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--corpus", default="bench_corpus")
+    parser.add_argument("--download", type=int, default=0, help="fetch this many camera pages into the corpus first")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--repeat", type=int, default=3, help="parse the corpus this many times")
+    args = parser.parse_args()
+
+    corpus = Path(args.corpus)
+    if args.download:
+        asyncio.run(download(corpus, args.download))
+    files = sorted(str(path) for path in corpus.glob("*.html")) * args.repeat
+    if not files:
+        parser.error(f"no .html pages in {corpus}, run with --download first")
+
+    start = time.perf_counter()
+    for path in files:
+        parse_file(path)
+    report("inline", len(files), time.perf_counter() - start)
+
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        list(pool.map(parse_file, files[:args.workers]))  # warm up the workers
+        start = time.perf_counter()
+        list(pool.map(parse_file, files, chunksize=8))
+        report(f"pool({args.workers})", len(files), time.perf_counter() - start)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Similarity index: full build, incremental refresh and per-lookup latency.
+
+Runs on synthetic cameras (no database needed)::
+
+    python benchmarks/bench_similarity.py --items 100000 --changes 100
+
+Items get a format, type, lens mount, a few tags and a few co-favoriting
+users drawn from skewed distributions, roughly like the scraped catalog.
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import numpy as np  # noqa: E402
+from src.analogapi.similarity import SimilarityIndex, camera_features, add_feature, CAMERA_FEATURE_WEIGHTS  # noqa: E402
+from src.analogapi.models.camera import Camera, favorite_cameras  # noqa: E402
+from src.analogapi.models.tag import camera_tags  # noqa: E402
+
+FORMATS = ["35mm", "120", "Large Format", "110", "126", "127", "APS", "Instant", "Disc Film", "Minox"]
+TYPES = ["SLR", "Rangefinder", "Point and Shoot", "TLR", "Folding", "Box", "View Camera", "Instant"]
+
+def make_features(rng, item_ids, tags=500, mounts=300, users=20000):
+    weights = CAMERA_FEATURE_WEIGHTS
+    features = {}
+    for item_id in item_ids:
+        row = SimpleNamespace(
+            format_id=None,
+            format=FORMATS[min(int(rng.exponential(1.5)), len(FORMATS) - 1)],
+            type=TYPES[min(int(rng.exponential(2)), len(TYPES) - 1)],
+            lens_mount=f"Mount {int(rng.zipf(1.5)) % mounts}",
+        )
+        item_features = camera_features(row, weights)
+        for tag_id in rng.integers(0, tags, rng.integers(0, 4)):
+            add_feature(item_features, weights, "tag", tag_id)
+        for user_id in rng.integers(0, users, rng.poisson(2)):
+            add_feature(item_features, weights, "favorited_by", user_id)
+        features[item_id] = item_features
+    return features
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, default=100000)
+    parser.add_argument("--changes", type=int, default=100)
+    parser.add_argument("--lookups", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    index = SimilarityIndex(Camera, [], camera_features, CAMERA_FEATURE_WEIGHTS, camera_tags, favorite_cameras, "camera_id")
+    features = make_features(rng, range(1, args.items + 1))
+
+    start = time.perf_counter()
+    index.build(features)
+    print(f"full build          items={args.items} elapsed={time.perf_counter() - start:.2f}s")
+
+    changed = rng.choice(np.arange(1, args.items + 1), args.changes, replace=False).tolist()
+    start = time.perf_counter()
+    index.update(make_features(rng, changed), set())
+    print(f"incremental refresh changed={args.changes} elapsed={time.perf_counter() - start:.2f}s")
+
+    lookups = rng.integers(1, args.items + 1, args.lookups).tolist()
+    start = time.perf_counter()
+    for item_id in lookups:
+        index.lookup(item_id, 10)
+    elapsed = time.perf_counter() - start
+    print(f"lookup              count={args.lookups} avg={elapsed / args.lookups * 1e6:.1f}us")
+
+if __name__ == "__main__":
+    main()
@@ -1,33 +1,31 @@
+import os
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
-from .database import get_session  
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
+from .cache import TTLCache
+from .database import get_db
 from .models.user import User
+from .schemas.user import CurrentUser
 
 SECRET_KEY = "your-secret-key"  
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="users/login")
 
-def get_db():
-    db = get_session()()
-    try:
-        yield db
-    finally:
-        db.close()
-
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+# CURRENT USER CACHE (keyed by token subject)
+user_cache = TTLCache(
+    maxsize=int(os.getenv("AUTH_CACHE_SIZE", "10000")),
+    ttl=float(os.getenv("AUTH_CACHE_TTL", "60")),
+)
 
-def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+def invalidate_user(username: str):
+    user_cache.delete(username)
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     to_encode = data.copy()
@@ -39,7 +37,7 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> User:
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)) -> CurrentUser:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -52,7 +50,13 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
             raise credentials_exception
     except JWTError:
         raise credentials_exception
-    user = db.query(User).filter(User.username == username).first()
+    current_user = user_cache.get(username)
+    if current_user is not None:
+        return current_user
+
+    user = await db.scalar(select(User).options(joinedload(User.preferences)).where(User.username == username))
     if user is None:
         raise credentials_exception
-    return user
\ No newline at end of file
+    current_user = CurrentUser.model_validate(user)
+    user_cache.set(username, current_user)
+    return current_user
@@ -0,0 +1,200 @@
+import os
+from fastapi import HTTPException
+from sqlalchemy import Integer, select, delete, update, func, and_, any_, bindparam
+from sqlalchemy.dialects.postgresql import ARRAY, insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from .loaders import TAG_LINKS
+from .models.camera import Camera, favorite_cameras
+from .models.film import Film, favorite_films
+from .models.tag import Tag, camera_tags, film_tags
+
+# BATCH SETTINGS (ENVIRONMENT)
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "50000"))
+
+# BATCH WRITES
+# POST /cameras/batch, /films/batch and /tags/batch take {create: [...], update: [...], delete: [ids]}.
+# Every item is checked up front, with one query per check (tag ids, item ids, natural keys);
+# items that fail get the status and detail the single-item endpoint would answer with, the rest
+# are written with one statement per table and committed once. Rows are sent as one array
+# parameter per column (unnest), so a big batch stays clear of the driver's bind-parameter limit
+# and the catalog triggers fire once per statement, not once per row.
+
+# model -> natural key, rows that go with a deleted item, name used in details
+NATURAL_KEYS = {Camera: ("brand", "model"), Film: ("brand", "name", "format"), Tag: ("name",)}
+DEPENDENTS = {
+    Camera: [(camera_tags, "camera_id"), (favorite_cameras, "camera_id")],
+    Film: [(film_tags, "film_id"), (favorite_films, "film_id")],
+    Tag: [(camera_tags, "tag_id"), (film_tags, "tag_id")],
+}
+NAMES = {Camera: "Camera", Film: "Film", Tag: "Tag"}
+CONFLICTS = {
+    Camera: "Camera with this brand and model already exists",
+    Film: "Film stock with this brand, name and format already exists",
+    Tag: "Tag already exists",
+}
+# PUT /tags/{id} words it differently
+UPDATE_CONFLICTS = {Tag: "Tag name already exists"}
+ACTIONS = ["create", "update", "delete"]
+
+# Schema item -> table row (films call the color column "type", and iso is a text column)
+def camera_row(item):
+    return {column: getattr(item, column) for column in ("brand", "model", "format", "type", "years", "lens_mount")}
+
+def film_row(item):
+    return {"brand": item.brand, "name": item.name, "format": item.format, "color": item.type, "iso": str(item.iso), "grain": item.grain}
+
+def tag_row(item):
+    return {"name": item.name}
+
+ROWS = {Camera: camera_row, Film: film_row, Tag: tag_row}
+
+# ARRAY PARAMETERS
+def id_array(ids):
+    return bindparam(None, list(ids), type_=ARRAY(Integer))
+
+# unnest(array, array, ...) AS anon(column, ...): the rows as a table, one array per column
+def unnest(table, rows, columns):
+    arrays = (bindparam(None, [row[column] for row in rows], type_=ARRAY(table.c[column].type)) for column in columns)
+    return func.unnest(*arrays).table_valued(*columns).render_derived()
+
+async def existing_ids(db: AsyncSession, table, ids):
+    if not ids:
+        return set()
+    return set(await db.scalars(select(table.c.id).where(table.c.id == any_(id_array(set(ids))))))
+
+# natural key -> id of the row holding it
+async def key_owners(db: AsyncSession, table, key, rows):
+    if not rows:
+        return {}
+    keys = unnest(table, rows, key)
+    query = select(table.c.id, *(table.c[column] for column in key)).join(keys, and_(*(table.c[column] == keys.c[column] for column in key)))
+    return {tuple(row[1:]): row.id for row in await db.execute(query)}
+
+def result(action, index, item_id=None, status=200, detail=None):
+    return {"action": action, "index": index, "id": item_id, "status": status, "detail": detail}
+
+# PLAN
+# Accepted items: creates/updates as (result, row, tag_ids), deletes as ids. Checks are
+# conservative: a natural key held by a row that isn't deleted in the same batch is a conflict,
+# even when an update in the batch renames that row.
+class BatchPlan:
+    def __init__(self, model):
+        self.model = model
+        self.results = []
+        self.creates = []
+        self.updates = []
+        self.deletes = []
+
+    def ids(self, action):
+        if action == "delete":
+            return list(self.deletes)
+        return [entry[0]["id"] for entry in (self.creates if action == "create" else self.updates)]
+
+async def plan_batch(db: AsyncSession, model, batch):
+    total = len(batch.create) + len(batch.update) + len(batch.delete)
+    if total > BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"Batch has {total} items, the limit is {BATCH_MAX_ITEMS}")
+
+    table = model.__table__
+    key = NATURAL_KEYS[model]
+    name = NAMES[model]
+    creates = [ROWS[model](item) for item in batch.create]
+    updates = [{"id": item.id, **ROWS[model](item)} for item in batch.update]
+    tag_ids = {tag_id for item in [*batch.create, *batch.update] for tag_id in getattr(item, "tag_ids", None) or []}
+    known_tags = await existing_ids(db, Tag.__table__, tag_ids)
+    known = await existing_ids(db, table, [*batch.delete, *(row["id"] for row in updates)])
+    owners = await key_owners(db, table, key, creates + updates)
+
+    plan = BatchPlan(model)
+    for index, item_id in enumerate(batch.delete):
+        if item_id not in known:
+            plan.results.append(result("delete", index, item_id, 404, f"{name} not found"))
+            continue
+        if item_id not in plan.deletes:
+            plan.deletes.append(item_id)
+        plan.results.append(result("delete", index, item_id))
+    deleted = set(plan.deletes)
+
+    claimed, updated = set(), set()
+    def rejection(item, row, item_id=None):
+        if item_id is not None:
+            if item_id not in known:
+                return 404, f"{name} not found"
+            if item_id in deleted:
+                return 400, f"{name} is also deleted in this batch"
+            if item_id in updated:
+                return 400, f"{name} is updated more than once in this batch"
+        if not known_tags.issuperset(getattr(item, "tag_ids", None) or []):
+            return 404, "One or more tags not found"
+        row_key = tuple(row[column] for column in key)
+        owner = owners.get(row_key)
+        if row_key in claimed or (owner is not None and owner != item_id and owner not in deleted):
+            return 400, UPDATE_CONFLICTS.get(model, CONFLICTS[model]) if item_id is not None else CONFLICTS[model]
+        claimed.add(row_key)
+        return None
+
+    for action, items, rows, accepted in [("update", batch.update, updates, plan.updates), ("create", batch.create, creates, plan.creates)]:
+        for index, (item, row) in enumerate(zip(items, rows)):
+            item_id = row.get("id")
+            problem = rejection(item, row, item_id)
+            if problem is not None:
+                plan.results.append(result(action, index, item_id, *problem))
+                continue
+            if item_id is not None:
+                updated.add(item_id)
+            entry = result(action, index, item_id)
+            plan.results.append(entry)
+            accepted.append((entry, row, set(getattr(item, "tag_ids", None) or [])))
+
+    plan.results.sort(key=lambda entry: (ACTIONS.index(entry["action"]), entry["index"]))
+    return plan
+
+# WRITE
+# Deletes, then updates, then inserts (so a batch can free a natural key and reuse it), then the
+# tag links of created items and of updated items that name tags (like PUT, an update without
+# tag_ids keeps the item's tags). Fills in created ids and returns every written id.
+async def write_batch(db: AsyncSession, plan: BatchPlan):
+    model = plan.model
+    table = model.__table__
+    key = NATURAL_KEYS[model]
+    try:
+        if plan.deletes:
+            for dependent, column in DEPENDENTS[model]:
+                await db.execute(delete(dependent).where(dependent.c[column] == any_(id_array(plan.deletes))))
+            await db.execute(delete(table).where(table.c.id == any_(id_array(plan.deletes))))
+
+        if plan.updates:
+            rows = [row for _, row, _ in plan.updates]
+            columns = [column for column in rows[0] if column != "id"]
+            values = unnest(table, rows, ["id", *columns])
+            await db.execute(update(table).where(table.c.id == values.c.id).values({column: values.c[column] for column in columns}))
+
+        if plan.creates:
+            rows = [row for _, row, _ in plan.creates]
+            columns = list(rows[0])
+            values = unnest(table, rows, columns)
+            stmt = insert(table).from_select(columns, select(values)).returning(table.c.id, *(table.c[column] for column in key))
+            ids = {tuple(row[1:]): row.id for row in await db.execute(stmt)}
+            for entry, row, _ in plan.creates:
+                entry["id"] = ids[tuple(row[column] for column in key)]
+
+        if model in TAG_LINKS:
+            link_table, link_column = TAG_LINKS[model]
+            retagged = [entry["id"] for entry, _, tag_ids in plan.updates if tag_ids]
+            if retagged:
+                await db.execute(delete(link_table).where(link_table.c[link_column] == any_(id_array(retagged))))
+            links = [
+                {link_column: entry["id"], "tag_id": tag_id}
+                for entry, _, tag_ids in plan.creates + plan.updates for tag_id in tag_ids
+            ]
+            if links:
+                values = unnest(link_table, links, [link_column, "tag_id"])
+                await db.execute(insert(link_table).from_select([link_column, "tag_id"], select(values)))
+
+        await db.commit()
+    except IntegrityError:
+        # A concurrent write got in between the checks and this transaction
+        await db.rollback()
+        raise HTTPException(status_code=409, detail="The batch conflicts with a concurrent change, nothing was written")
+    return [*plan.ids("create"), *plan.ids("update"), *plan.deletes]
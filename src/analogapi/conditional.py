@@ -0,0 +1,50 @@
+from email.utils import format_datetime, parsedate_to_datetime
+from fastapi import Depends, HTTPException, Request, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from .database import get_db
+from .models.catalog import catalog_version
+
+# CONDITIONAL GETS FOR CATALOG RESPONSES
+# Catalog responses depend only on the catalog and the URL, so the catalog version is a strong
+# ETag for all of them. Pollers send it back in If-None-Match and get a 304 after one primary-key
+# read, before the endpoint runs any other query. Cache-Control: no-cache lets clients keep the
+# body but makes them revalidate every time.
+def etag_for(version):
+    return f'"catalog-{version}"'
+
+# If-None-Match uses the weak comparison: W/ prefixes are ignored, * matches anything
+def etag_matches(if_none_match, etag):
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or etag in (tag[2:] if tag.startswith("W/") else tag for tag in tags)
+
+def modified_since(if_modified_since, last_modified):
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return True
+    if since.tzinfo is None:
+        return True
+    return parsedate_to_datetime(last_modified) > since
+
+async def catalog_validators(db: AsyncSession):
+    version, modified_at = (await db.execute(select(catalog_version.c.version, catalog_version.c.modified_at))).one()
+    return {
+        "ETag": etag_for(version),
+        "Last-Modified": format_datetime(modified_at, usegmt=True),
+        "Cache-Control": "no-cache",
+    }
+
+# If-Modified-Since only counts without If-None-Match (RFC 9110, 13.1.3)
+def not_modified(request: Request, headers):
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return etag_matches(if_none_match, headers["ETag"])
+    if_modified_since = request.headers.get("if-modified-since")
+    return if_modified_since is not None and not modified_since(if_modified_since, headers["Last-Modified"])
+
+async def catalog_etag(request: Request, response: Response, db: AsyncSession = Depends(get_db)):
+    headers = await catalog_validators(db)
+    if not_modified(request, headers):
+        raise HTTPException(status_code=304, headers=headers)
+    response.headers.update(headers)
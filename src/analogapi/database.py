@@ -1,17 +1,25 @@
 import os
-from sqlalchemy import create_engine
+from pathlib import Path
+from sqlalchemy import create_engine, inspect
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
 from sqlalchemy.sql import text
 import logging
+import threading
 import time
 from dotenv import load_dotenv
-from sqlalchemy.exc import OperationalError
+from sqlalchemy.exc import OperationalError, TimeoutError as PoolTimeoutError
 
 from .base import Base
 
 from .models.tag import Tag
 from .models.camera import Camera
 from .models.film import Film
+from .models.catalog import catalog_version
+from .models.format import Format
+from .models.recommendation import UserRecommendation
 from .models.user import User
 from .models.user_preferences import UserPreferences
 
@@ -26,10 +34,116 @@ TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL", "postgresql://user:password@l
 print(f"DEBUG: DATABASE_URL={DATABASE_URL}")
 print(f"DEBUG: TEST_DATABASE_URL={TEST_DATABASE_URL}")
 
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+def to_async_url(db_url):
+    url = make_url(db_url)
+    return url.set(drivername=ASYNC_DRIVERS.get(url.drivername, url.drivername))
+
+# POOL SETTINGS (ENVIRONMENT)
+def get_pool_settings():
+    return {
+        "pool_size": int(os.getenv("DB_POOL_SIZE", "5")),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "10")),
+        "pool_timeout": float(os.getenv("DB_POOL_TIMEOUT", "30")),
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "1800")),
+        "pool_pre_ping": os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes"),
+        "statement_timeout_ms": int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "0")),
+    }
+
+def get_engine_kwargs(db_url, poolclass):
+    url = make_url(db_url)
+    if url.get_backend_name() != "postgresql":
+        return {}
+    settings = get_pool_settings()
+    kwargs = {
+        "poolclass": poolclass,
+        "pool_size": settings["pool_size"],
+        "max_overflow": settings["max_overflow"],
+        "pool_timeout": settings["pool_timeout"],
+        "pool_recycle": settings["pool_recycle"],
+        "pool_pre_ping": settings["pool_pre_ping"],
+    }
+    timeout = settings["statement_timeout_ms"]
+    if timeout > 0:
+        if url.get_driver_name() == "asyncpg":
+            kwargs["connect_args"] = {"server_settings": {"statement_timeout": str(timeout)}}
+        else:
+            kwargs["connect_args"] = {"options": f"-c statement_timeout={timeout}"}
+    return kwargs
+
+# POOL METRICS
+class PoolMetrics:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def record_wait(self, seconds):
+        with self.lock:
+            self.checkouts += 1
+            self.wait_total += seconds
+            self.wait_max = max(self.wait_max, seconds)
+
+    def record_timeout(self):
+        with self.lock:
+            self.timeouts += 1
+
+    def snapshot(self, pool=None):
+        with self.lock:
+            data = {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "wait_ms_total": round(self.wait_total * 1000, 3),
+                "wait_ms_avg": round(self.wait_total * 1000 / self.checkouts, 3) if self.checkouts else 0.0,
+                "wait_ms_max": round(self.wait_max * 1000, 3),
+            }
+        if isinstance(pool, QueuePool):
+            data.update({
+                "size": pool.size(),
+                "checked_out": pool.checkedout(),
+                "checked_in": pool.checkedin(),
+                # overflow() starts at -pool_size and only goes positive once the pool is exhausted
+                "overflow": max(pool.overflow(), 0),
+                "max_overflow": pool._max_overflow,
+            })
+        return data
+
+class TimedPoolMixin:
+    metrics = None
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            self.metrics.record_timeout()
+            logger.warning("Connection pool exhausted: %s", self.status())
+            raise
+        finally:
+            self.metrics.record_wait(time.perf_counter() - start)
+
+class TimedQueuePool(TimedPoolMixin, QueuePool):
+    metrics = PoolMetrics()
+
+class TimedAsyncQueuePool(TimedPoolMixin, AsyncAdaptedQueuePool):
+    metrics = PoolMetrics()
+
 class Database:
     def __init__(self):
         self.engine = None
         self.SessionLocal = None
+        self.async_engine = None
+        self.AsyncSessionLocal = None
 
     def get_engine(self, db_url=None, retries=3, delay=2):
         if self.engine is None:
@@ -40,7 +154,7 @@ class Database:
             print(f"DEBUG: Initializing engine with db_url={db_url}")
             for attempt in range(retries):
                 try:
-                    self.engine = create_engine(db_url)
+                    self.engine = create_engine(db_url, **get_engine_kwargs(db_url, TimedQueuePool))
                     with self.engine.connect() as connection:
                         connection.execute(text("SELECT 1"))
                     print("DEBUG: Engine initialized successfully")
@@ -63,6 +177,28 @@ class Database:
             self.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
         return self.SessionLocal
 
+    def get_async_engine(self, db_url=None):
+        if self.async_engine is None:
+            if db_url is None:
+                # Follow the sync engine so both paths always talk to the same database
+                db_url = self.get_engine().url
+            async_url = to_async_url(db_url)
+            self.async_engine = create_async_engine(async_url, **get_engine_kwargs(async_url, TimedAsyncQueuePool))
+            print(f"DEBUG: Async engine initialized with driver {self.async_engine.url.drivername}")
+        return self.async_engine
+
+    def get_async_session(self, db_url=None):
+        if self.AsyncSessionLocal is None:
+            engine = self.get_async_engine(db_url)
+            self.AsyncSessionLocal = async_sessionmaker(bind=engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+        return self.AsyncSessionLocal
+
+    def get_pool_metrics(self):
+        return {
+            "async": TimedAsyncQueuePool.metrics.snapshot(self.async_engine.pool if self.async_engine else None),
+            "sync": TimedQueuePool.metrics.snapshot(self.engine.pool if self.engine else None),
+        }
+
     def initialize(self, db_url=None):
         print("DEBUG: Calling initialize_engine_and_session")
         self.get_engine(db_url)
@@ -71,17 +207,47 @@ class Database:
 
 db = Database()
 
-SessionLocal = db.get_session()
-
 def get_engine(db_url=None):
     return db.get_engine(db_url)
 
 def get_session(db_url=None):
     return db.get_session(db_url)
 
+def get_async_engine(db_url=None):
+    return db.get_async_engine(db_url)
+
+def get_async_session(db_url=None):
+    return db.get_async_session(db_url)
+
+def get_pool_metrics():
+    return db.get_pool_metrics()
+
 def initialize_engine_and_session(db_url=None):
     db.initialize(db_url)
 
+# MIGRATIONS
+# Schema changes live in Alembic revisions (src/analogapi/migrations); startup upgrades to head.
+MIGRATIONS_DIR = Path(__file__).resolve().parent / "migrations"
+BASELINE_REVISION = "0001"
+MIGRATION_LOCK_ID = 20261018  # pg_advisory_xact_lock key, so several workers don't migrate at once
+
+def run_migrations(db_url=None, revision="head"):
+    from alembic import command
+    from alembic.config import Config
+
+    config = Config()
+    config.set_main_option("script_location", str(MIGRATIONS_DIR))
+    config.attributes["target_metadata"] = Base.metadata
+    with get_engine(db_url).begin() as connection:
+        connection.execute(text("SELECT pg_advisory_xact_lock(:lock_id)"), {"lock_id": MIGRATION_LOCK_ID})
+        config.attributes["connection"] = connection
+        inspector = inspect(connection)
+        # Databases built by create_all before Alembic have the baseline tables but no version row
+        if inspector.has_table("cameras") and not inspector.has_table("alembic_version"):
+            print(f"DEBUG: Stamping existing schema at revision {BASELINE_REVISION}")
+            command.stamp(config, BASELINE_REVISION)
+        command.upgrade(config, revision)
+
 def clear_database(db_url=None):
     from .models.tables import camera_tags, film_tags, favorite_cameras, favorite_films
 
@@ -102,6 +268,7 @@ def clear_database(db_url=None):
             film_tags,
             favorite_cameras,
             favorite_films,
+            "user_recommendations",
             "user_preferences",
             "tags",
             "films",
@@ -132,9 +299,7 @@ def clear_database(db_url=None):
         db.close()
         temp_engine.dispose()
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
\ No newline at end of file
+# SHARED REQUEST SESSION (POOLED)
+async def get_db():
+    async with get_async_session()() as session:
+        yield session
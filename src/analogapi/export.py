@@ -0,0 +1,204 @@
+import csv
+import io
+import os
+import zlib
+import orjson
+from sqlalchemy import select, literal
+from .database import get_async_session
+from .models.camera import Camera, favorite_cameras
+from .models.film import Film, favorite_films
+from .models.tag import Tag
+from .schemas.camera import CameraOut
+from .schemas.film import FilmOut
+from .serialization import item_select, item_fields, item_dicts
+
+# EXPORT SETTINGS (ENVIRONMENT)
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "5000"))
+EXPORT_GZIP_LEVEL = int(os.getenv("EXPORT_GZIP_LEVEL", "6"))
+
+# FULL EXPORTS
+# GET /export/{kind} streams every row from a server-side cursor, EXPORT_BATCH_SIZE rows at a
+# time, in one REPEATABLE READ snapshot; each batch is encoded and sent before the next is
+# fetched, so memory stays flat however big the table is. Cameras and films come from the list
+# query with their tags grouped into arrays by one joined subquery: nested like the API in
+# NDJSON, flattened into "|"-separated tag_ids/tags columns in CSV and Parquet.
+TAG_SEPARATOR = "|"
+
+# kind -> queries (streamed one after the other), columns as (name, int or str), flat(row) for
+# CSV/Parquet and documents(rows) for NDJSON
+class ExportSpec:
+    def __init__(self, queries, columns, flat=tuple, documents=None):
+        self.queries = queries
+        self.columns = columns
+        self.flat = flat
+        self.documents = documents or (lambda rows: [dict(zip(self.names, self.flat(row))) for row in rows])
+
+    @property
+    def names(self):
+        return [name for name, _ in self.columns]
+
+def item_spec(model, schema):
+    fields = item_fields(schema)
+
+    def flat(row):
+        return (
+            *row[:len(fields)],
+            TAG_SEPARATOR.join(str(tag_id) for tag_id in row.tag_ids or []),
+            TAG_SEPARATOR.join(row.tag_names or []),
+        )
+
+    columns = [(name, int if schema.model_fields[name].annotation is int else str) for name in fields]
+    return ExportSpec(
+        [item_select(model, schema, grouped=True).order_by(model.id)],
+        columns + [("tag_ids", str), ("tags", str)],
+        flat,
+        lambda rows: item_dicts(rows, schema),
+    )
+
+def favorites_spec():
+    return ExportSpec(
+        [
+            select(table.c.user_id, literal(kind).label("item_type"), table.c[column].label("item_id")).order_by(table.c.user_id, table.c[column])
+            for table, kind, column in [(favorite_cameras, "camera", "camera_id"), (favorite_films, "film", "film_id")]
+        ],
+        [("user_id", int), ("item_type", str), ("item_id", int)],
+    )
+
+EXPORTS = {
+    "cameras": lambda: item_spec(Camera, CameraOut),
+    "films": lambda: item_spec(Film, FilmOut),
+    "tags": lambda: ExportSpec([select(Tag.id, Tag.name).order_by(Tag.id)], [("id", int), ("name", str)]),
+    "favorites": favorites_spec,
+}
+
+# ENCODERS
+# begin() -> bytes, encode(rows) -> bytes, end() -> bytes
+class CsvEncoder:
+    media_type = "text/csv"
+    extension = "csv"
+
+    def __init__(self, spec):
+        self.spec = spec
+
+    def write(self, rows):
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        return buffer.getvalue().encode()
+
+    def begin(self):
+        return self.write([self.spec.names])
+
+    def encode(self, rows):
+        return self.write(self.spec.flat(row) for row in rows)
+
+    def end(self):
+        return b""
+
+class NdjsonEncoder:
+    media_type = "application/x-ndjson"
+    extension = "ndjson"
+
+    def __init__(self, spec):
+        self.spec = spec
+
+    def begin(self):
+        return b""
+
+    def encode(self, rows):
+        return b"".join(orjson.dumps(document) + b"\n" for document in self.spec.documents(rows))
+
+    def end(self):
+        return b""
+
+# ParquetWriter writes through this; what it wrote is taken after every row group
+class ChunkSink(io.RawIOBase):
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def take(self):
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+# One row group per batch. pyarrow is optional (pip install pyarrow); see parquet_available()
+class ParquetEncoder:
+    media_type = "application/vnd.apache.parquet"
+    extension = "parquet"
+
+    def __init__(self, spec):
+        import pyarrow
+        import pyarrow.parquet
+
+        self.spec = spec
+        self.pyarrow = pyarrow
+        self.schema = pyarrow.schema([(name, pyarrow.int64() if kind is int else pyarrow.string()) for name, kind in spec.columns])
+        self.sink = ChunkSink()
+        self.writer = pyarrow.parquet.ParquetWriter(self.sink, self.schema)
+
+    def begin(self):
+        return b""
+
+    def encode(self, rows):
+        columns = list(zip(*(self.spec.flat(row) for row in rows)))
+        self.writer.write_table(self.pyarrow.Table.from_arrays(
+            [self.pyarrow.array(values, type=field.type) for values, field in zip(columns, self.schema)],
+            schema=self.schema,
+        ))
+        return self.sink.take()
+
+    def end(self):
+        self.writer.close()
+        return self.sink.take()
+
+ENCODERS = {"csv": CsvEncoder, "ndjson": NdjsonEncoder, "parquet": ParquetEncoder}
+
+def parquet_available():
+    try:
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+# GZIP AS A STREAMING TRANSFORM
+# wbits=31 writes a gzip member (header + trailer), so the output is a regular .gz file
+async def gzipped(chunks, level=EXPORT_GZIP_LEVEL):
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    async for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+# EXPORT STREAM
+# Runs on its own session: the request session is closed before the body is sent
+async def export_chunks(kind, format, batch_size=None):
+    batch_size = batch_size or EXPORT_BATCH_SIZE
+    spec = EXPORTS[kind]()
+    encoder = ENCODERS[format](spec)
+    yield encoder.begin()
+    async with get_async_session()() as db:
+        await db.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+        for query in spec.queries:
+            result = await db.stream(query.execution_options(yield_per=batch_size))
+            async for rows in result.partitions():
+                yield encoder.encode(rows)
+    yield encoder.end()
+
+def export_stream(kind, format, gzip=False):
+    chunks = export_chunks(kind, format)
+    return gzipped(chunks) if gzip else chunks
+
+def export_filename(kind, format, gzip=False):
+    return f"{kind}.{ENCODERS[format].extension}" + (".gz" if gzip else "")
@@ -0,0 +1,108 @@
+import os
+from sqlalchemy import select, func, and_, or_, tuple_, union_all, null
+from .models.camera import Camera
+from .models.film import Film
+from .models.format import Format
+from .models.tag import Tag
+from .loaders import TAG_LINKS
+
+# FACET SETTINGS (ENVIRONMENT)
+FACET_LIMIT = int(os.getenv("FACET_LIMIT", "100"))
+
+# LIST FILTERS
+# Every filter is also a facet: name -> (grouping columns, condition or None when unset).
+# Values within one filter are OR-ed (brand=Canon&brand=Nikon), different filters are AND-ed.
+# Formats filter and group by canonical slug, tags by id (with the name as label).
+def values_condition(column, values):
+    return column.in_(values) if values else None
+
+def format_condition(model, slugs):
+    return model.format_id.in_(select(Format.id).where(Format.slug.in_(slugs))) if slugs else None
+
+def tag_condition(model, tag_ids):
+    if not tag_ids:
+        return None
+    link_table, link_column = TAG_LINKS[model]
+    return model.id.in_(select(link_table.c[link_column]).where(link_table.c.tag_id.in_(tag_ids)))
+
+def camera_facets(format=None, type=None, brand=None, lens_mount=None, tag_ids=None):
+    return {
+        "format": ([Format.slug], format_condition(Camera, format)),
+        "type": ([Camera.type], values_condition(Camera.type, type)),
+        "brand": ([Camera.brand], values_condition(Camera.brand, brand)),
+        "lens_mount": ([Camera.lens_mount], values_condition(Camera.lens_mount, lens_mount)),
+        "tags": ([Tag.id, Tag.name], tag_condition(Camera, tag_ids)),
+    }
+
+def film_facets(format=None, type=None, grain=None, brand=None, iso_min=None, iso_max=None, tag_ids=None):
+    iso = []
+    if iso_min is not None:
+        iso.append(Film.iso_value >= iso_min)
+    if iso_max is not None:
+        iso.append(Film.iso_value <= iso_max)
+    return {
+        "format": ([Format.slug], format_condition(Film, format)),
+        "type": ([Film.color], values_condition(Film.color, type)),
+        "grain": ([Film.grain], values_condition(Film.grain, grain)),
+        "brand": ([Film.brand], values_condition(Film.brand, brand)),
+        "iso": ([Film.iso_value], and_(*iso) if iso else None),
+        "tags": ([Tag.id, Tag.name], tag_condition(Film, tag_ids)),
+    }
+
+def conditions(facets, exclude=None):
+    return [condition for name, (_, condition) in facets.items() if name != exclude and condition is not None]
+
+# FACET COUNTS
+# One GROUP BY GROUPING SETS query with a grouping set per facet. Each facet counts the rows
+# matching every *other* filter, so picking brand=Canon still shows how many Nikons there are;
+# those per-facet filters are count(*) FILTER (WHERE ...) columns, and GROUPING() tells which
+# set a row belongs to. Items are joined to their tag links plus one untagged row each: tag
+# facets count the tagged rows, every other facet the untagged ones, so no count(DISTINCT ...)
+# is needed to undo the join's repeats.
+def facet_query(model, facets):
+    link_table, link_column = TAG_LINKS[model]
+    links = union_all(
+        select(link_table.c[link_column].label("item_id"), link_table.c.tag_id),
+        select(model.id, null()),
+    ).subquery("links")
+    columns, flags, counts = [], [], []
+    for name, (group_columns, _) in facets.items():
+        columns.extend(group_columns)
+        flags.append(func.grouping(group_columns[0]))
+        rows = links.c.tag_id.is_not(None) if group_columns[0] is Tag.id else links.c.tag_id.is_(None)
+        counts.append(func.count().filter(and_(rows, *conditions(facets, name))))
+
+    query = (
+        select(*columns, *flags, *counts)
+        .select_from(model)
+        .join(links, links.c.item_id == model.id)
+        .outerjoin(Format, Format.id == model.format_id)
+        .outerjoin(Tag, Tag.id == links.c.tag_id)
+        .group_by(func.grouping_sets(*(tuple_(*group_columns) for group_columns, _ in facets.values())))
+    )
+    if len(conditions(facets)) > 1:
+        # Only rows that some facet counts: those failing at most one filter
+        query = query.where(or_(*(and_(*conditions(facets, name)) for name in facets)))
+    return query
+
+# {facet: [{value, count, label}]} (label: tag names), most common first; NULL values are left out
+async def facet_counts(db, model, facets, limit=FACET_LIMIT):
+    widths = [len(group_columns) for group_columns, _ in facets.values()]
+    starts = [sum(widths[:index]) for index in range(len(widths))]
+    flags_at = sum(widths)
+    counts_at = flags_at + len(facets)
+    results = {name: [] for name in facets}
+    for row in await db.execute(facet_query(model, facets)):
+        for index, name in enumerate(facets):
+            if row[flags_at + index] != 0:
+                continue
+            value = row[starts[index]]
+            count = row[counts_at + index]
+            if value is not None and count:
+                label = row[starts[index] + 1] if widths[index] > 1 else None
+                results[name].append({"value": value, "count": count, "label": label})
+            break
+    for name, entries in results.items():
+        entries.sort(key=lambda entry: (-entry["count"], str(entry["value"])))
+        del entries[limit:]
+    return results
@@ -0,0 +1,55 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
+from fastapi import HTTPException, status
+from passlib.context import CryptContext
+
+# BCRYPT SETTINGS (ENVIRONMENT)
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+HASH_WORKERS = int(os.getenv("HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+HASH_QUEUE_SIZE = int(os.getenv("HASH_QUEUE_SIZE", "32"))
+
+# min/max pin the cost, so hashes made with any other cost are flagged for rehash on login
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+    bcrypt__max_rounds=BCRYPT_ROUNDS,
+)
+
+# BOUNDED HASHING POOL
+# bcrypt releases the GIL while hashing, so worker threads run in parallel without pickling overhead
+class HashingService:
+    def __init__(self, workers=HASH_WORKERS, queue_size=HASH_QUEUE_SIZE, context=pwd_context):
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        self.max_pending = workers + queue_size
+        self.context = context
+        self.pending = 0
+        self.lock = threading.Lock()
+
+    async def run(self, fn, *args):
+        with self.lock:
+            if self.pending >= self.max_pending:
+                raise HTTPException(
+                    status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                    detail="Too many concurrent authentication requests, try again shortly",
+                    headers={"Retry-After": "1"},
+                )
+            self.pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+        finally:
+            with self.lock:
+                self.pending -= 1
+
+    async def hash(self, password: str) -> str:
+        return await self.run(self.context.hash, password)
+
+    async def verify_and_update(self, password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        # Returns (valid, new_hash); new_hash is set when the stored hash uses an outdated cost
+        return await self.run(self.context.verify_and_update, password, hashed_password)
+
+hashing_service = HashingService()
@@ -0,0 +1,140 @@
+import asyncio
+import os
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+# JOB SETTINGS (ENVIRONMENT)
+JOB_HISTORY_SIZE = int(os.getenv("JOB_HISTORY_SIZE", "100"))
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED = {SUCCEEDED, FAILED, CANCELLED}
+
+def utcnow():
+    return datetime.now(timezone.utc)
+
+# JOB
+# Runners update progress/counts/errors/timings while they work; GET /scrape/jobs/{id} reads them
+class Job:
+    def __init__(self, job_type, params):
+        self.id = uuid.uuid4().hex
+        self.type = job_type
+        self.params = params
+        self.status = QUEUED
+        self.stage = None
+        self.progress = {"done": 0, "total": None}
+        self.counts = {}
+        self.errors = []
+        self.timings = {}
+        self.created_at = utcnow()
+        self.started_at = None
+        self.finished_at = None
+        self.task = None
+        self.stage_started = None
+
+    def set_stage(self, stage, total=None):
+        now = time.perf_counter()
+        if self.stage is not None:
+            self.timings[f"{self.stage}_seconds"] = round(now - self.stage_started, 3)
+        self.stage = stage
+        self.stage_started = now
+        if stage is not None:
+            self.progress = {"done": 0, "total": total}
+
+    def report(self, done, total=None):
+        self.progress = {"done": done, "total": total if total is not None else self.progress["total"]}
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "type": self.type,
+            "status": self.status,
+            "params": self.params,
+            "stage": self.stage,
+            "progress": self.progress,
+            "counts": self.counts,
+            "errors": self.errors,
+            "timings": self.timings,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+# IN-PROCESS JOB QUEUE
+# Every job runs as a task on the event loop; only one job per type is queued or running at a time
+class JobManager:
+    def __init__(self, history_size=JOB_HISTORY_SIZE):
+        self.jobs = OrderedDict()
+        self.active = {}
+        self.history_size = history_size
+
+    def submit(self, job_type, runner, **params):
+        # Returns (job, created); a duplicate submission gets the job already in progress
+        active = self.active.get(job_type)
+        if active is not None and active.status not in FINISHED:
+            return active, False
+
+        job = Job(job_type, params)
+        self.jobs[job.id] = job
+        self.active[job_type] = job
+        while len(self.jobs) > self.history_size:
+            oldest_id = next(iter(self.jobs))
+            if self.jobs[oldest_id].status not in FINISHED:
+                break
+            del self.jobs[oldest_id]
+        job.task = asyncio.get_running_loop().create_task(self.run(job, runner, params))
+        return job, True
+
+    async def run(self, job, runner, params):
+        job.status = RUNNING
+        job.started_at = utcnow()
+        start = time.perf_counter()
+        try:
+            await runner(job, **params)
+            job.status = SUCCEEDED
+        except asyncio.CancelledError:
+            job.status = CANCELLED
+        except Exception as e:
+            print(f"Job {job.id} ({job.type}) failed: {e}")
+            job.errors.append(str(e))
+            job.status = FAILED
+        finally:
+            job.set_stage(None)
+            job.timings["total_seconds"] = round(time.perf_counter() - start, 3)
+            job.finished_at = utcnow()
+            if self.active.get(job.type) is job:
+                del self.active[job.type]
+
+    def get(self, job_id):
+        return self.jobs.get(job_id)
+
+    def list(self):
+        return list(reversed(self.jobs.values()))
+
+    async def cancel(self, job_id, timeout=5):
+        job = self.jobs.get(job_id)
+        if job is None or job.status in FINISHED:
+            return job
+        if job.status == QUEUED:
+            # The task never started, so run() won't get to record the cancellation
+            job.status = CANCELLED
+            job.finished_at = utcnow()
+            if self.active.get(job.type) is job:
+                del self.active[job.type]
+        job.task.cancel()
+        # Give the runner a moment to unwind so the caller sees the final status
+        await asyncio.wait({job.task}, timeout=timeout)
+        return job
+
+    async def shutdown(self):
+        tasks = [job.task for job in self.jobs.values() if job.status not in FINISHED]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+job_manager = JobManager()
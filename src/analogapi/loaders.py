@@ -0,0 +1,27 @@
+import os
+from sqlalchemy.orm import joinedload, selectinload
+from .models.camera import Camera
+from .models.film import Film
+from .models.tag import camera_tags, film_tags
+
+# LOADER STRATEGIES FOR Camera.tags / Film.tags
+# selectin: one extra "WHERE id IN (...)" query per page, works with yield_per streaming
+# joined: single LEFT OUTER JOIN, better for single-row lookups
+LOADER_STRATEGIES = {
+    "selectin": selectinload,
+    "joined": joinedload,
+}
+
+TAG_LOADER_STRATEGY = os.getenv("TAG_LOADER_STRATEGY", "selectin")
+
+def tag_loader(model, strategy=None):
+    strategy = strategy or TAG_LOADER_STRATEGY
+    if strategy not in LOADER_STRATEGIES:
+        raise ValueError(f"Invalid loader strategy: {strategy}. Must be one of {list(LOADER_STRATEGIES)}")
+    return LOADER_STRATEGIES[strategy](model.tags)
+
+def with_tags(query, model, strategy=None):
+    return query.options(tag_loader(model, strategy))
+
+# TAG LINK TABLES: model -> (link table, item column)
+TAG_LINKS = {Camera: (camera_tags, "camera_id"), Film: (film_tags, "film_id")}
@@ -2,16 +2,20 @@ from fastapi import FastAPI
 from contextlib import asynccontextmanager
 from sqlalchemy.orm import configure_mappers
 
-from .base import Base
-from .database import get_engine, initialize_engine_and_session, get_db
+from .database import get_async_engine, initialize_engine_and_session, run_migrations
+from .jobs import job_manager
+from .scrapers.parsing import shutdown_parse_pool
+from .similarity import shutdown_similarity
 
 from .models.camera import Camera
 from .models.film import Film
+from .models.format import Format
+from .models.recommendation import UserRecommendation
 from .models.tag import Tag
 from .models.user import User
 from .models.user_preferences import UserPreferences
 
-from .routers import camera, film, tag, user, recommendations, favorites, scrape
+from .routers import camera, film, tag, user, recommendations, favorites, scrape, metrics, search, export, imports
 
 configure_mappers()
 
@@ -20,11 +24,14 @@ initialize_engine_and_session()
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     try:
-        engine = get_engine()
-        Base.metadata.create_all(bind=engine)
+        run_migrations()
     except Exception as e:
         raise Exception(f"Error al crear las tablas en la base de datos: {e}")
     yield
+    await job_manager.shutdown()
+    await shutdown_similarity()
+    await get_async_engine().dispose()
+    shutdown_parse_pool()
 
 app = FastAPI(title="AnalogAPI", lifespan=lifespan)
 
@@ -35,6 +42,10 @@ app.include_router(user.router)
 app.include_router(recommendations.router)
 app.include_router(favorites.router)
 app.include_router(scrape.router)
+app.include_router(metrics.router)
+app.include_router(search.router)
+app.include_router(export.router)
+app.include_router(imports.router)
 
 @app.get("/")
 def read_root():
@@ -0,0 +1,42 @@
+import os
+from logging.config import fileConfig
+from alembic import context
+from sqlalchemy import create_engine, pool
+
+config = context.config
+
+# database.run_migrations() passes its own connection and metadata; the alembic CLI does not
+connection = config.attributes.get("connection")
+target_metadata = config.attributes.get("target_metadata")
+
+if connection is None:
+    from dotenv import load_dotenv
+    load_dotenv()
+    if config.config_file_name is not None:
+        fileConfig(config.config_file_name)
+    from analogapi.base import Base
+    from analogapi.models import camera, catalog, film, format, recommendation, tag, user, user_preferences  # noqa: F401
+    target_metadata = Base.metadata
+
+def run_migrations_offline():
+    context.configure(url=os.getenv("DATABASE_URL"), target_metadata=target_metadata, literal_binds=True)
+    with context.begin_transaction():
+        context.run_migrations()
+
+def run_migrations_online():
+    if connection is not None:
+        context.configure(connection=connection, target_metadata=target_metadata)
+        with context.begin_transaction():
+            context.run_migrations()
+        return
+
+    engine = create_engine(os.getenv("DATABASE_URL"), poolclass=pool.NullPool)
+    with engine.connect() as cli_connection:
+        context.configure(connection=cli_connection, target_metadata=target_metadata)
+        with context.begin_transaction():
+            context.run_migrations()
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,87 @@
+"""Baseline schema, as created by Base.metadata.create_all before migrations
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        "users",
+        sa.Column("id", sa.Integer, primary_key=True, index=True),
+        sa.Column("username", sa.String, unique=True, nullable=False),
+        sa.Column("email", sa.String, unique=True, nullable=False),
+        sa.Column("password", sa.String, nullable=False),
+    )
+    op.create_table(
+        "tags",
+        sa.Column("id", sa.Integer, primary_key=True, index=True),
+        sa.Column("name", sa.String, unique=True, nullable=False),
+    )
+    op.create_table(
+        "cameras",
+        sa.Column("id", sa.Integer, primary_key=True, index=True),
+        sa.Column("brand", sa.String, nullable=False),
+        sa.Column("model", sa.String, nullable=False),
+        sa.Column("format", sa.String),
+        sa.Column("type", sa.String),
+        sa.Column("years", sa.String),
+        sa.Column("lens_mount", sa.String),
+        sa.Column("source_url", sa.String),
+        sa.Column("scraped_at", sa.DateTime),
+    )
+    op.create_table(
+        "films",
+        sa.Column("id", sa.Integer, primary_key=True, index=True),
+        sa.Column("brand", sa.String, nullable=False),
+        sa.Column("name", sa.String, nullable=False),
+        sa.Column("iso", sa.String),
+        sa.Column("format", sa.String),
+        sa.Column("color", sa.String),
+        sa.Column("grain", sa.String),
+        sa.Column("source_url", sa.String),
+        sa.Column("scraped_at", sa.DateTime(timezone=True)),
+    )
+    op.create_table(
+        "user_preferences",
+        sa.Column("id", sa.Integer, primary_key=True, index=True),
+        sa.Column("user_id", sa.Integer, sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("favorite_photography_type", sa.JSON),
+        sa.Column("preferred_format", sa.String),
+        sa.Column("color_preference", sa.String),
+        sa.Column("preferred_camera_type", sa.String),
+        sa.Column("preferred_focal_length", sa.String),
+        sa.Column("favourite_look", sa.String),
+    )
+    op.create_table(
+        "camera_tags",
+        sa.Column("camera_id", sa.Integer, sa.ForeignKey("cameras.id"), primary_key=True),
+        sa.Column("tag_id", sa.Integer, sa.ForeignKey("tags.id"), primary_key=True),
+    )
+    op.create_table(
+        "film_tags",
+        sa.Column("film_id", sa.Integer, sa.ForeignKey("films.id"), primary_key=True),
+        sa.Column("tag_id", sa.Integer, sa.ForeignKey("tags.id"), primary_key=True),
+    )
+    op.create_table(
+        "favorite_cameras",
+        sa.Column("user_id", sa.Integer, sa.ForeignKey("users.id"), primary_key=True),
+        sa.Column("camera_id", sa.Integer, sa.ForeignKey("cameras.id"), primary_key=True),
+    )
+    op.create_table(
+        "favorite_films",
+        sa.Column("user_id", sa.Integer, sa.ForeignKey("users.id"), primary_key=True),
+        sa.Column("film_id", sa.Integer, sa.ForeignKey("films.id"), primary_key=True),
+    )
+
+def downgrade():
+    for table in ["favorite_films", "favorite_cameras", "film_tags", "camera_tags",
+                  "user_preferences", "films", "cameras", "tags", "users"]:
+        op.drop_table(table)
@@ -0,0 +1,72 @@
+"""Natural keys for cameras/films, content_hash, and indexes on the hot filter columns
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+
+Databases created by create_all after the scraper upserts landed already have the
+unique constraints and content_hash, so every step checks the live schema first.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+# (table, constraint, key columns, association tables as (table, fk column, other column))
+NATURAL_KEYS = [
+    ("cameras", "uq_cameras_brand_model", ["brand", "model"],
+     [("camera_tags", "camera_id", "tag_id"), ("favorite_cameras", "camera_id", "user_id")]),
+    ("films", "uq_films_brand_name_format", ["brand", "name", "format"],
+     [("film_tags", "film_id", "tag_id"), ("favorite_films", "film_id", "user_id")]),
+]
+
+FILTER_INDEXES = [
+    ("ix_cameras_format_type", "cameras", ["format", "type"]),
+    ("ix_films_format_color", "films", ["format", "color"]),
+]
+
+# Keep the lowest id per natural key; tags and favorites of the duplicates move to the survivor.
+# NULLs never collide in a unique constraint, so rows with a NULL key column are left alone.
+def merge_duplicates(table, key, associations):
+    key_columns = ", ".join(key)
+    not_null = " AND ".join(f"{column} IS NOT NULL" for column in key)
+    duplicates = f"""
+        SELECT id, keep_id FROM (
+            SELECT id, min(id) OVER (PARTITION BY {key_columns}) AS keep_id FROM {table} WHERE {not_null}
+        ) ranked WHERE id <> keep_id
+    """
+    for association, fk_column, other_column in associations:
+        op.execute(f"""
+            INSERT INTO {association} ({fk_column}, {other_column})
+            SELECT d.keep_id, a.{other_column} FROM {association} a JOIN ({duplicates}) d ON d.id = a.{fk_column}
+            ON CONFLICT DO NOTHING
+        """)
+        op.execute(f"DELETE FROM {association} WHERE {fk_column} IN (SELECT id FROM ({duplicates}) d)")
+    op.execute(f"DELETE FROM {table} WHERE id IN (SELECT id FROM ({duplicates}) d)")
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+
+    for table in ["cameras", "films"]:
+        if "content_hash" not in {column["name"] for column in inspector.get_columns(table)}:
+            op.add_column(table, sa.Column("content_hash", sa.String(64)))
+
+    for table, name, key, associations in NATURAL_KEYS:
+        if name not in {constraint["name"] for constraint in inspector.get_unique_constraints(table)}:
+            merge_duplicates(table, key, associations)
+            op.create_unique_constraint(name, table, key)
+
+    for name, table, columns in FILTER_INDEXES:
+        if name not in {index["name"] for index in inspector.get_indexes(table)}:
+            op.create_index(name, table, columns)
+
+def downgrade():
+    for name, table, columns in FILTER_INDEXES:
+        op.drop_index(name, table_name=table)
+    for table, name, key, associations in NATURAL_KEYS:
+        op.drop_constraint(name, table, type_="unique")
+    for table in ["cameras", "films"]:
+        op.drop_column(table, "content_hash")
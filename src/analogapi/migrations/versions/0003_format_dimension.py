@@ -0,0 +1,100 @@
+"""Canonical formats, camera/film format compatibility and format_id on cameras/films
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+
+format_id is filled by a BEFORE INSERT/UPDATE trigger, so ORM writes, scraper upserts
+and raw SQL all keep it in step with the free-text format column.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+# (slug, name, pattern); patterns are case-insensitive POSIX regexes tried in this order,
+# so the more specific formats (half frame is also 35mm film) come first
+FORMATS = [
+    ("half_frame", "Half Frame", r"half[ _-]?frame"),
+    ("aps", "APS", r"\maps\M|advanced photo system"),
+    ("disc_film", "Disc Film", r"\mdisc"),
+    ("minox", "Minox", r"minox"),
+    ("instant", "Instant", r"instant|polaroid|instax|peel[ _-]?apart"),
+    ("large_format", "Large Format", r"large[ _-]?format|sheet[ _-]?film|\m4x5\M|\m8x10\M"),
+    ("35mm", "35mm", r"\m35 ?mm\M|\m135\M"),
+    ("120", "120", r"\m120\M|\m220\M|medium[ _-]?format"),
+    ("110", "110", r"\m110\M"),
+    ("126", "126", r"\m126\M"),
+    ("127", "127", r"\m127\M"),
+    ("pinhole", "Pinhole", r"pinhole"),
+]
+
+# Camera format -> film formats it takes besides its own
+EXTRA_COMPATIBILITY = [
+    ("half_frame", "35mm"),
+]
+
+def upgrade():
+    formats = op.create_table(
+        "formats",
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("slug", sa.String, unique=True, nullable=False),
+        sa.Column("name", sa.String, nullable=False),
+        sa.Column("pattern", sa.String, nullable=False),
+        sa.Column("position", sa.Integer, nullable=False),
+    )
+    op.bulk_insert(formats, [
+        {"slug": slug, "name": name, "pattern": pattern, "position": position}
+        for position, (slug, name, pattern) in enumerate(FORMATS)
+    ])
+
+    op.create_table(
+        "format_compatibility",
+        sa.Column("camera_format_id", sa.Integer, sa.ForeignKey("formats.id"), primary_key=True),
+        sa.Column("film_format_id", sa.Integer, sa.ForeignKey("formats.id"), primary_key=True),
+    )
+    op.create_index("ix_format_compatibility_film_camera", "format_compatibility", ["film_format_id", "camera_format_id"])
+    op.execute("INSERT INTO format_compatibility SELECT id, id FROM formats")
+    for camera_slug, film_slug in EXTRA_COMPATIBILITY:
+        op.execute(sa.text("""
+            INSERT INTO format_compatibility
+            SELECT c.id, f.id FROM formats c, formats f WHERE c.slug = :camera_slug AND f.slug = :film_slug
+        """).bindparams(camera_slug=camera_slug, film_slug=film_slug))
+
+    op.execute("""
+        CREATE FUNCTION canonical_format_id(value text) RETURNS integer LANGUAGE sql STABLE AS $$
+            SELECT id FROM formats WHERE value ~* pattern ORDER BY position LIMIT 1
+        $$
+    """)
+    op.execute("""
+        CREATE FUNCTION set_format_id() RETURNS trigger LANGUAGE plpgsql AS $$
+        BEGIN
+            IF TG_OP = 'UPDATE' AND NEW.format IS NOT DISTINCT FROM OLD.format THEN
+                RETURN NEW;
+            END IF;
+            NEW.format_id := canonical_format_id(NEW.format);
+            RETURN NEW;
+        END
+        $$
+    """)
+    for table in ["cameras", "films"]:
+        op.add_column(table, sa.Column("format_id", sa.Integer, sa.ForeignKey("formats.id")))
+        op.create_index(f"ix_{table}_format_id", table, ["format_id"])
+        op.execute(f"""
+            CREATE TRIGGER {table}_set_format_id BEFORE INSERT OR UPDATE OF format ON {table}
+            FOR EACH ROW EXECUTE FUNCTION set_format_id()
+        """)
+        op.execute(f"UPDATE {table} SET format_id = canonical_format_id(format)")
+
+def downgrade():
+    for table in ["cameras", "films"]:
+        op.execute(f"DROP TRIGGER {table}_set_format_id ON {table}")
+        op.drop_index(f"ix_{table}_format_id", table_name=table)
+        op.drop_column(table, "format_id")
+    op.execute("DROP FUNCTION set_format_id()")
+    op.execute("DROP FUNCTION canonical_format_id(text)")
+    op.drop_table("format_compatibility")
+    op.drop_table("formats")
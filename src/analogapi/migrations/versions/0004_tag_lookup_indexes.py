@@ -0,0 +1,20 @@
+"""Indexes on camera_tags.tag_id and film_tags.tag_id for tag-driven lookups
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_index("ix_camera_tags_tag_id", "camera_tags", ["tag_id"])
+    op.create_index("ix_film_tags_tag_id", "film_tags", ["tag_id"])
+
+def downgrade():
+    op.drop_index("ix_film_tags_tag_id", table_name="film_tags")
+    op.drop_index("ix_camera_tags_tag_id", table_name="camera_tags")
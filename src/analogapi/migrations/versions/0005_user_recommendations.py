@@ -0,0 +1,27 @@
+"""Per-user collaborative-filtering recommendation lists
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        "user_recommendations",
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("kind", sa.String(), primary_key=True),
+        sa.Column("item_ids", postgresql.ARRAY(sa.Integer()), nullable=False),
+        sa.Column("scores", postgresql.ARRAY(sa.Float()), nullable=False),
+        sa.Column("built_at", sa.DateTime(), nullable=False),
+    )
+
+def downgrade():
+    op.drop_table("user_recommendations")
@@ -0,0 +1,78 @@
+"""Full-text search vectors on cameras, films and tags; trigram indexes when pg_trgm is available
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18
+
+search_vector is a stored generated column, so every write path (ORM, scraper upserts, raw SQL)
+keeps it current. pg_trgm ships with the PostgreSQL contrib package; servers without it get
+the full-text indexes only and the API corrects typos itself (see search.py).
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+# Punctuation becomes a word break ("AE-1" -> ae, 1); the compact form keeps model names
+# searchable as typed without separators ("500C/M" -> 500cm)
+def words(column):
+    return f"regexp_replace(coalesce({column}, ''), '[[:punct:]]+', ' ', 'g')"
+
+def compact(column):
+    return f"regexp_replace(coalesce({column}, ''), '[[:punct:][:space:]]+', '', 'g')"
+
+def weighted(text, weight):
+    return f"setweight(to_tsvector('simple'::regconfig, {text}), '{weight}')"
+
+SEARCH_VECTORS = {
+    "cameras": " || ".join([
+        weighted(f"{words('brand')} || ' ' || {words('model')}", "A"),
+        weighted(compact("model"), "A"),
+        weighted(words("lens_mount"), "C"),
+    ]),
+    "films": " || ".join([
+        weighted(f"{words('brand')} || ' ' || {words('name')}", "A"),
+        weighted(compact("name"), "A"),
+        weighted(words("format"), "C"),
+    ]),
+    "tags": " || ".join([
+        weighted(words("name"), "A"),
+        weighted(compact("name"), "A"),
+    ]),
+}
+
+# Must match search.TRIGRAM_TEXTS for the planner to use the indexes
+TRIGRAM_TEXTS = {
+    "cameras": "lower(brand || ' ' || model || ' ' || coalesce(lens_mount, ''))",
+    "films": "lower(brand || ' ' || name)",
+    "tags": "lower(name)",
+}
+
+def upgrade():
+    for table, expression in SEARCH_VECTORS.items():
+        op.add_column(table, sa.Column("search_vector", postgresql.TSVECTOR(), sa.Computed(expression, persisted=True)))
+        op.create_index(f"ix_{table}_search_vector", table, ["search_vector"], postgresql_using="gin")
+
+    bind = op.get_bind()
+    if bind.execute(sa.text("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")).first() is None:
+        print("pg_trgm is not available; skipping the trigram indexes")
+        return
+    try:
+        with bind.begin_nested():
+            op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    except sa.exc.DBAPIError as e:
+        print(f"Could not create pg_trgm, skipping the trigram indexes: {e}")
+        return
+    for table, expression in TRIGRAM_TEXTS.items():
+        op.execute(f"CREATE INDEX ix_{table}_search_trgm ON {table} USING gin (({expression}) gin_trgm_ops)")
+
+def downgrade():
+    for table in TRIGRAM_TEXTS:
+        op.execute(f"DROP INDEX IF EXISTS ix_{table}_search_trgm")
+    for table in SEARCH_VECTORS:
+        op.drop_index(f"ix_{table}_search_vector", table_name=table)
+        op.drop_column(table, "search_vector")
@@ -0,0 +1,28 @@
+"""Numeric films.iso_value for ISO range filters; index on cameras.lens_mount
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18
+
+films.iso stays text (scraped values can be "Unknown"); iso_value is a stored generated column
+holding it as an integer when it is one.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+ISO_VALUE = r"CASE WHEN iso ~ '^\s*[0-9]{1,7}\s*$' THEN CAST(trim(iso) AS integer) END"
+
+def upgrade():
+    op.add_column("films", sa.Column("iso_value", sa.Integer(), sa.Computed(ISO_VALUE, persisted=True)))
+    op.create_index("ix_films_iso_value", "films", ["iso_value"])
+    op.create_index("ix_cameras_lens_mount", "cameras", ["lens_mount"])
+
+def downgrade():
+    op.drop_index("ix_cameras_lens_mount", table_name="cameras")
+    op.drop_index("ix_films_iso_value", table_name="films")
+    op.drop_column("films", "iso_value")
@@ -0,0 +1,65 @@
+"""Catalog version, bumped by triggers on every write to cameras, films, tags and their tag links
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18
+
+The single catalog_version row backs the ETag/Last-Modified headers of the catalog endpoints.
+Statement-level triggers bump it in the writing transaction, so the new version becomes
+visible together with the data. Statements that change no rows (e.g. a scraper upsert of
+unchanged pages) leave it alone.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0008"
+down_revision = "0007"
+branch_labels = None
+depends_on = None
+
+CATALOG_TABLES = ["cameras", "films", "tags", "camera_tags", "film_tags"]
+
+# event -> transition table holding the changed rows
+EVENTS = {"INSERT": "NEW", "UPDATE": "NEW", "DELETE": "OLD"}
+
+def upgrade():
+    op.create_table(
+        "catalog_version",
+        sa.Column("id", sa.Boolean, primary_key=True, server_default=sa.true()),
+        sa.Column("version", sa.BigInteger, nullable=False),
+        sa.Column("modified_at", sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+        sa.CheckConstraint("id", name="ck_catalog_version_single_row"),
+    )
+    op.execute("INSERT INTO catalog_version (version) VALUES (1)")
+    op.execute("""
+        CREATE FUNCTION bump_catalog_version() RETURNS trigger LANGUAGE plpgsql AS $$
+        BEGIN
+            IF TG_OP <> 'TRUNCATE' THEN
+                IF NOT EXISTS (SELECT 1 FROM changed_rows) THEN
+                    RETURN NULL;
+                END IF;
+            END IF;
+            UPDATE catalog_version SET version = version + 1, modified_at = now();
+            RETURN NULL;
+        END
+        $$
+    """)
+    # Transition tables allow one event per trigger, hence a trigger per table and event
+    for table in CATALOG_TABLES:
+        for event, rows in EVENTS.items():
+            op.execute(f"""
+                CREATE TRIGGER {table}_catalog_{event.lower()} AFTER {event} ON {table}
+                REFERENCING {rows} TABLE AS changed_rows
+                FOR EACH STATEMENT EXECUTE FUNCTION bump_catalog_version()
+            """)
+        op.execute(f"""
+            CREATE TRIGGER {table}_catalog_truncate AFTER TRUNCATE ON {table}
+            FOR EACH STATEMENT EXECUTE FUNCTION bump_catalog_version()
+        """)
+
+def downgrade():
+    for table in CATALOG_TABLES:
+        for event in [*EVENTS, "TRUNCATE"]:
+            op.execute(f"DROP TRIGGER {table}_catalog_{event.lower()} ON {table}")
+    op.execute("DROP FUNCTION bump_catalog_version()")
+    op.drop_table("catalog_version")
@@ -1,5 +1,6 @@
-from sqlalchemy import Column, Integer, String, DateTime, Table, ForeignKey
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, DateTime, Table, ForeignKey, UniqueConstraint, Index, FetchedValue
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.orm import deferred, relationship
 from ..base import Base
 from datetime import datetime
 
@@ -12,16 +13,29 @@ favorite_cameras = Table(
 
 class Camera(Base):
     __tablename__ = "cameras"
+    # Natural key, used by the scraper upserts (ON CONFLICT); format/type back the compatible and
+    # recommendation filters. Schema changes go through an Alembic migration (src/analogapi/migrations)
+    __table_args__ = (
+        UniqueConstraint("brand", "model", name="uq_cameras_brand_model"),
+        Index("ix_cameras_search_vector", "search_vector", postgresql_using="gin"),
+        Index("ix_cameras_format_type", "format", "type"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     brand = Column(String, nullable=False)
     model = Column(String, nullable=False)
     format = Column(String)
+    # Canonical format, set by a database trigger whenever format is written
+    format_id = Column(Integer, ForeignKey("formats.id"), FetchedValue(), server_onupdate=FetchedValue(), index=True)
     type = Column(String)
     years = Column(String)
-    lens_mount = Column(String)
+    lens_mount = Column(String, index=True)
     source_url = Column(String)
     scraped_at = Column(DateTime, default=datetime.utcnow)
+    # sha256 of the scraped source, lets incremental scrapes skip unchanged pages
+    content_hash = Column(String(64))
+    # Full-text search document, a generated column maintained by the database (migration 0006)
+    search_vector = deferred(Column(TSVECTOR, FetchedValue(), server_onupdate=FetchedValue()))
 
     tags = relationship("Tag", secondary="camera_tags", back_populates="cameras")
     favorite_users = relationship("User", secondary=favorite_cameras, back_populates="favorite_cameras")
\ No newline at end of file
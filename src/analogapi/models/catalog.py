@@ -0,0 +1,14 @@
+from sqlalchemy import Column, Boolean, BigInteger, DateTime, Table, CheckConstraint, true, func
+from ..base import Base
+
+# CATALOG VERSION
+# One row, bumped by database triggers whenever cameras, films, tags or their tag links change
+# (migration 0008). Catalog responses use it as their ETag and Last-Modified.
+catalog_version = Table(
+    "catalog_version",
+    Base.metadata,
+    Column("id", Boolean, primary_key=True, server_default=true()),
+    Column("version", BigInteger, nullable=False),
+    Column("modified_at", DateTime(timezone=True), nullable=False, server_default=func.now()),
+    CheckConstraint("id", name="ck_catalog_version_single_row"),
+)
@@ -1,5 +1,6 @@
-from sqlalchemy import Column, Integer, String, DateTime, Table, ForeignKey
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, DateTime, Table, ForeignKey, UniqueConstraint, Index, FetchedValue
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.orm import deferred, relationship, synonym, validates
 from ..base import Base
 from datetime import datetime
 
@@ -12,16 +13,39 @@ favorite_films = Table(
 
 class Film(Base):
     __tablename__ = "films"
+    # Natural key, used by the scraper upserts (ON CONFLICT); format/color back the compatible and
+    # recommendation filters. Schema changes go through an Alembic migration (src/analogapi/migrations)
+    __table_args__ = (
+        UniqueConstraint("brand", "name", "format", name="uq_films_brand_name_format"),
+        Index("ix_films_search_vector", "search_vector", postgresql_using="gin"),
+        Index("ix_films_format_color", "format", "color"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     brand = Column(String, nullable=False)
     name = Column(String, nullable=False)
     iso = Column(String, nullable=True) 
+    # iso as an integer when it is one (generated column), for range filters and sorting
+    iso_value = Column(Integer, FetchedValue(), server_onupdate=FetchedValue(), index=True)
     format = Column(String)
+    # Canonical format, set by a database trigger whenever format is written
+    format_id = Column(Integer, ForeignKey("formats.id"), FetchedValue(), server_onupdate=FetchedValue(), index=True)
     color = Column(String)
     grain = Column(String)
     source_url = Column(String)
     scraped_at = Column(DateTime(timezone=True))
+    # sha256 of the scraped source, lets incremental scrapes skip unchanged pages
+    content_hash = Column(String(64))
+    # Full-text search document, a generated column maintained by the database (migration 0006)
+    search_vector = deferred(Column(TSVECTOR, FetchedValue(), server_onupdate=FetchedValue()))
+
+    # FilmCreate/FilmOut call this field "type"
+    type = synonym("color")
 
     tags = relationship("Tag", secondary="film_tags", back_populates="films")
-    favorite_users = relationship("User", secondary=favorite_films, back_populates="favorite_films")
\ No newline at end of file
+    favorite_users = relationship("User", secondary=favorite_films, back_populates="favorite_films")
+
+    @validates("iso")
+    def validate_iso(self, key, value):
+        # iso is a text column (scraped values can be "Unknown"); asyncpg does not coerce ints
+        return str(value) if value is not None else value
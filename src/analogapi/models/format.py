@@ -0,0 +1,26 @@
+from sqlalchemy import Column, Integer, String, Table, ForeignKey, Index
+from ..base import Base
+
+# Which film formats a camera format takes; every format takes itself, plus a few extras
+# (e.g. half-frame cameras shoot 35mm film). Rows are maintained by the migrations.
+format_compatibility = Table(
+    "format_compatibility",
+    Base.metadata,
+    Column("camera_format_id", Integer, ForeignKey("formats.id"), primary_key=True),
+    Column("film_format_id", Integer, ForeignKey("formats.id"), primary_key=True),
+    # The primary key serves camera -> films; this one serves film -> cameras
+    Index("ix_format_compatibility_film_camera", "film_format_id", "camera_format_id"),
+)
+
+# CANONICAL FORMATS
+# cameras.format and films.format stay free text ("Large Format", "35mm film", ...); a trigger
+# sets format_id from the first format (by position) whose case-insensitive regex matches it.
+# Slugs are the AnalogFormat values used in user preferences.
+class Format(Base):
+    __tablename__ = "formats"
+
+    id = Column(Integer, primary_key=True)
+    slug = Column(String, unique=True, nullable=False)
+    name = Column(String, nullable=False)
+    pattern = Column(String, nullable=False)
+    position = Column(Integer, nullable=False)
@@ -0,0 +1,15 @@
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey
+from sqlalchemy.dialects.postgresql import ARRAY
+from ..base import Base
+
+# Per-user top-N lists written by the collaborative-filtering batch job (collaborative.py);
+# /recommendations/* reads one row by primary key. kind is "cameras" or "films".
+class UserRecommendation(Base):
+    __tablename__ = "user_recommendations"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    kind = Column(String, primary_key=True)
+    # Best first; scores[i] belongs to item_ids[i]
+    item_ids = Column(ARRAY(Integer), nullable=False)
+    scores = Column(ARRAY(Float), nullable=False)
+    built_at = Column(DateTime, nullable=False)
@@ -1,26 +1,35 @@
-from sqlalchemy import Column, Integer, String, Table, ForeignKey
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, Table, ForeignKey, Index, FetchedValue
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.orm import deferred, relationship
 from ..base import Base
 
 camera_tags = Table(
     "camera_tags",
     Base.metadata,
     Column("camera_id", Integer, ForeignKey("cameras.id"), primary_key=True),
-    Column("tag_id", Integer, ForeignKey("tags.id"), primary_key=True)
+    Column("tag_id", Integer, ForeignKey("tags.id"), primary_key=True),
+    # The primary key leads with camera_id; recommendations look cameras up by tag
+    Index("ix_camera_tags_tag_id", "tag_id"),
 )
 
 film_tags = Table(
     "film_tags",
     Base.metadata,
     Column("film_id", Integer, ForeignKey("films.id"), primary_key=True),
-    Column("tag_id", Integer, ForeignKey("tags.id"), primary_key=True)
+    Column("tag_id", Integer, ForeignKey("tags.id"), primary_key=True),
+    Index("ix_film_tags_tag_id", "tag_id"),
 )
 
 class Tag(Base):
     __tablename__ = "tags"
+    __table_args__ = (
+        Index("ix_tags_search_vector", "search_vector", postgresql_using="gin"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, unique=True, nullable=False)
+    # Full-text search document, a generated column maintained by the database (migration 0006)
+    search_vector = deferred(Column(TSVECTOR, FetchedValue(), server_onupdate=FetchedValue()))
 
     cameras = relationship("Camera", secondary=camera_tags, back_populates="tags")
     films = relationship("Film", secondary=film_tags, back_populates="tags")
\ No newline at end of file
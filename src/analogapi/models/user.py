@@ -8,7 +8,8 @@ class User(Base):
     id = Column(Integer, primary_key=True, index=True)
     username = Column(String, unique=True, nullable=False)
     email = Column(String, unique=True, nullable=False)
-    password = Column(String, nullable=False)
+    # The column was created as "password"; it has always held the bcrypt hash
+    hashed_password = Column("password", String, nullable=False)
 
     favorite_cameras = relationship("Camera", secondary="favorite_cameras", back_populates="favorite_users")
     favorite_films = relationship("Film", secondary="favorite_films", back_populates="favorite_users")
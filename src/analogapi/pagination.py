@@ -0,0 +1,79 @@
+import base64
+import json
+from typing import Optional
+from fastapi import HTTPException, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import func, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from .database import get_async_session
+from .serialization import item_select, ndjson_lines
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+STREAM_BATCH_SIZE = 500
+
+# KEYSET PAGINATION ON ID
+# stmt selects rows with an id column (see serialization.item_select)
+async def paginate(db: AsyncSession, stmt, model, response: Response, after: Optional[int] = None, limit: int = DEFAULT_PAGE_SIZE):
+    if after is not None:
+        stmt = stmt.where(model.id > after)
+    items = (await db.execute(stmt.order_by(model.id).limit(limit))).all()
+    # A full page means there may be more rows after the last id
+    if len(items) == limit:
+        response.headers["X-Next-Cursor"] = str(items[-1].id)
+    return items
+
+# SORTED KEYSET PAGINATION
+# sorts: whitelist of field -> (attribute, value used for NULLs), e.g. {"brand": ("brand", "")}.
+# sort is a field, or -field for descending. Pages continue after (sort value, id), passed back
+# as an opaque cursor; NULLs are coalesced so the order is total.
+def sort_pattern(sorts):
+    return "^-?(" + "|".join(["id", *sorts]) + ")$"
+
+def encode_cursor(value, item_id):
+    return base64.urlsafe_b64encode(json.dumps([value, item_id]).encode()).decode().rstrip("=")
+
+def decode_cursor(cursor, default):
+    try:
+        value, item_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(value, type(default)) or isinstance(value, bool) or not isinstance(item_id, int):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return value, item_id
+
+async def paginate_sorted(db: AsyncSession, stmt, model, response: Response, sorts, sort: str = "id",
+                          after: Optional[int] = None, cursor: Optional[str] = None, limit: int = DEFAULT_PAGE_SIZE):
+    if sort == "id" and cursor is None:
+        return await paginate(db, stmt, model, response, after, limit)
+    if after is not None:
+        raise HTTPException(status_code=400, detail="after only applies to the default id order; pass X-Next-Cursor as cursor")
+
+    descending = sort.startswith("-")
+    attribute, default = sorts.get(sort.lstrip("-"), ("id", 0))
+    column = getattr(model, attribute)
+    expression = column if attribute == "id" else func.coalesce(column, default)
+    key = tuple_(expression, model.id)
+    if cursor is not None:
+        value, item_id = decode_cursor(cursor, default)
+        stmt = stmt.where(key < tuple_(value, item_id) if descending else key > tuple_(value, item_id))
+    order = [expression.desc(), model.id.desc()] if descending else [expression, model.id]
+    items = (await db.execute(stmt.add_columns(expression.label("sort_value")).order_by(*order).limit(limit))).all()
+    if len(items) == limit:
+        response.headers["X-Next-Cursor"] = encode_cursor(items[-1].sort_value, items[-1].id)
+    return items
+
+# NDJSON STREAMING FROM A SERVER-SIDE CURSOR
+def stream_ndjson(model, schema, after: Optional[int] = None, criteria=(), headers=None):
+    async def generate():
+        # The request session is closed before the body is sent, so the stream owns its own
+        async with get_async_session()() as db:
+            stmt = item_select(model, schema).where(*criteria)
+            if after is not None:
+                stmt = stmt.where(model.id > after)
+            stmt = stmt.order_by(model.id).execution_options(yield_per=STREAM_BATCH_SIZE)
+            result = await db.stream(stmt)
+            async for rows in result.partitions():
+                yield ndjson_lines(rows, schema)
+
+    return StreamingResponse(generate(), media_type="application/x-ndjson", headers=headers)
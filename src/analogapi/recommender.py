@@ -0,0 +1,100 @@
+import os
+from sqlalchemy import select, func, case, or_, literal
+from .cache import TTLCache
+from .models.camera import Camera
+from .models.film import Film
+from .models.format import Format
+from .models.tag import Tag, camera_tags, film_tags
+
+# RECOMMENDATION SETTINGS (ENVIRONMENT)
+RECOMMENDATION_LIMIT = int(os.getenv("RECOMMENDATION_LIMIT", "10"))
+TAG_CACHE_TTL = float(os.getenv("TAG_CACHE_TTL", "60"))
+
+# Points per matched preference; a result's score is the sum of everything it matches
+# (tag preferences score once per matching tag)
+CAMERA_WEIGHTS = {"format": 3.0, "camera_type": 2.0, "photography_type": 1.0, "focal_length": 1.0}
+FILM_WEIGHTS = {"format": 3.0, "color": 2.0, "photography_type": 1.0, "look": 1.0}
+
+# color_preference -> films.color ("both" has no preference)
+FILM_COLORS = {"color": "Color", "black_and_white": "B&W"}
+
+# TAG LOOKUP
+# Preferences match tags by name ("self_portrait" matches "Self-Portrait"). The tag list is small
+# and cached, so matching happens here instead of as ILIKE '%...%' scans in every query.
+tag_cache = TTLCache(maxsize=1, ttl=TAG_CACHE_TTL)
+
+def normalize(value):
+    return " ".join(value.lower().replace("_", " ").replace("-", " ").split())
+
+async def get_tags(db):
+    tags = tag_cache.get("tags")
+    if tags is None:
+        tags = [(tag_id, normalize(name)) for tag_id, name in await db.execute(select(Tag.id, Tag.name))]
+        tag_cache.set("tags", tags)
+    return tags
+
+def invalidate_tags():
+    tag_cache.clear()
+
+def match_tags(tags, terms):
+    terms = [normalize(term) for term in terms if term]
+    return [tag_id for tag_id, name in tags if any(term in name for term in terms)]
+
+def format_id(slug):
+    return select(Format.id).where(Format.slug == slug).scalar_subquery()
+
+# SCORING QUERY
+# One grouped query: column matches score through CASE, tag matches through filtered counts over
+# the item's matching tags. Only rows matching at least one preference are candidates.
+# column_matches: [(weight, condition)], tag_matches: [(weight, tag ids)]
+def scored_query(model, link_table, link_column, column_matches, tag_matches, limit):
+    link = link_table.c[link_column]
+    tag_matches = [(weight, tag_ids) for weight, tag_ids in tag_matches if tag_ids]
+    all_tag_ids = sorted({tag_id for _, tag_ids in tag_matches for tag_id in tag_ids})
+
+    score = sum((case((condition, weight), else_=0.0) for weight, condition in column_matches), literal(0.0))
+    candidates = [condition for _, condition in column_matches]
+    query = select(model)
+    if all_tag_ids:
+        query = query.outerjoin(link_table, (link == model.id) & link_table.c.tag_id.in_(all_tag_ids))
+        for weight, tag_ids in tag_matches:
+            score = score + func.count(link_table.c.tag_id).filter(link_table.c.tag_id.in_(tag_ids)) * weight
+        candidates.append(model.id.in_(select(link).where(link_table.c.tag_id.in_(all_tag_ids))))
+    if not candidates:
+        return None
+
+    score = score.label("score")
+    return (
+        query.add_columns(score)
+        .where(or_(*candidates))
+        .group_by(model.id)
+        .order_by(score.desc(), model.id)
+        .limit(limit)
+    )
+
+def camera_recommendations(preferences, tags, limit=RECOMMENDATION_LIMIT):
+    weights = CAMERA_WEIGHTS
+    column_matches = []
+    if preferences.preferred_format:
+        column_matches.append((weights["format"], Camera.format_id == format_id(preferences.preferred_format)))
+    if preferences.preferred_camera_type:
+        column_matches.append((weights["camera_type"], func.lower(Camera.type) == normalize(preferences.preferred_camera_type)))
+    tag_matches = [
+        (weights["photography_type"], match_tags(tags, preferences.favorite_photography_type or [])),
+        (weights["focal_length"], match_tags(tags, [preferences.preferred_focal_length])),
+    ]
+    return scored_query(Camera, camera_tags, "camera_id", column_matches, tag_matches, limit)
+
+def film_recommendations(preferences, tags, limit=RECOMMENDATION_LIMIT):
+    weights = FILM_WEIGHTS
+    column_matches = []
+    if preferences.preferred_format:
+        column_matches.append((weights["format"], Film.format_id == format_id(preferences.preferred_format)))
+    color = FILM_COLORS.get((preferences.color_preference or "").lower())
+    if color:
+        column_matches.append((weights["color"], Film.color == color))
+    tag_matches = [
+        (weights["photography_type"], match_tags(tags, preferences.favorite_photography_type or [])),
+        (weights["look"], match_tags(tags, [preferences.favourite_look])),
+    ]
+    return scored_query(Film, film_tags, "film_id", column_matches, tag_matches, limit)
@@ -0,0 +1,322 @@
+import asyncio
+import os
+import uuid
+from functools import lru_cache
+from urllib.parse import urlparse
+from fastapi import Request, Response
+from pydantic import TypeAdapter
+from .cache import TTLCache
+from .conditional import not_modified
+
+# RESPONSE CACHE SETTINGS (ENVIRONMENT)
+# redis://[:password@]host[:port][/db] selects the Redis-protocol backend (Redis, Valkey, KeyDB, ...);
+# empty keeps entries in process memory
+RESPONSE_CACHE_URL = os.getenv("RESPONSE_CACHE_URL", "")
+RESPONSE_CACHE_TTL = int(os.getenv("RESPONSE_CACHE_TTL", "300"))
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "10000"))
+RESPONSE_CACHE_PREFIX = os.getenv("RESPONSE_CACHE_PREFIX", "analogapi:")
+# Seconds to wait for the Redis backend before treating the call as a miss
+RESPONSE_CACHE_TIMEOUT = float(os.getenv("RESPONSE_CACHE_TIMEOUT", "0.5"))
+RESPONSE_CACHE_POOL_SIZE = int(os.getenv("RESPONSE_CACHE_POOL_SIZE", "10"))
+
+# BACKENDS
+# Both store bytes: get_many(keys) -> [value or None], set(key, value, ttl) with ttl=None for
+# keys that must not expire (generations), delete(keys), clear()
+class LocalBackend:
+    name = "local"
+
+    def __init__(self, maxsize=RESPONSE_CACHE_SIZE, ttl=RESPONSE_CACHE_TTL):
+        self.entries = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.persistent = {}
+
+    async def get_many(self, keys):
+        return [self.persistent[key] if key in self.persistent else self.entries.get(key) for key in keys]
+
+    async def set(self, key, value, ttl=None):
+        if ttl is None:
+            self.persistent[key] = value
+        else:
+            self.entries.set(key, value, ttl)
+
+    async def delete(self, keys):
+        for key in keys:
+            self.entries.delete(key)
+            self.persistent.pop(key, None)
+
+    async def clear(self):
+        self.entries.clear()
+        self.persistent.clear()
+
+    def size(self):
+        return len(self.entries)
+
+class RedisError(Exception):
+    pass
+
+# Minimal RESP2 client over asyncio streams, so the backend needs no extra dependency.
+# Idle connections are pooled per event loop (streams can't move between loops).
+class RedisBackend:
+    name = "redis"
+
+    def __init__(self, url, timeout=RESPONSE_CACHE_TIMEOUT, pool_size=RESPONSE_CACHE_POOL_SIZE, prefix=RESPONSE_CACHE_PREFIX):
+        parsed = urlparse(url)
+        self.host = parsed.hostname or "localhost"
+        self.port = parsed.port or 6379
+        self.password = parsed.password
+        self.db = int(parsed.path.lstrip("/") or 0)
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self.prefix = prefix
+        self.idle = []
+
+    @staticmethod
+    def encode(args):
+        parts = [b"*%d\r\n" % len(args)]
+        for arg in args:
+            if not isinstance(arg, bytes):
+                arg = str(arg).encode()
+            parts.append(b"$%d\r\n%s\r\n" % (len(arg), arg))
+        return b"".join(parts)
+
+    @classmethod
+    async def read_reply(cls, reader):
+        line = await reader.readuntil(b"\r\n")
+        kind, payload = line[:1], line[1:-2]
+        if kind == b"+":
+            return payload
+        if kind == b"-":
+            raise RedisError(payload.decode(errors="replace"))
+        if kind == b":":
+            return int(payload)
+        if kind == b"$":
+            length = int(payload)
+            return None if length < 0 else (await reader.readexactly(length + 2))[:-2]
+        if kind == b"*":
+            length = int(payload)
+            return None if length < 0 else [await cls.read_reply(reader) for _ in range(length)]
+        raise RedisError(f"Unexpected reply: {line!r}")
+
+    async def connect(self):
+        reader, writer = await asyncio.open_connection(self.host, self.port)
+        setup = []
+        if self.password:
+            setup.append(("AUTH", self.password))
+        if self.db:
+            setup.append(("SELECT", self.db))
+        for args in setup:
+            writer.write(self.encode(args))
+            await writer.drain()
+            await self.read_reply(reader)
+        return reader, writer
+
+    async def run(self, *args):
+        loop = asyncio.get_running_loop()
+        connection = next((idle for idle in self.idle if idle[0] is loop), None)
+        if connection is not None:
+            self.idle.remove(connection)
+            _, reader, writer = connection
+        else:
+            reader, writer = await self.connect()
+        try:
+            writer.write(self.encode(args))
+            await writer.drain()
+            reply = await self.read_reply(reader)
+        except BaseException:
+            writer.close()
+            raise
+        if len(self.idle) < self.pool_size:
+            self.idle.append((loop, reader, writer))
+        else:
+            writer.close()
+        return reply
+
+    async def command(self, *args):
+        return await asyncio.wait_for(self.run(*args), self.timeout)
+
+    async def get_many(self, keys):
+        return await self.command("MGET", *(self.prefix + key for key in keys))
+
+    async def set(self, key, value, ttl=None):
+        if ttl is None:
+            await self.command("SET", self.prefix + key, value)
+        else:
+            await self.command("SET", self.prefix + key, value, "EX", ttl)
+
+    async def delete(self, keys):
+        if keys:
+            await self.command("DEL", *(self.prefix + key for key in keys))
+
+    async def clear(self):
+        cursor = b"0"
+        while True:
+            cursor, keys = await self.command("SCAN", cursor, "MATCH", self.prefix + "*", "COUNT", 1000)
+            if keys:
+                await self.command("DEL", *keys)
+            if cursor == b"0":
+                break
+
+    def size(self):
+        return None
+
+def backend_from_env():
+    if RESPONSE_CACHE_URL:
+        return RedisBackend(RESPONSE_CACHE_URL)
+    return LocalBackend()
+
+# RESPONSE CACHE
+# Holds serialized JSON bodies with their ETag/Last-Modified, so a hit answers (or 304s) without
+# touching the database. Handlers invalidate the entries a write affects; entries that embed a
+# whole kind (compatible-films lists embed films) are also stamped with that kind's generation,
+# which every write of the kind replaces. Concurrent misses for a key share one build, and a build
+# that overlaps an invalidation in this process isn't stored. Backend errors count as misses.
+class ResponseCache:
+    def __init__(self, backend, ttl=RESPONSE_CACHE_TTL):
+        self.backend = backend
+        self.ttl = ttl
+        self.flights = {}
+        self.epoch = 0
+        self.tasks = set()
+        self.counters = {"hits": 0, "misses": 0, "coalesced": 0, "stores": 0, "invalidations": 0, "errors": 0}
+
+    @staticmethod
+    def generation_key(namespace):
+        return f"generation:{namespace}"
+
+    # (headers, body) or None, and the namespace's current generation
+    async def lookup(self, key, namespace):
+        keys = [key] if namespace is None else [key, self.generation_key(namespace)]
+        try:
+            values = await self.backend.get_many(keys)
+        except (OSError, RedisError, asyncio.TimeoutError) as e:
+            self.error("read", e)
+            return None, None
+        entry = values[0]
+        generation = b"" if namespace is None else (values[1] or b"")
+        if entry is None:
+            return None, generation
+        stamp, etag, last_modified, body = entry.split(b"\n", 3)
+        if stamp != generation:
+            return None, generation
+        headers = {"ETag": etag.decode(), "Last-Modified": last_modified.decode(), "Cache-Control": "no-cache"}
+        return (headers, body), generation
+
+    async def store(self, key, generation, headers, body):
+        entry = b"\n".join([generation, headers["ETag"].encode(), headers["Last-Modified"].encode(), body])
+        try:
+            await self.backend.set(key, entry, self.ttl)
+            self.counters["stores"] += 1
+        except (OSError, RedisError, asyncio.TimeoutError) as e:
+            self.error("write", e)
+
+    # build() -> (validator headers, JSON body); it may raise HTTPException (nothing is cached)
+    async def serve(self, request: Request, key, build, namespace=None):
+        entry, generation = await self.lookup(key, namespace)
+        if entry is not None:
+            self.counters["hits"] += 1
+            return self.respond(request, *entry)
+        self.counters["misses"] += 1
+
+        flight = self.flights.get(key)
+        if flight is not None:
+            self.counters["coalesced"] += 1
+            return self.respond(request, *await asyncio.shield(flight))
+
+        flight = asyncio.get_running_loop().create_future()
+        self.flights[key] = flight
+        epoch = self.epoch
+        try:
+            headers, body = await build()
+        except asyncio.CancelledError:
+            flight.cancel()
+            raise
+        except Exception as e:
+            flight.set_exception(e)
+            flight.exception()  # waiters re-raise it; don't warn when there are none
+            raise
+        else:
+            flight.set_result((headers, body))
+        finally:
+            del self.flights[key]
+        if epoch == self.epoch and generation is not None:
+            await self.store(key, generation, headers, body)
+        return self.respond(request, headers, body)
+
+    @staticmethod
+    def respond(request, headers, body):
+        if not_modified(request, headers):
+            return Response(status_code=304, headers=headers)
+        return Response(content=body, media_type="application/json", headers=headers)
+
+    async def invalidate(self, keys=(), namespaces=()):
+        keys = list(keys)
+        self.epoch += 1
+        self.counters["invalidations"] += len(keys) + len(namespaces)
+        try:
+            await self.backend.delete(keys)
+            for namespace in namespaces:
+                await self.backend.set(self.generation_key(namespace), uuid.uuid4().hex.encode())
+        except (OSError, RedisError, asyncio.TimeoutError) as e:
+            self.error("invalidate", e)
+
+    # For sync code (the scrape savers run through run_sync on the event loop thread)
+    def invalidate_soon(self, keys=(), namespaces=()):
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            asyncio.run(self.invalidate(keys, namespaces))
+            return
+        self.epoch += 1
+        task = loop.create_task(self.invalidate(keys, namespaces))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    async def clear(self):
+        self.epoch += 1
+        await self.backend.clear()
+
+    def error(self, operation, error):
+        self.counters["errors"] += 1
+        print(f"Response cache {operation} failed ({self.backend.name}): {error!r}")
+
+    def stats(self):
+        lookups = self.counters["hits"] + self.counters["misses"]
+        return {
+            "backend": self.backend.name,
+            "entries": self.backend.size(),
+            **self.counters,
+            "hit_ratio": round(self.counters["hits"] / lookups, 4) if lookups else None,
+        }
+
+response_cache = ResponseCache(backend_from_env())
+
+# SERIALIZATION
+@lru_cache(maxsize=None)
+def adapter(schema):
+    return TypeAdapter(schema)
+
+def to_json(schema, value):
+    return adapter(schema).dump_json(adapter(schema).validate_python(value, from_attributes=True))
+
+# CATALOG KEYS
+# compatible-films lists embed films, so they are also stamped with the "films" generation
+# (and compatible-cameras with "cameras")
+def camera_key(camera_id):
+    return f"cameras:{camera_id}"
+
+def compatible_films_key(camera_id):
+    return f"cameras:{camera_id}:compatible-films"
+
+def film_key(film_id):
+    return f"films:{film_id}"
+
+def compatible_cameras_key(film_id):
+    return f"films:{film_id}:compatible-cameras"
+
+def tag_key(tag_id):
+    return f"tags:{tag_id}"
+
+def camera_keys(camera_ids):
+    return [key for camera_id in camera_ids for key in (camera_key(camera_id), compatible_films_key(camera_id))]
+
+def film_keys(film_ids):
+    return [key for film_id in film_ids for key in (film_key(film_id), compatible_cameras_key(film_id))]
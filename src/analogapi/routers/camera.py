@@ -1,10 +1,23 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
-from ..database import get_session 
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional, Union
+from ..conditional import catalog_etag, catalog_validators
+from ..batch import plan_batch, write_batch
+from ..database import get_db
+from ..loaders import with_tags
+from ..filters import camera_facets, conditions, facet_counts
+from ..response_cache import response_cache, to_json, camera_key, compatible_films_key, camera_keys
+from ..serialization import item_select, item_dicts, json_response
+from ..pagination import paginate_sorted, sort_pattern, stream_ndjson, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from ..similarity import camera_similarity, load_scored, SIMILAR_TOP_K
 from ..models.camera import Camera
 from ..models.film import Film
-from ..schemas.camera import CameraCreate, CameraOut
+from ..models.format import format_compatibility
+from ..schemas.camera import CameraBatch, CameraCreate, CameraOut, CameraPage
+from ..schemas.batch import BatchResult
+from ..schemas.recommendation import CameraRecommendation
 from ..schemas.film import FilmOut
 
 router = APIRouter(
@@ -13,81 +26,147 @@ router = APIRouter(
     responses={404: {"description": "Not found"}},
 )
 
-def get_db():
-    db = get_session()() 
-    try:
-        yield db
-    finally:
-        db.close()
-
 # CREATES CAMERA
 @router.post("/", response_model=CameraOut)
-def create_camera(camera: CameraCreate, db: Session = Depends(get_db)):
-    if camera.tag_ids:
-        existing_tags = db.query(Tag).filter(Tag.id.in_(camera.tag_ids)).count()
-        if existing_tags != len(camera.tag_ids):
-            raise HTTPException(status_code=404, detail="One or more tags not found")
-
+async def create_camera(camera: CameraCreate, db: AsyncSession = Depends(get_db)):
+    tags = await find_tags(db, camera.tag_ids) if camera.tag_ids else []
     db_camera = Camera(**camera.model_dump(exclude={"tag_ids"}))
-    if camera.tag_ids:
-        db_camera.tags = db.query(Tag).filter(Tag.id.in_(camera.tag_ids)).all()
+    db_camera.tags = tags
     db.add(db_camera)
-    db.commit()
-    db.refresh(db_camera)
+    await commit_or_conflict(db)
+    camera_similarity.mark_changed([db_camera.id])
+    await response_cache.invalidate(namespaces=["cameras"])
     return db_camera
 
+# BATCH CREATE/UPDATE/DELETE
+# Per-item results; the items that pass their checks are written together and committed once
+@router.post("/batch", response_model=BatchResult)
+async def batch_cameras(batch: CameraBatch, db: AsyncSession = Depends(get_db)):
+    plan = await plan_batch(db, Camera, batch)
+    written = await write_batch(db, plan)
+    if written:
+        camera_similarity.mark_changed(written)
+        await response_cache.invalidate(camera_keys([*plan.ids("update"), *plan.ids("delete")]), namespaces=["cameras"])
+    return {"results": plan.results}
+
+# SORTABLE FIELDS: field -> (attribute, value used for NULLs)
+CAMERA_SORTS = {"brand": ("brand", ""), "model": ("model", ""), "format": ("format", ""), "type": ("type", ""), "years": ("years", "")}
+
 # GET ALL CAMERAS
-@router.get("/", response_model=List[CameraOut])
-def get_all_cameras(db: Session = Depends(get_db)):
-    return db.query(Camera).all()
+@router.get("/", response_model=Union[List[CameraOut], CameraPage], dependencies=[Depends(catalog_etag)])
+async def get_all_cameras(
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[int] = Query(None, ge=0),
+    cursor: Optional[str] = None,
+    sort: str = Query("id", pattern=sort_pattern(CAMERA_SORTS)),
+    format: Optional[List[str]] = Query(None),
+    type: Optional[List[str]] = Query(None),
+    brand: Optional[List[str]] = Query(None),
+    lens_mount: Optional[List[str]] = Query(None),
+    tag_ids: Optional[List[int]] = Query(None),
+    facets: bool = False,
+    stream: bool = False,
+    db: AsyncSession = Depends(get_db)
+):
+    filters = camera_facets(format, type, brand, lens_mount, tag_ids)
+    if stream:
+        return stream_ndjson(Camera, CameraOut, after, conditions(filters), dict(response.headers))
+    # Fast path: rows straight to orjson (the response_model still documents the shape)
+    query = item_select(Camera, CameraOut).where(*conditions(filters))
+    rows = await paginate_sorted(db, query, Camera, response, CAMERA_SORTS, sort, after, cursor, limit)
+    items = item_dicts(rows, CameraOut)
+    if facets:
+        return json_response({"items": items, "facets": await facet_counts(db, Camera, filters)}, response)
+    return json_response(items, response)
 
 # GET CAMERA BY ID
+# Served from the response cache; a hit doesn't touch the database
 @router.get("/{camera_id}", response_model=CameraOut)
-def get_camera_by_id(camera_id: int, db: Session = Depends(get_db)):
-    db_camera = db.query(Camera).filter(Camera.id == camera_id).first()
-    if db_camera is None:
-        raise HTTPException(status_code=404, detail="Camera not found")
-    return db_camera
+async def get_camera_by_id(camera_id: int, request: Request, db: AsyncSession = Depends(get_db)):
+    async def build():
+        headers = await catalog_validators(db)
+        db_camera = (await db.scalars(with_tags(select(Camera), Camera, "joined").where(Camera.id == camera_id))).unique().first()
+        if db_camera is None:
+            raise HTTPException(status_code=404, detail="Camera not found")
+        return headers, to_json(CameraOut, db_camera)
+
+    return await response_cache.serve(request, camera_key(camera_id), build)
 
 # EDIT CAMERA
 @router.put("/{camera_id}", response_model=CameraOut)
-def update_camera(camera_id: int, camera: CameraCreate, db: Session = Depends(get_db)):
-    db_camera = db.query(Camera).filter(Camera.id == camera_id).first()
+async def update_camera(camera_id: int, camera: CameraCreate, db: AsyncSession = Depends(get_db)):
+    db_camera = (await db.scalars(with_tags(select(Camera), Camera).where(Camera.id == camera_id))).first()
     if db_camera is None:
         raise HTTPException(status_code=404, detail="Camera not found")
 
-    if camera.tag_ids:
-        existing_tags = db.query(Tag).filter(Tag.id.in_(camera.tag_ids)).count()
-        if existing_tags != len(camera.tag_ids):
-            raise HTTPException(status_code=404, detail="One or more tags not found")
-
+    tags = await find_tags(db, camera.tag_ids) if camera.tag_ids else None
     for key, value in camera.model_dump(exclude={"tag_ids"}).items():
         setattr(db_camera, key, value)
-    if camera.tag_ids:
-        db_camera.tags = db.query(Tag).filter(Tag.id.in_(camera.tag_ids)).all()
-    db.commit()
-    db.refresh(db_camera)
+    if tags is not None:
+        db_camera.tags = tags
+    await commit_or_conflict(db)
+    camera_similarity.mark_changed([camera_id])
+    await response_cache.invalidate(camera_keys([camera_id]), namespaces=["cameras"])
     return db_camera
 
 # DELETE CAMERA
 @router.delete("/{camera_id}")
-def delete_camera(camera_id: int, db: Session = Depends(get_db)):
-    db_camera = db.query(Camera).filter(Camera.id == camera_id).first()
+async def delete_camera(camera_id: int, db: AsyncSession = Depends(get_db)):
+    db_camera = await db.get(Camera, camera_id)
     if db_camera is None:
         raise HTTPException(status_code=404, detail="Camera not found")
-    db.delete(db_camera)
-    db.commit()
+    await db.delete(db_camera)
+    await db.commit()
+    camera_similarity.mark_changed([camera_id])
+    await response_cache.invalidate(camera_keys([camera_id]), namespaces=["cameras"])
     return {"message": f"Camera with id {camera_id} deleted successfully"}
 
 # GET COMPATIBLE FILMS/CAMERAS
 @router.get("/{camera_id}/compatible-films", response_model=List[FilmOut])
-def get_compatible_films(camera_id: int, db: Session = Depends(get_db)):
-    db_camera = db.query(Camera).filter(Camera.id == camera_id).first()
-    if db_camera is None:
+async def get_compatible_films(camera_id: int, request: Request, db: AsyncSession = Depends(get_db)):
+    async def build():
+        headers = await catalog_validators(db)
+        # One query through the precomputed format compatibility; the outer joins keep a row
+        # (with no film) for a camera that has no compatible films, so a missing camera is no rows
+        query = (
+            select(Camera.id, Film)
+            .outerjoin(format_compatibility, format_compatibility.c.camera_format_id == Camera.format_id)
+            .outerjoin(Film, Film.format_id == format_compatibility.c.film_format_id)
+            .where(Camera.id == camera_id)
+            .order_by(Film.id)
+        )
+        rows = (await db.execute(with_tags(query, Film))).all()
+        if not rows:
+            raise HTTPException(status_code=404, detail="Camera not found")
+        return headers, to_json(List[FilmOut], [film for _, film in rows if film is not None])
+
+    return await response_cache.serve(request, compatible_films_key(camera_id), build, namespace="films")
+
+# GET SIMILAR CAMERAS
+# Served from the in-memory similarity index (tags, format, type, lens mount and co-favorites)
+@router.get("/{camera_id}/similar", response_model=List[CameraRecommendation])
+async def get_similar_cameras(camera_id: int, limit: int = Query(10, ge=1, le=SIMILAR_TOP_K), db: AsyncSession = Depends(get_db)):
+    neighbors = await camera_similarity.similar(db, camera_id, limit)
+    if neighbors is None:
         raise HTTPException(status_code=404, detail="Camera not found")
+    return await load_scored(db, Camera, neighbors)
+
+# NATURAL KEY CONFLICTS
+async def commit_or_conflict(db: AsyncSession):
+    try:
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(status_code=400, detail="Camera with this brand and model already exists")
 
-    compatible_films = db.query(Film).filter(Film.format == db_camera.format).all()
-    return compatible_films
+# TAGS BY ID
+# One query; 404 unless every id exists
+async def find_tags(db: AsyncSession, tag_ids: List[int]):
+    tags = list(await db.scalars(select(Tag).where(Tag.id.in_(tag_ids))))
+    if len(tags) != len(set(tag_ids)):
+        raise HTTPException(status_code=404, detail="One or more tags not found")
+    return tags
 
 # IMPORT TAGS
-from ..models.tag import Tag
\ No newline at end of file
+from ..models.tag import Tag
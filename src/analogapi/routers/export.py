@@ -0,0 +1,25 @@
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
+from typing import Literal
+from ..export import ENCODERS, export_stream, export_filename, parquet_available
+
+router = APIRouter(
+    prefix="/export",
+    tags=["export"],
+)
+
+# FULL EXPORT (CSV, NDJSON OR PARQUET), OPTIONALLY GZIPPED
+# Streamed as it is read, for data-warehouse loads; see export.py
+@router.get("/{kind}")
+async def export(
+    kind: Literal["cameras", "films", "tags", "favorites"],
+    format: Literal["csv", "ndjson", "parquet"] = "csv",
+    gzip: bool = False,
+):
+    if format == "parquet" and not parquet_available():
+        raise HTTPException(status_code=501, detail="Parquet export needs pyarrow (pip install pyarrow)")
+    return StreamingResponse(
+        export_stream(kind, format, gzip),
+        media_type="application/gzip" if gzip else ENCODERS[format].media_type,
+        headers={"Content-Disposition": f'attachment; filename="{export_filename(kind, format, gzip)}"'},
+    )
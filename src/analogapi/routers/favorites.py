@@ -1,11 +1,12 @@
 # src/analogapi/routers/favorites.py
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.sql import select, delete
 from ..database import get_db
 from ..models.user import User
 from ..models.camera import Camera, favorite_cameras
 from ..models.film import Film, favorite_films 
+from ..similarity import camera_similarity, film_similarity
 from ..schemas.favorite_camera import FavoriteCameraCreate, FavoriteCameraOut
 from ..schemas.favorite_film import FavoriteFilmCreate, FavoriteFilmOut
 
@@ -16,12 +17,12 @@ router = APIRouter(
 )
 
 @router.post("/cameras/{camera_id}", response_model=FavoriteCameraOut)
-def add_favorite_camera(camera_id: int, user_id: int, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.id == user_id).first()
+async def add_favorite_camera(camera_id: int, user_id: int, db: AsyncSession = Depends(get_db)):
+    user = await db.get(User, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    camera = db.query(Camera).filter(Camera.id == camera_id).first()
+    camera = await db.get(Camera, camera_id)
     if not camera:
         raise HTTPException(status_code=404, detail="Camera not found")
 
@@ -29,23 +30,24 @@ def add_favorite_camera(camera_id: int, user_id: int, db: Session = Depends(get_
         favorite_cameras.c.user_id == user_id,
         favorite_cameras.c.camera_id == camera_id
     )
-    favorite = db.execute(query).fetchone()
+    favorite = (await db.execute(query)).fetchone()
     if favorite:
         raise HTTPException(status_code=400, detail="Camera already in favorites")
 
     insert_stmt = favorite_cameras.insert().values(user_id=user_id, camera_id=camera_id)
-    result = db.execute(insert_stmt)
-    db.commit()
+    result = await db.execute(insert_stmt)
+    await db.commit()
+    camera_similarity.mark_changed([camera_id])
 
     return {"id": result.inserted_primary_key[0] if result.inserted_primary_key else None, "user_id": user_id, "camera_id": camera_id}
 
 @router.post("/films/{film_id}", response_model=FavoriteFilmOut)
-def add_favorite_film(film_id: int, user_id: int, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.id == user_id).first()
+async def add_favorite_film(film_id: int, user_id: int, db: AsyncSession = Depends(get_db)):
+    user = await db.get(User, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    film = db.query(Film).filter(Film.id == film_id).first()
+    film = await db.get(Film, film_id)
     if not film:
         raise HTTPException(status_code=404, detail="Film not found")
 
@@ -53,23 +55,24 @@ def add_favorite_film(film_id: int, user_id: int, db: Session = Depends(get_db))
         favorite_films.c.user_id == user_id,
         favorite_films.c.film_id == film_id
     )
-    favorite = db.execute(query).fetchone()
+    favorite = (await db.execute(query)).fetchone()
     if favorite:
         raise HTTPException(status_code=400, detail="Film already in favorites")
 
     insert_stmt = favorite_films.insert().values(user_id=user_id, film_id=film_id)
-    result = db.execute(insert_stmt)
-    db.commit()
+    result = await db.execute(insert_stmt)
+    await db.commit()
+    film_similarity.mark_changed([film_id])
 
     return {"id": result.inserted_primary_key[0] if result.inserted_primary_key else None, "user_id": user_id, "film_id": film_id}
 
 @router.delete("/cameras/{camera_id}")
-def remove_favorite_camera(camera_id: int, user_id: int, db: Session = Depends(get_db)):
+async def remove_favorite_camera(camera_id: int, user_id: int, db: AsyncSession = Depends(get_db)):
     query = select(favorite_cameras).where(
         favorite_cameras.c.user_id == user_id,
         favorite_cameras.c.camera_id == camera_id
     )
-    favorite = db.execute(query).fetchone()
+    favorite = (await db.execute(query)).fetchone()
     if not favorite:
         raise HTTPException(status_code=404, detail="Favorite camera not found")
 
@@ -77,17 +80,18 @@ def remove_favorite_camera(camera_id: int, user_id: int, db: Session = Depends(g
         favorite_cameras.c.user_id == user_id,
         favorite_cameras.c.camera_id == camera_id
     )
-    db.execute(delete_stmt)
-    db.commit()
+    await db.execute(delete_stmt)
+    await db.commit()
+    camera_similarity.mark_changed([camera_id])
     return {"message": "Camera removed from favorites"}
 
 @router.delete("/films/{film_id}")
-def remove_favorite_film(film_id: int, user_id: int, db: Session = Depends(get_db)):
+async def remove_favorite_film(film_id: int, user_id: int, db: AsyncSession = Depends(get_db)):
     query = select(favorite_films).where(
         favorite_films.c.user_id == user_id,
         favorite_films.c.film_id == film_id
     )
-    favorite = db.execute(query).fetchone()
+    favorite = (await db.execute(query)).fetchone()
     if not favorite:
         raise HTTPException(status_code=404, detail="Favorite film not found")
 
@@ -95,6 +99,7 @@ def remove_favorite_film(film_id: int, user_id: int, db: Session = Depends(get_d
         favorite_films.c.user_id == user_id,
         favorite_films.c.film_id == film_id
     )
-    db.execute(delete_stmt)
-    db.commit()
+    await db.execute(delete_stmt)
+    await db.commit()
+    film_similarity.mark_changed([film_id])
     return {"message": "Film removed from favorites"}
\ No newline at end of file
@@ -1,10 +1,23 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
-from ..database import get_session 
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional, Union
+from ..conditional import catalog_etag, catalog_validators
+from ..batch import plan_batch, write_batch
+from ..database import get_db
+from ..loaders import with_tags
+from ..filters import film_facets, conditions, facet_counts
+from ..response_cache import response_cache, to_json, film_key, compatible_cameras_key, film_keys
+from ..serialization import item_select, item_dicts, json_response
+from ..pagination import paginate_sorted, sort_pattern, stream_ndjson, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from ..similarity import film_similarity, load_scored, SIMILAR_TOP_K
 from ..models.film import Film
 from ..models.camera import Camera
-from ..schemas.film import FilmCreate, FilmOut
+from ..models.format import format_compatibility
+from ..schemas.film import FilmBatch, FilmCreate, FilmOut, FilmPage
+from ..schemas.batch import BatchResult
+from ..schemas.recommendation import FilmRecommendation
 from ..schemas.camera import CameraOut
 
 router = APIRouter(
@@ -13,81 +26,148 @@ router = APIRouter(
     responses={404: {"description": "Not found"}},
 )
 
-def get_db():
-    db = get_session()() 
-    try:
-        yield db
-    finally:
-        db.close()
-
 # CREATES FILM
 @router.post("/", response_model=FilmOut)
-def create_film(film: FilmCreate, db: Session = Depends(get_db)):
-    if film.tag_ids:
-        existing_tags = db.query(Tag).filter(Tag.id.in_(film.tag_ids)).count()
-        if existing_tags != len(film.tag_ids):
-            raise HTTPException(status_code=404, detail="One or more tags not found")
-
+async def create_film(film: FilmCreate, db: AsyncSession = Depends(get_db)):
+    tags = await find_tags(db, film.tag_ids) if film.tag_ids else []
     db_film = Film(**film.model_dump(exclude={"tag_ids"}))
-    if film.tag_ids:
-        db_film.tags = db.query(Tag).filter(Tag.id.in_(film.tag_ids)).all()
+    db_film.tags = tags
     db.add(db_film)
-    db.commit()
-    db.refresh(db_film)
+    await commit_or_conflict(db)
+    film_similarity.mark_changed([db_film.id])
+    await response_cache.invalidate(namespaces=["films"])
     return db_film
 
+# BATCH CREATE/UPDATE/DELETE
+# Per-item results; the items that pass their checks are written together and committed once
+@router.post("/batch", response_model=BatchResult)
+async def batch_films(batch: FilmBatch, db: AsyncSession = Depends(get_db)):
+    plan = await plan_batch(db, Film, batch)
+    written = await write_batch(db, plan)
+    if written:
+        film_similarity.mark_changed(written)
+        await response_cache.invalidate(film_keys([*plan.ids("update"), *plan.ids("delete")]), namespaces=["films"])
+    return {"results": plan.results}
+
+# SORTABLE FIELDS: field -> (attribute, value used for NULLs); iso sorts numerically
+FILM_SORTS = {"brand": ("brand", ""), "name": ("name", ""), "format": ("format", ""), "type": ("color", ""), "grain": ("grain", ""), "iso": ("iso_value", 0)}
+
 # GET ALL FILM STOCK
-@router.get("/", response_model=List[FilmOut])
-def get_all_films(db: Session = Depends(get_db)):
-    return db.query(Film).all()
+@router.get("/", response_model=Union[List[FilmOut], FilmPage], dependencies=[Depends(catalog_etag)])
+async def get_all_films(
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[int] = Query(None, ge=0),
+    cursor: Optional[str] = None,
+    sort: str = Query("id", pattern=sort_pattern(FILM_SORTS)),
+    format: Optional[List[str]] = Query(None),
+    type: Optional[List[str]] = Query(None),
+    grain: Optional[List[str]] = Query(None),
+    brand: Optional[List[str]] = Query(None),
+    iso_min: Optional[int] = Query(None, ge=0),
+    iso_max: Optional[int] = Query(None, ge=0),
+    tag_ids: Optional[List[int]] = Query(None),
+    facets: bool = False,
+    stream: bool = False,
+    db: AsyncSession = Depends(get_db)
+):
+    filters = film_facets(format, type, grain, brand, iso_min, iso_max, tag_ids)
+    if stream:
+        return stream_ndjson(Film, FilmOut, after, conditions(filters), dict(response.headers))
+    # Fast path: rows straight to orjson (the response_model still documents the shape)
+    query = item_select(Film, FilmOut).where(*conditions(filters))
+    rows = await paginate_sorted(db, query, Film, response, FILM_SORTS, sort, after, cursor, limit)
+    items = item_dicts(rows, FilmOut)
+    if facets:
+        return json_response({"items": items, "facets": await facet_counts(db, Film, filters)}, response)
+    return json_response(items, response)
 
 # GET FILM BY ID
+# Served from the response cache; a hit doesn't touch the database
 @router.get("/{film_id}", response_model=FilmOut)
-def get_film_by_id(film_id: int, db: Session = Depends(get_db)):
-    db_film = db.query(Film).filter(Film.id == film_id).first()
-    if db_film is None:
-        raise HTTPException(status_code=404, detail="Film stock not found")
-    return db_film
+async def get_film_by_id(film_id: int, request: Request, db: AsyncSession = Depends(get_db)):
+    async def build():
+        headers = await catalog_validators(db)
+        db_film = (await db.scalars(with_tags(select(Film), Film, "joined").where(Film.id == film_id))).unique().first()
+        if db_film is None:
+            raise HTTPException(status_code=404, detail="Film stock not found")
+        return headers, to_json(FilmOut, db_film)
+
+    return await response_cache.serve(request, film_key(film_id), build)
 
 # EDIT FILMS
 @router.put("/{film_id}", response_model=FilmOut)
-def update_film(film_id: int, film: FilmCreate, db: Session = Depends(get_db)):
-    db_film = db.query(Film).filter(Film.id == film_id).first()
+async def update_film(film_id: int, film: FilmCreate, db: AsyncSession = Depends(get_db)):
+    db_film = (await db.scalars(with_tags(select(Film), Film).where(Film.id == film_id))).first()
     if db_film is None:
         raise HTTPException(status_code=404, detail="Film stock not found")
 
-    if film.tag_ids:
-        existing_tags = db.query(Tag).filter(Tag.id.in_(film.tag_ids)).count()
-        if existing_tags != len(film.tag_ids):
-            raise HTTPException(status_code=404, detail="One or more tags not found")
-
+    tags = await find_tags(db, film.tag_ids) if film.tag_ids else None
     for key, value in film.model_dump(exclude={"tag_ids"}).items():
         setattr(db_film, key, value)
-    if film.tag_ids:
-        db_film.tags = db.query(Tag).filter(Tag.id.in_(film.tag_ids)).all()
-    db.commit()
-    db.refresh(db_film)
+    if tags is not None:
+        db_film.tags = tags
+    await commit_or_conflict(db)
+    film_similarity.mark_changed([film_id])
+    await response_cache.invalidate(film_keys([film_id]), namespaces=["films"])
     return db_film
 
 # DELETE FILM
 @router.delete("/{film_id}")
-def delete_film(film_id: int, db: Session = Depends(get_db)):
-    db_film = db.query(Film).filter(Film.id == film_id).first()
+async def delete_film(film_id: int, db: AsyncSession = Depends(get_db)):
+    db_film = await db.get(Film, film_id)
     if db_film is None:
         raise HTTPException(status_code=404, detail="Film stock not found")
-    db.delete(db_film)
-    db.commit()
+    await db.delete(db_film)
+    await db.commit()
+    film_similarity.mark_changed([film_id])
+    await response_cache.invalidate(film_keys([film_id]), namespaces=["films"])
     return {"message": f"Film stock with id {film_id} deleted successfully"}
 
 # GET COMPATIBLE CAMERA/FILM
 @router.get("/{film_id}/compatible-cameras", response_model=List[CameraOut])
-def get_compatible_cameras(film_id: int, db: Session = Depends(get_db)):
-    db_film = db.query(Film).filter(Film.id == film_id).first()
-    if db_film is None:
+async def get_compatible_cameras(film_id: int, request: Request, db: AsyncSession = Depends(get_db)):
+    async def build():
+        headers = await catalog_validators(db)
+        # Mirror of GET /cameras/{camera_id}/compatible-films
+        query = (
+            select(Film.id, Camera)
+            .outerjoin(format_compatibility, format_compatibility.c.film_format_id == Film.format_id)
+            .outerjoin(Camera, Camera.format_id == format_compatibility.c.camera_format_id)
+            .where(Film.id == film_id)
+            .order_by(Camera.id)
+        )
+        rows = (await db.execute(with_tags(query, Camera))).all()
+        if not rows:
+            raise HTTPException(status_code=404, detail="Film stock not found")
+        return headers, to_json(List[CameraOut], [camera for _, camera in rows if camera is not None])
+
+    return await response_cache.serve(request, compatible_cameras_key(film_id), build, namespace="cameras")
+
+# GET SIMILAR FILMS
+# Served from the in-memory similarity index (tags, format, colour, ISO, grain and co-favorites)
+@router.get("/{film_id}/similar", response_model=List[FilmRecommendation])
+async def get_similar_films(film_id: int, limit: int = Query(10, ge=1, le=SIMILAR_TOP_K), db: AsyncSession = Depends(get_db)):
+    neighbors = await film_similarity.similar(db, film_id, limit)
+    if neighbors is None:
         raise HTTPException(status_code=404, detail="Film stock not found")
+    return await load_scored(db, Film, neighbors)
+
+# NATURAL KEY CONFLICTS
+async def commit_or_conflict(db: AsyncSession):
+    try:
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(status_code=400, detail="Film stock with this brand, name and format already exists")
 
-    compatible_cameras = db.query(Camera).filter(Camera.format == db_film.format).all()
-    return compatible_cameras
+# TAGS BY ID
+# One query; 404 unless every id exists
+async def find_tags(db: AsyncSession, tag_ids: List[int]):
+    tags = list(await db.scalars(select(Tag).where(Tag.id.in_(tag_ids))))
+    if len(tags) != len(set(tag_ids)):
+        raise HTTPException(status_code=404, detail="One or more tags not found")
+    return tags
 
 # IMPORT TAGS
-from ..models.tag import Tag
\ No newline at end of file
+from ..models.tag import Tag
@@ -0,0 +1,23 @@
+from fastapi import APIRouter, Depends, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Literal
+from ..database import get_db
+from ..importer import import_catalog
+from ..schemas.imports import ImportReport
+
+router = APIRouter(
+    prefix="/import",
+    tags=["import"],
+)
+
+# BULK IMPORT (CSV OR NDJSON BODY, OPTIONALLY GZIPPED)
+# The body is streamed into a staging table with COPY and merged in one transaction; see importer.py
+@router.post("/{kind}", response_model=ImportReport)
+async def import_items(
+    kind: Literal["cameras", "films"],
+    request: Request,
+    format: Literal["csv", "ndjson"] = "csv",
+    gzip: bool = False,
+    db: AsyncSession = Depends(get_db),
+):
+    return await import_catalog(db, kind, format, request.stream(), gzip)
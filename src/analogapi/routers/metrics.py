@@ -0,0 +1,18 @@
+from fastapi import APIRouter
+from ..database import get_pool_metrics
+from ..response_cache import response_cache
+
+router = APIRouter(
+    prefix="/metrics",
+    tags=["metrics"],
+)
+
+# CONNECTION POOL METRICS
+@router.get("/pool")
+def pool_metrics():
+    return get_pool_metrics()
+
+# RESPONSE CACHE METRICS
+@router.get("/cache")
+def cache_metrics():
+    return response_cache.stats()
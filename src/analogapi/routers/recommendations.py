@@ -1,13 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
-from ..auth import get_current_user, get_db
-from ..models.user import User
+from ..auth import get_current_user
+from ..collaborative import collaborative_recommendations
+from ..database import get_db
+from ..loaders import with_tags
+from ..recommender import camera_recommendations, film_recommendations, get_tags, RECOMMENDATION_LIMIT
+from ..schemas.user import CurrentUser
 from ..models.camera import Camera as CameraModel
 from ..models.film import Film as FilmModel
-from ..schemas.camera import CameraOut
-from ..schemas.film import FilmOut
-from sqlalchemy import or_
+from ..schemas.recommendation import CameraRecommendation, FilmRecommendation
+
+MAX_RECOMMENDATIONS = 100
 
 router = APIRouter(
     prefix="/recommendations",
@@ -15,61 +19,48 @@ router = APIRouter(
     responses={404: {"description": "Not found"}},
 )
 
-@router.get("/cameras", response_model=List[CameraOut])
-def recommend_cameras(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    preferences = db.query(UserPreferences).filter(UserPreferences.user_id == current_user.id).first()
+# Top results by score, best first; nothing matching is an empty list, not a 404
+async def ranked(db: AsyncSession, query, model):
+    if query is None:
+        return []
+    results = []
+    for item, score in (await db.execute(with_tags(query, model))).all():
+        item.score = score
+        results.append(item)
+    return results
+
+@router.get("/cameras", response_model=List[CameraRecommendation])
+async def recommend_cameras(
+    limit: int = Query(RECOMMENDATION_LIMIT, ge=1, le=MAX_RECOMMENDATIONS),
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    results = await collaborative_recommendations(db, current_user.id, "cameras", limit)
+    if results:
+        return results
+
+    # Cold start: no favorites-based list yet, rank by the user's preferences instead
+    preferences = current_user.preferences
     if not preferences:
         raise HTTPException(status_code=404, detail="User preferences not found")
 
-    query = db.query(CameraModel)
-
-    if preferences.preferred_format:
-        query = query.filter(CameraModel.format == preferences.preferred_format)
-
-    if preferences.preferred_camera_type:
-        query = query.filter(CameraModel.type == preferences.preferred_camera_type)
-
-    if preferences.favorite_photography_type:
-        tag_conditions = [Tag.name.ilike(f"%{photo_type}%") for photo_type in preferences.favorite_photography_type]
-        query = query.join(CameraModel.tags).filter(or_(*tag_conditions))
-
-    if preferences.preferred_focal_length:
-        query = query.join(CameraModel.tags).filter(Tag.name.ilike(f"%{preferences.preferred_focal_length}%"))
-
-    cameras = query.all()
-    if not cameras:
-        raise HTTPException(status_code=404, detail="No cameras found matching your preferences")
-    return cameras
-
-@router.get("/films", response_model=List[FilmOut])
-def recommend_films(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    preferences = db.query(UserPreferences).filter(UserPreferences.user_id == current_user.id).first()
+    query = camera_recommendations(preferences, await get_tags(db), limit)
+    return await ranked(db, query, CameraModel)
+
+@router.get("/films", response_model=List[FilmRecommendation])
+async def recommend_films(
+    limit: int = Query(RECOMMENDATION_LIMIT, ge=1, le=MAX_RECOMMENDATIONS),
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    results = await collaborative_recommendations(db, current_user.id, "films", limit)
+    if results:
+        return results
+
+    # Cold start: no favorites-based list yet, rank by the user's preferences instead
+    preferences = current_user.preferences
     if not preferences:
         raise HTTPException(status_code=404, detail="User preferences not found")
 
-    query = db.query(FilmModel)
-
-    if preferences.preferred_format:
-        query = query.filter(FilmModel.format == preferences.preferred_format)
-
-    if preferences.color_preference:
-        if preferences.color_preference.lower() == "color":
-            query = query.filter(FilmModel.type == "Color")
-        elif preferences.color_preference.lower() == "black_and_white":
-            query = query.filter(FilmModel.type == "B&W")
-
-    if preferences.favorite_photography_type:
-        tag_conditions = [Tag.name.ilike(f"%{photo_type}%") for photo_type in preferences.favorite_photography_type]
-        query = query.join(FilmModel.tags).filter(or_(*tag_conditions))
-
-    if preferences.favourite_look:
-        query = query.join(FilmModel.tags).filter(Tag.name.ilike(f"%{preferences.favourite_look}%"))
-
-    films = query.all()
-    if not films:
-        raise HTTPException(status_code=404, detail="No films found matching your preferences")
-    return films
-
-# IMPORTS NECESARIOS
-from ..models.user_preferences import UserPreferences
-from ..models.tag import Tag
\ No newline at end of file
+    query = film_recommendations(preferences, await get_tags(db), limit)
+    return await ranked(db, query, FilmModel)
@@ -1,8 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from ..database import get_db
-from ..scrapers.scrape_cameras import scrape_cameras, save_scraped_cameras
-from ..scrapers.scrape_films import scrape_films, save_scraped_films
+from typing import Optional
+from fastapi import APIRouter, HTTPException, status
+from ..database import get_async_session
+from ..jobs import job_manager
+from ..models.camera import Camera
+from ..models.film import Film
+from ..similarity import similarity_indexes
+from ..scrapers.incremental import load_scrape_state, touch_scraped, SCRAPE_FRESHNESS_HOURS
+from ..scrapers.scrape_cameras import camera_wiki_crawler, crawl_cameras, save_scraped_cameras
+from ..scrapers.scrape_films import crawl_films, film_crawler, save_scraped_films
 
 router = APIRouter(
     prefix="/scrape",
@@ -10,35 +15,99 @@ router = APIRouter(
     responses={404: {"description": "Not found"}},
 )
 
-@router.post("/cameras")
-def scrape_and_save_cameras(
+# SCRAPE JOB RUNNERS
+# The job owns its crawler and DB session, so nothing is tied to the POST request that queued it
+async def run_scrape_job(job, model, crawl, new_crawler, save, incremental, freshness_hours, **params):
+    state = None
+    if incremental:
+        async with get_async_session()() as db:
+            state = await db.run_sync(load_scrape_state, model, freshness_hours)
+
+    crawler = new_crawler()
+    job.set_stage("scraping")
+    try:
+        items = await crawl(crawler=crawler, progress=job.report, state=state, **params)
+    finally:
+        job.counts["fetch"] = dict(crawler.stats)
+        job.errors.extend(crawler.errors)
+    job.counts["scraped"] = len(items)
+    if state:
+        job.counts["fresh"] = len(state.fresh)
+        job.counts["unchanged"] = len(state.unchanged)
+
+    job.set_stage("saving", total=len(items))
+    changed = []
+    async with get_async_session()() as db:
+        # The savers take a sync Session; run_sync hands them one bound to this job's connection
+        job.counts.update(await db.run_sync(save, items, changed=changed))
+        if state:
+            await db.run_sync(touch_scraped, model, state.unchanged)
+    # Only rows the upserts inserted or changed are re-indexed; touch_scraped leaves features alone
+    if changed:
+        similarity_indexes[model].mark_changed(changed)
+    job.report(len(items))
+
+async def scrape_cameras_job(job, max_cameras_per_category, max_categories, incremental, freshness_hours):
+    await run_scrape_job(job, Camera, crawl_cameras, camera_wiki_crawler, save_scraped_cameras, incremental, freshness_hours,
+                         max_cameras_per_category=max_cameras_per_category, max_categories=max_categories)
+
+async def scrape_films_job(job, max_films, incremental, freshness_hours):
+    await run_scrape_job(job, Film, crawl_films, film_crawler, save_scraped_films, incremental, freshness_hours, max_films=max_films)
+
+def job_response(job, created):
+    data = job.to_dict()
+    if not created:
+        data["message"] = f"A {job.type} job is already {job.status}"
+    return data
+
+@router.post("/cameras", status_code=status.HTTP_202_ACCEPTED)
+async def scrape_and_save_cameras(
     max_cameras_per_category: int = 10,
     max_categories: int = 10,
-    db: Session = Depends(get_db)
+    incremental: bool = False,
+    freshness_hours: Optional[float] = None,
 ):
     if max_cameras_per_category <= 0:
         raise HTTPException(status_code=400, detail="max_cameras_per_category must be a positive integer")
     if max_categories <= 0:
         raise HTTPException(status_code=400, detail="max_categories must be a positive integer")
 
-    try:
-        cameras = scrape_cameras(max_cameras_per_category, max_categories)
-        save_scraped_cameras(db, cameras)
-        return {"message": f"Scraped and saved {len(cameras)} cameras"}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error during scraping: {str(e)}")
-
-@router.post("/films")
-def scrape_and_save_films(
+    job, created = job_manager.submit(
+        "cameras", scrape_cameras_job, max_cameras_per_category=max_cameras_per_category, max_categories=max_categories,
+        incremental=incremental, freshness_hours=freshness_hours if freshness_hours is not None else SCRAPE_FRESHNESS_HOURS,
+    )
+    return job_response(job, created)
+
+@router.post("/films", status_code=status.HTTP_202_ACCEPTED)
+async def scrape_and_save_films(
     max_films: int = 100,  # Cambiado a max_films
-    db: Session = Depends(get_db)
+    incremental: bool = False,
+    freshness_hours: Optional[float] = None,
 ):
     if max_films <= 0:
         raise HTTPException(status_code=400, detail="max_films must be a positive integer")
 
-    try:
-        films = scrape_films(max_films)
-        save_scraped_films(db, films)
-        return {"message": f"Scraped and saved {len(films)} films"}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error during scraping: {str(e)}")
\ No newline at end of file
+    job, created = job_manager.submit(
+        "films", scrape_films_job, max_films=max_films,
+        incremental=incremental, freshness_hours=freshness_hours if freshness_hours is not None else SCRAPE_FRESHNESS_HOURS,
+    )
+    return job_response(job, created)
+
+# SCRAPE JOBS
+@router.get("/jobs")
+async def get_scrape_jobs():
+    return [job.to_dict() for job in job_manager.list()]
+
+@router.get("/jobs/{job_id}")
+async def get_scrape_job(job_id: str):
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
+
+@router.delete("/jobs/{job_id}")
+async def cancel_scrape_job(job_id: str):
+    job = await job_manager.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
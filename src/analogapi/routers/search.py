@@ -0,0 +1,29 @@
+from fastapi import APIRouter, Depends, Query, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Literal, Optional
+from ..database import get_db
+from ..search import search, SEARCH_LIMIT, SEARCH_TARGETS
+from ..schemas.search import SearchResult
+
+MAX_SEARCH_LIMIT = 100
+
+router = APIRouter(
+    prefix="/search",
+    tags=["search"],
+)
+
+# RANKED SEARCH OVER CAMERAS, FILMS AND TAGS
+# Pages by offset: a full page sets X-Next-Offset
+@router.get("", response_model=List[SearchResult])
+async def search_catalog(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=200),
+    kind: Optional[Literal["cameras", "films", "tags"]] = None,
+    limit: int = Query(SEARCH_LIMIT, ge=1, le=MAX_SEARCH_LIMIT),
+    offset: int = Query(0, ge=0),
+    db: AsyncSession = Depends(get_db),
+):
+    results = await search(db, q, [kind] if kind else tuple(SEARCH_TARGETS), limit, offset)
+    if len(results) == limit:
+        response.headers["X-Next-Offset"] = str(offset + limit)
+    return results
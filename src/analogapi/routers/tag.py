@@ -1,9 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Request
+from sqlalchemy import select, any_
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
-from ..database import get_session  
-from ..models.tag import Tag
-from ..schemas.tag import TagCreate, TagOut
+from ..batch import plan_batch, write_batch, id_array
+from ..conditional import catalog_etag, catalog_validators
+from ..database import get_db
+from ..models.tag import Tag, camera_tags, film_tags
+from ..recommender import invalidate_tags
+from ..response_cache import response_cache, to_json, tag_key, camera_keys, film_keys
+from ..similarity import camera_similarity, film_similarity
+from ..schemas.tag import TagBatch, TagCreate, TagOut
+from ..schemas.batch import BatchResult
 
 router = APIRouter(
     prefix="/tags",
@@ -11,59 +18,94 @@ router = APIRouter(
     responses={404: {"description": "Not found"}},
 )
 
-def get_db():
-    db = get_session()() 
-    try:
-        yield db
-    finally:
-        db.close()
-
 # CREATE TAGS
 @router.post("/", response_model=TagOut)
-def create_tag(tag: TagCreate, db: Session = Depends(get_db)):
-    existing_tag = db.query(Tag).filter(Tag.name == tag.name).first()
+async def create_tag(tag: TagCreate, db: AsyncSession = Depends(get_db)):
+    existing_tag = await db.scalar(select(Tag).where(Tag.name == tag.name))
     if existing_tag:
         raise HTTPException(status_code=400, detail="Tag already exists")
     db_tag = Tag(**tag.model_dump())
     db.add(db_tag)
-    db.commit()
-    db.refresh(db_tag)
+    await db.commit()
+    invalidate_tags()
     return db_tag
 
 # GET ALL TAGS
-@router.get("/", response_model=List[TagOut])
-def get_all_tags(db: Session = Depends(get_db)):
-    return db.query(Tag).all()
+@router.get("/", response_model=List[TagOut], dependencies=[Depends(catalog_etag)])
+async def get_all_tags(db: AsyncSession = Depends(get_db)):
+    return (await db.scalars(select(Tag))).all()
 
 # GET TAG BY ID
+# Served from the response cache; a hit doesn't touch the database
 @router.get("/{tag_id}", response_model=TagOut)
-def get_tag_by_id(tag_id: int, db: Session = Depends(get_db)):
-    db_tag = db.query(Tag).filter(Tag.id == tag_id).first()
-    if db_tag is None:
-        raise HTTPException(status_code=404, detail="Tag not found")
-    return db_tag
+async def get_tag_by_id(tag_id: int, request: Request, db: AsyncSession = Depends(get_db)):
+    async def build():
+        headers = await catalog_validators(db)
+        db_tag = await db.get(Tag, tag_id)
+        if db_tag is None:
+            raise HTTPException(status_code=404, detail="Tag not found")
+        return headers, to_json(TagOut, db_tag)
+
+    return await response_cache.serve(request, tag_key(tag_id), build)
 
 # EDIT TAG
 @router.put("/{tag_id}", response_model=TagOut)
-def update_tag(tag_id: int, tag: TagCreate, db: Session = Depends(get_db)):
-    db_tag = db.query(Tag).filter(Tag.id == tag_id).first()
+async def update_tag(tag_id: int, tag: TagCreate, db: AsyncSession = Depends(get_db)):
+    db_tag = await db.get(Tag, tag_id)
     if db_tag is None:
         raise HTTPException(status_code=404, detail="Tag not found")
-    existing_tag = db.query(Tag).filter(Tag.name == tag.name, Tag.id != tag_id).first()
+    existing_tag = await db.scalar(select(Tag).where(Tag.name == tag.name, Tag.id != tag_id))
     if existing_tag:
         raise HTTPException(status_code=400, detail="Tag name already exists")
     for key, value in tag.model_dump().items():
         setattr(db_tag, key, value)
-    db.commit()
-    db.refresh(db_tag)
+    # Cameras and films embed their tags
+    camera_ids, film_ids = await tagged_items(db, [tag_id])
+    await db.commit()
+    invalidate_tags()
+    await invalidate_tag_responses([tag_id], camera_ids, film_ids)
     return db_tag
 
 # DELETE TAG
 @router.delete("/{tag_id}")
-def delete_tag(tag_id: int, db: Session = Depends(get_db)):
-    db_tag = db.query(Tag).filter(Tag.id == tag_id).first()
+async def delete_tag(tag_id: int, db: AsyncSession = Depends(get_db)):
+    db_tag = await db.get(Tag, tag_id)
     if db_tag is None:
         raise HTTPException(status_code=404, detail="Tag not found")
-    db.delete(db_tag)
-    db.commit()
-    return {"message": f"Tag with id {tag_id} deleted successfully"}
\ No newline at end of file
+    # Items losing the tag change their similarity features and responses
+    camera_ids, film_ids = await tagged_items(db, [tag_id])
+    await db.delete(db_tag)
+    await db.commit()
+    invalidate_tags()
+    camera_similarity.mark_changed(camera_ids)
+    film_similarity.mark_changed(film_ids)
+    await invalidate_tag_responses([tag_id], camera_ids, film_ids)
+    return {"message": f"Tag with id {tag_id} deleted successfully"}
+
+# BATCH CREATE/UPDATE/DELETE
+# Per-item results; the items that pass their checks are written together and committed once
+@router.post("/batch", response_model=BatchResult)
+async def batch_tags(batch: TagBatch, db: AsyncSession = Depends(get_db)):
+    plan = await plan_batch(db, Tag, batch)
+    # Items embedding a renamed tag change their responses; those losing a tag also their similarity
+    renamed = await tagged_items(db, plan.ids("update"))
+    removed = await tagged_items(db, plan.ids("delete"))
+    written = await write_batch(db, plan)
+    if written:
+        invalidate_tags()
+        camera_similarity.mark_changed(removed[0])
+        film_similarity.mark_changed(removed[1])
+        await invalidate_tag_responses(written, [*renamed[0], *removed[0]], [*renamed[1], *removed[1]])
+    return {"results": plan.results}
+
+# TAGGED ITEMS
+async def tagged_items(db: AsyncSession, tag_ids: List[int]):
+    if not tag_ids:
+        return [], []
+    camera_ids = list(await db.scalars(select(camera_tags.c.camera_id.distinct()).where(camera_tags.c.tag_id == any_(id_array(tag_ids)))))
+    film_ids = list(await db.scalars(select(film_tags.c.film_id.distinct()).where(film_tags.c.tag_id == any_(id_array(tag_ids)))))
+    return camera_ids, film_ids
+
+async def invalidate_tag_responses(tag_ids, camera_ids, film_ids):
+    namespaces = (["cameras"] if camera_ids else []) + (["films"] if film_ids else [])
+    await response_cache.invalidate([*map(tag_key, tag_ids), *camera_keys(camera_ids), *film_keys(film_ids)], namespaces)
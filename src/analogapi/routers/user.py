@@ -1,10 +1,13 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
-from ..auth import get_password_hash, create_access_token, get_current_user, get_db, verify_password, ACCESS_TOKEN_EXPIRE_MINUTES
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..auth import create_access_token, get_current_user, invalidate_user, ACCESS_TOKEN_EXPIRE_MINUTES
+from ..hashing import hashing_service
+from ..database import get_db
 from ..models.user import User
 from ..models.user_preferences import UserPreferences
-from ..schemas.user import UserCreate, UserOut
+from ..schemas.user import UserCreate, UserOut, CurrentUser
 from ..schemas.user_preferences import UserPreferencesCreate, UserPreferencesOut
 from datetime import timedelta
 
@@ -15,38 +18,46 @@ router = APIRouter(
 )
 
 @router.post("/register", response_model=UserOut)
-def register_user(user: UserCreate, db: Session = Depends(get_db)):
+async def register_user(user: UserCreate, db: AsyncSession = Depends(get_db)):
     # Verificar si el usuario ya existe
-    existing_user = db.query(User).filter(User.username == user.username).first()
+    existing_user = await db.scalar(select(User).where(User.username == user.username))
     if existing_user:
         raise HTTPException(status_code=400, detail="Username already registered")
-    existing_email = db.query(User).filter(User.email == user.email).first()
+    existing_email = await db.scalar(select(User).where(User.email == user.email))
     if existing_email:
         raise HTTPException(status_code=400, detail="Email already registered")
 
     # Crear el nuevo usuario
-    hashed_password = get_password_hash(user.password)
+    # bcrypt is CPU-bound, it runs on the bounded hashing pool
+    hashed_password = await hashing_service.hash(user.password)
     db_user = User(
         username=user.username,
         email=user.email,
         hashed_password=hashed_password
     )
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
     return db_user
 
 @router.post("/login")
-def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_db)):
     # Verificar las credenciales del usuario
-    user = db.query(User).filter(User.username == form_data.username).first()
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    user = await db.scalar(select(User).where(User.username == form_data.username))
+    valid, new_hash = (False, None)
+    if user:
+        valid, new_hash = await hashing_service.verify_and_update(form_data.password, user.hashed_password)
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
 
+    # Rehash transparently when BCRYPT_ROUNDS changed since the password was stored
+    if new_hash:
+        user.hashed_password = new_hash
+        await db.commit()
+
     # Generar un token JWT
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
@@ -55,13 +66,13 @@ def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depend
     return {"access_token": access_token, "token_type": "bearer"}
 
 @router.get("/me", response_model=UserOut)
-def read_users_me(current_user: User = Depends(get_current_user)):
+async def read_users_me(current_user: CurrentUser = Depends(get_current_user)):
     return current_user
 
 @router.post("/preferences", response_model=UserPreferencesOut)
-def create_preferences(preferences: UserPreferencesCreate, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def create_preferences(preferences: UserPreferencesCreate, current_user: CurrentUser = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
     # Verificar si el usuario ya tiene preferencias
-    existing_preferences = db.query(UserPreferences).filter(UserPreferences.user_id == current_user.id).first()
+    existing_preferences = await db.scalar(select(UserPreferences).where(UserPreferences.user_id == current_user.id))
     if existing_preferences:
         raise HTTPException(status_code=400, detail="User already has preferences")
 
@@ -75,25 +86,24 @@ def create_preferences(preferences: UserPreferencesCreate, current_user: User =
         favourite_look=preferences.favourite_look
     )
     db.add(db_preferences)
-    db.commit()
-    db.refresh(db_preferences)
+    await db.commit()
+    invalidate_user(current_user.username)
     return db_preferences
 
 @router.put("/preferences", response_model=UserPreferencesOut)
-def update_preferences(preferences: UserPreferencesCreate, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    db_preferences = db.query(UserPreferences).filter(UserPreferences.user_id == current_user.id).first()
+async def update_preferences(preferences: UserPreferencesCreate, current_user: CurrentUser = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+    db_preferences = await db.scalar(select(UserPreferences).where(UserPreferences.user_id == current_user.id))
     if not db_preferences:
         raise HTTPException(status_code=404, detail="User preferences not found")
 
     for key, value in preferences.dict(exclude_unset=True).items():
         setattr(db_preferences, key, value)
-    db.commit()
-    db.refresh(db_preferences)
+    await db.commit()
+    invalidate_user(current_user.username)
     return db_preferences
 
 @router.get("/preferences", response_model=UserPreferencesOut)
-def get_preferences(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    db_preferences = db.query(UserPreferences).filter(UserPreferences.user_id == current_user.id).first()
-    if not db_preferences:
+async def get_preferences(current_user: CurrentUser = Depends(get_current_user)):
+    if not current_user.preferences:
         raise HTTPException(status_code=404, detail="User preferences not found")
-    return db_preferences
\ No newline at end of file
+    return current_user.preferences
@@ -0,0 +1,14 @@
+from pydantic import BaseModel
+from typing import List, Literal, Optional
+
+# One entry per batch item: index into its create/update/delete list, and the status and detail
+# the single-item endpoint would have answered with (200 when written)
+class BatchItemResult(BaseModel):
+    action: Literal["create", "update", "delete"]
+    index: int
+    id: Optional[int] = None
+    status: int
+    detail: Optional[str] = None
+
+class BatchResult(BaseModel):
+    results: List[BatchItemResult]
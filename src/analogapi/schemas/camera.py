@@ -1,5 +1,6 @@
 from pydantic import BaseModel, ConfigDict
-from typing import List, Optional
+from typing import Dict, List, Optional
+from .facet import FacetValue
 
 class CameraBase(BaseModel):
     brand: str
@@ -12,6 +13,15 @@ class CameraBase(BaseModel):
 class CameraCreate(CameraBase):
     tag_ids: Optional[List[int]] = None
 
+class CameraUpdate(CameraCreate):
+    id: int
+
+# POST /cameras/batch
+class CameraBatch(BaseModel):
+    create: List[CameraCreate] = []
+    update: List[CameraUpdate] = []
+    delete: List[int] = []
+
 class CameraOut(CameraBase):
     id: int
     tags: List["TagOut"] = []
@@ -19,4 +29,9 @@ class CameraOut(CameraBase):
     model_config = ConfigDict(from_attributes=True)
 
 from .tag import TagOut
-CameraOut.model_rebuild()
\ No newline at end of file
+CameraOut.model_rebuild()
+
+# GET /cameras?facets=true: the page plus per-value counts for every filter
+class CameraPage(BaseModel):
+    items: List[CameraOut]
+    facets: Dict[str, List[FacetValue]]
\ No newline at end of file
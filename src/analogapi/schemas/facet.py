@@ -0,0 +1,8 @@
+from pydantic import BaseModel
+from typing import Optional, Union
+
+class FacetValue(BaseModel):
+    value: Union[int, str]
+    count: int
+    # Display name when value is an id (tags)
+    label: Optional[str] = None
\ No newline at end of file
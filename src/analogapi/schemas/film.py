@@ -1,5 +1,6 @@
 from pydantic import BaseModel, Field, ConfigDict
-from typing import List, Optional
+from typing import Dict, List, Optional
+from .facet import FacetValue
 
 class FilmBase(BaseModel):
     brand: str
@@ -12,6 +13,15 @@ class FilmBase(BaseModel):
 class FilmCreate(FilmBase):
     tag_ids: Optional[List[int]] = None
 
+class FilmUpdate(FilmCreate):
+    id: int
+
+# POST /films/batch
+class FilmBatch(BaseModel):
+    create: List[FilmCreate] = []
+    update: List[FilmUpdate] = []
+    delete: List[int] = []
+
 class FilmOut(FilmBase):
     id: int
     tags: List["TagOut"] = []
@@ -19,4 +29,9 @@ class FilmOut(FilmBase):
     model_config = ConfigDict(from_attributes=True)
 
 from .tag import TagOut
-FilmOut.model_rebuild()
\ No newline at end of file
+FilmOut.model_rebuild()
+
+# GET /films?facets=true: the page plus per-value counts for every filter
+class FilmPage(BaseModel):
+    items: List[FilmOut]
+    facets: Dict[str, List[FacetValue]]
\ No newline at end of file
@@ -0,0 +1,15 @@
+from pydantic import BaseModel
+from typing import List
+
+class ImportRejection(BaseModel):
+    row: int
+    error: str
+
+# POST /import/{kind}: rows by outcome; errors lists the first IMPORT_MAX_ERRORS rejected rows
+class ImportReport(BaseModel):
+    rows: int
+    inserted: int
+    updated: int
+    unchanged: int
+    rejected: int
+    errors: List[ImportRejection]
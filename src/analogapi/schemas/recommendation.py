@@ -0,0 +1,8 @@
+from .camera import CameraOut
+from .film import FilmOut
+
+class CameraRecommendation(CameraOut):
+    score: float
+
+class FilmRecommendation(FilmOut):
+    score: float
@@ -0,0 +1,8 @@
+from pydantic import BaseModel
+from typing import Literal
+
+class SearchResult(BaseModel):
+    kind: Literal["cameras", "films", "tags"]
+    id: int
+    title: str
+    score: float
\ No newline at end of file
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, ConfigDict
-from typing import List, Optional
+from typing import List
 
 class TagBase(BaseModel):
     name: str
@@ -7,6 +7,15 @@ class TagBase(BaseModel):
 class TagCreate(TagBase):
     pass
 
+class TagUpdate(TagCreate):
+    id: int
+
+# POST /tags/batch
+class TagBatch(BaseModel):
+    create: List[TagCreate] = []
+    update: List[TagUpdate] = []
+    delete: List[int] = []
+
 class TagOut(TagBase):
     id: int
 
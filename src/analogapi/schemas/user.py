@@ -1,4 +1,6 @@
 from pydantic import BaseModel, EmailStr
+from typing import Optional
+from .user_preferences import UserPreferencesOut
 
 class UserBase(BaseModel):
     username: str
@@ -11,4 +13,12 @@ class UserOut(UserBase):
     id: int
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+# SNAPSHOT CACHED BY auth.get_current_user (shared between requests, so read-only)
+class CurrentUser(UserOut):
+    preferences: Optional[UserPreferencesOut] = None
+
+    class Config:
+        from_attributes = True
+        frozen = True
@@ -80,4 +80,5 @@ class UserPreferencesOut(UserPreferencesBase):
     user_id: int
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+        use_enum_values = True
\ No newline at end of file
@@ -0,0 +1,119 @@
+import asyncio
+import random
+import time
+from urllib.parse import urlsplit
+import httpx
+
+DEFAULT_HEADERS = {"User-Agent": "AnalogAPI-Scraper/1.0 (pablofriedmann; https://github.com/pablofriedmann/analogAPI)"}
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# TOKEN BUCKET RATE LIMITER
+class TokenBucket:
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+# ASYNC CRAWLER
+# Bounded concurrency, one token bucket per host, keep-alive connections and retry with backoff.
+# A crawler is one run: every URL is fetched at most once, and with an HTTPCache pages
+# kept from earlier runs are revalidated with ETag/Last-Modified instead of downloaded again.
+class AsyncCrawler:
+    def __init__(self, concurrency=8, rate=2.0, burst=4, retries=3, backoff=0.5, timeout=10, headers=None, verify=True,
+                 cache=None):
+        self.concurrency = concurrency
+        self.rate = rate
+        self.burst = burst
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.headers = headers or DEFAULT_HEADERS
+        self.verify = verify
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.buckets = {}
+        self.client = None
+        self.cache = cache
+        self.memo = {}
+        self.errors = []
+        self.requests_made = 0
+        self.stats = {"downloaded": 0, "not_modified": 0, "cache_hits": 0, "memo_hits": 0}
+
+    async def __aenter__(self):
+        limits = httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency)
+        self.client = httpx.AsyncClient(
+            headers=self.headers,
+            timeout=self.timeout,
+            verify=self.verify,
+            limits=limits,
+            follow_redirects=True,
+        )
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.client.aclose()
+
+    def bucket_for(self, url):
+        host = urlsplit(url).netloc
+        if host not in self.buckets:
+            self.buckets[host] = TokenBucket(self.rate, self.burst)
+        return self.buckets[host]
+
+    async def get(self, url, headers=None):
+        bucket = self.bucket_for(url)
+        for attempt in range(self.retries + 1):
+            async with self.semaphore:
+                await bucket.acquire()
+                self.requests_made += 1
+                try:
+                    response = await self.client.get(url, headers=headers)
+                except httpx.TransportError as e:
+                    if attempt == self.retries:
+                        raise
+                    print(f"Transport error for {url} ({e}), retrying ({attempt + 1}/{self.retries})")
+                else:
+                    if response.status_code not in RETRY_STATUSES or attempt == self.retries:
+                        if response.status_code != 304:
+                            response.raise_for_status()
+                        return response
+                    print(f"Got {response.status_code} for {url}, retrying ({attempt + 1}/{self.retries})")
+            # Exponential backoff with jitter, outside the semaphore so other fetches keep going
+            await asyncio.sleep(self.backoff * (2 ** attempt) * (0.5 + random.random()))
+
+    async def fetch(self, url):
+        if url in self.memo:
+            self.stats["memo_hits"] += 1
+        else:
+            self.memo[url] = asyncio.ensure_future(self.fetch_uncached(url))
+        return await self.memo[url]
+
+    async def fetch_uncached(self, url):
+        entry = self.cache.lookup(url) if self.cache else None
+        if entry and self.cache.is_fresh(entry):
+            self.stats["cache_hits"] += 1
+            return self.cache.read(entry)
+
+        response = await self.get(url, headers=self.cache.conditional_headers(entry) if entry else None)
+        if response.status_code == 304 and entry:
+            self.stats["not_modified"] += 1
+            entry = self.cache.revalidated(entry, response.headers)
+            return self.cache.read(entry)
+        if response.status_code == 304:
+            response.raise_for_status()
+
+        self.stats["downloaded"] += 1
+        if self.cache:
+            self.cache.store(url, response.headers, response.text)
+        return response.text
@@ -0,0 +1,154 @@
+import hashlib
+import json
+import os
+import re
+import time
+from pathlib import Path
+
+# HTTP CACHE SETTINGS (ENVIRONMENT)
+# An empty SCRAPER_CACHE_DIR disables the cache
+SCRAPER_CACHE_DIR = os.getenv("SCRAPER_CACHE_DIR", ".scraper_cache")
+SCRAPER_CACHE_MAX_BYTES = int(os.getenv("SCRAPER_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+# Seconds a stored page is served without asking the server again, unless the response set max-age
+SCRAPER_CACHE_TTL = int(os.getenv("SCRAPER_CACHE_TTL", "0"))
+
+MAX_AGE_RE = re.compile(r"max-age=(\d+)")
+
+def sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+# ON-DISK HTTP CACHE
+# index/<sha256(url)>.json holds the validators and points to objects/<sha256(body)>,
+# so identical bodies are stored once. Entry mtimes track recency for LRU eviction.
+class HTTPCache:
+    def __init__(self, directory=SCRAPER_CACHE_DIR, max_bytes=SCRAPER_CACHE_MAX_BYTES, ttl=SCRAPER_CACHE_TTL):
+        self.directory = Path(directory)
+        self.index_dir = self.directory / "index"
+        self.objects_dir = self.directory / "objects"
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        self.objects_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.size = None
+
+    def entry_path(self, url):
+        return self.index_dir / f"{sha256(url.encode())}.json"
+
+    def object_path(self, digest):
+        return self.objects_dir / digest[:2] / digest
+
+    def lookup(self, url):
+        try:
+            entry = json.loads(self.entry_path(url).read_text())
+        except (OSError, ValueError):
+            return None
+        if not self.object_path(entry["body"]).exists():
+            return None
+        return entry
+
+    def is_fresh(self, entry):
+        return time.time() < entry["stored_at"] + entry["max_age"]
+
+    def read(self, entry):
+        # Reading an entry makes it the most recently used
+        os.utime(self.entry_path(entry["url"]))
+        return self.object_path(entry["body"]).read_bytes().decode("utf-8")
+
+    def store(self, url, headers, text):
+        body = text.encode("utf-8")
+        digest = sha256(body)
+        path = self.object_path(digest)
+        if not path.exists():
+            path.parent.mkdir(exist_ok=True)
+            self.write_atomic(path, body)
+            if self.size is not None:
+                self.size += len(body)
+
+        cache_control = headers.get("cache-control", "").lower()
+        max_age = MAX_AGE_RE.search(cache_control)
+        entry = {
+            "url": url,
+            "body": digest,
+            "etag": headers.get("etag"),
+            "last_modified": headers.get("last-modified"),
+            "stored_at": time.time(),
+            "max_age": 0 if "no-cache" in cache_control else int(max_age.group(1)) if max_age else self.ttl,
+        }
+        self.write_atomic(self.entry_path(url), json.dumps(entry).encode())
+        self.evict()
+        return entry
+
+    def revalidated(self, entry, headers):
+        # A 304 may carry new validators or freshness
+        entry = dict(entry)
+        entry["etag"] = headers.get("etag") or entry["etag"]
+        entry["last_modified"] = headers.get("last-modified") or entry["last_modified"]
+        entry["stored_at"] = time.time()
+        self.write_atomic(self.entry_path(entry["url"]), json.dumps(entry).encode())
+        return entry
+
+    def conditional_headers(self, entry):
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def write_atomic(self, path, data):
+        # Write then rename, so a concurrent reader never sees half a file
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+
+    def total_size(self):
+        if self.size is None:
+            self.size = sum(path.stat().st_size for path in self.objects_dir.glob("*/*"))
+        return self.size
+
+    # LRU EVICTION
+    # Drops bodies no entry points to any more (a page re-stored with new content), then the
+    # least recently used entries until the stored bodies fit in max_bytes
+    def evict(self):
+        if self.total_size() <= self.max_bytes:
+            return
+        entries = []
+        for path in self.index_dir.glob("*.json"):
+            try:
+                entries.append((path.stat().st_mtime, path, json.loads(path.read_text())["body"]))
+            except (OSError, ValueError, KeyError):
+                path.unlink(missing_ok=True)
+        entries.sort()
+
+        references = {}
+        for _, _, digest in entries:
+            references[digest] = references.get(digest, 0) + 1
+        for object_path in self.objects_dir.glob("*/*"):
+            # Dot files are another writer's bodies still being written
+            if object_path.name in references or object_path.name.startswith("."):
+                continue
+            try:
+                self.size -= object_path.stat().st_size
+                object_path.unlink()
+            except OSError:
+                pass
+        for _, path, digest in entries:
+            if self.size <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            references[digest] -= 1
+            if references[digest] == 0:
+                object_path = self.object_path(digest)
+                try:
+                    self.size -= object_path.stat().st_size
+                    object_path.unlink()
+                except OSError:
+                    pass
+
+    def clear(self):
+        for path in list(self.index_dir.glob("*.json")) + list(self.objects_dir.glob("*/*")):
+            path.unlink(missing_ok=True)
+        self.size = 0
+
+def default_cache():
+    return HTTPCache() if SCRAPER_CACHE_DIR else None
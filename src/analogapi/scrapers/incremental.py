@@ -0,0 +1,65 @@
+import hashlib
+import json
+import os
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import select, func, update
+from sqlalchemy.orm import Session
+
+# INCREMENTAL SCRAPE SETTINGS (ENVIRONMENT)
+SCRAPE_FRESHNESS_HOURS = float(os.getenv("SCRAPE_FRESHNESS_HOURS", "24"))
+
+def content_hash(content):
+    if not isinstance(content, str):
+        content = json.dumps(content, sort_keys=True)
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+def as_utc(value):
+    # cameras.scraped_at is naive UTC, films.scraped_at is timezone-aware
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+
+# SCRAPE STATE
+# What the last scrapes stored: when each source_url was scraped and the content hashes seen.
+# The crawl records which URLs it skipped as fresh and which hashes came back unchanged.
+class ScrapeState:
+    def __init__(self, scraped_at=None, hashes=None, freshness_hours=SCRAPE_FRESHNESS_HOURS):
+        self.scraped_at = scraped_at or {}
+        self.hashes = hashes or set()
+        self.cutoff = datetime.now(timezone.utc) - timedelta(hours=freshness_hours)
+        self.fresh = []
+        self.unchanged = []
+
+    def is_fresh(self, url):
+        scraped_at = self.scraped_at.get(url)
+        if scraped_at is not None and scraped_at >= self.cutoff:
+            self.fresh.append(url)
+            return True
+        return False
+
+    def is_unchanged(self, digest):
+        if digest in self.hashes:
+            self.unchanged.append(digest)
+            return True
+        return False
+
+def load_scrape_state(db: Session, model, freshness_hours=SCRAPE_FRESHNESS_HOURS):
+    scraped_at = {
+        source_url: as_utc(last_scraped)
+        for source_url, last_scraped in db.execute(
+            select(model.source_url, func.max(model.scraped_at))
+            .where(model.source_url.isnot(None), model.scraped_at.isnot(None))
+            .group_by(model.source_url)
+        )
+    }
+    hashes = set(db.scalars(select(model.content_hash).where(model.content_hash.isnot(None)).distinct()))
+    return ScrapeState(scraped_at, hashes, freshness_hours)
+
+# Unchanged rows keep their data but count as scraped now, so they stay inside the freshness window
+def touch_scraped(db: Session, model, hashes):
+    if not hashes:
+        return 0
+    scraped_at = datetime.now(timezone.utc)
+    if not model.__table__.c.scraped_at.type.timezone:
+        scraped_at = scraped_at.replace(tzinfo=None)
+    result = db.execute(update(model).where(model.content_hash.in_(hashes)).values(scraped_at=scraped_at))
+    db.commit()
+    return result.rowcount
@@ -0,0 +1,513 @@
+import asyncio
+import multiprocessing
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+import lxml.html
+
+# PARSE POOL SETTINGS (ENVIRONMENT)
+# PARSE_WORKERS=0 parses inline on the calling thread
+PARSE_WORKERS = int(os.getenv("PARSE_WORKERS", str(os.cpu_count() or 1)))
+
+CAMERA_WIKI_URL = "https://camera-wiki.org"
+WIKIPEDIA_URL = "https://en.wikipedia.org"
+KNOWN_BRANDS = [
+    "Canon", "Nikon", "Hasselblad", "Pentax", "Mamiya", "Kodak", "Fujifilm", "Ilford", "Minox", "Polaroid",
+    "Ricoh", "Agfa", "Argus", "Ansco", "Agilux", "Acro", "Adler", "Firstline", "Capital", "Accuraflex"
+]
+KNOWN_MOUNTS = [
+    "canon fd", "canon ef", "nikon f", "pentax k", "hasselblad v", "mamiya rb",
+    "leica m", "minolta sr", "olympus om", "contax g", "zeiss zf", "m42", "k mount",
+    "exakta", "praktica b", "rollei sl", "voigtlander bessamatic"
+]
+DESIRED_CAMERA_FORMATS = ["35mm", "110", "126", "127", "120", "Large Format", "APS", "Disc Film", "Instant", "Minox"]
+DIGITAL_KEYWORDS = ["digital camera", "digital slr", "megapixel", "ccd sensor", "cmos sensor"]
+FILM_BRAND_CORRECTIONS = {
+    "Fujifilm": ["Fujifilm", "Fuji", "Fujicolor"],
+    "Agfa": ["Agfa", "Agfa Photo", "Agfaphoto"],
+    "Ilford": ["Ilford", "Ilford Photo"],
+    "Adox": ["Adox"],
+    "Foma": ["Foma"],
+    "Konica": ["Konica"],
+    "Orwo": ["Orwo", "Original Wolfen", "Wolfen"],
+    "Polaroid": ["Polaroid"],
+    "Kodak": ["Kodak"],
+    "Cinestill": ["Cinestill"],
+    "Dubblefilm": ["Dubblefilm"],
+    "Film Washi": ["Film Washi"],
+    "Flic Film": ["Flic Film", "Flicfilm"],
+    "Harman": ["Harman"],
+    "Holga": ["Holga"],
+    "Jch": ["Jch"],
+    "Kentmere": ["Kentmere"],
+    "Kono!": ["Kono!", "Kono"],
+    "Kosmo Foto": ["Kosmo Foto"],
+    "Lomography": ["Lomography"],
+    "Lucky": ["Lucky"],
+    "Oriental": ["Oriental"],
+    "Rera": ["Rera"],
+    "Revolog": ["Revolog", "Revelog"],
+    "Rollei": ["Rollei"],
+    "Sfl": ["Sfl"],
+    "Shanghai": ["Shanghai"],
+    "Silberra": ["Silberra"],
+    "Spur": ["Spur"],
+    "Svema": ["Svema"],
+    "Tasma": ["Tasma"],
+    "Ultrafine": ["Ultrafine"],
+    "Vibe": ["Vibe"],
+    "Yodica": ["Yodica"],
+}
+
+# PRECOMPILED PATTERNS
+YEAR_RE = re.compile(r"(introduced in|produced from|released in|made from)\s+(\d{4})")
+YEAR_RANGE_RE = re.compile(r"(produced from|made from)\s+(\d{4})\s+to\s+(\d{4})")
+YEAR_SOLO_RE = re.compile(r"\b(19\d{2}|20\d{2})\b")
+LENS_MOUNT_RE = re.compile(r"lens mount\s*[:\s]*([a-zA-Z0-9\s-]+)(?=\s*(?:\.|$|\n))")
+MOUNT_RE = re.compile(r"mount\s*[:\s]*([a-zA-Z0-9\s-]+)(?=\s*(?:\.|$|\n))")
+MOUNT_PATTERNS = [
+    re.compile(r"\b(m\d+|fd|ef|f|k|v|rb|sr|om|g|zf)\b"),
+    re.compile(r"\b(leica|canon|nikon|pentax|hasselblad|mamiya|minolta|olympus|contax|zeiss)\s+[a-z0-9-]+\b"),
+]
+NUMBER_RE = re.compile(r"\d+")
+ISO_RE = re.compile(r"iso\s*(\d+)")
+INFOBOX_XPATH = ".//table[contains(concat(' ', normalize-space(@class), ' '), ' infobox ')]"
+WIKITABLE_XPATH = "//table[contains(concat(' ', normalize-space(@class), ' '), ' wikitable ')]"
+SKIP_TEXT_TAGS = {"script", "style", "template"}
+
+# TEXT HELPERS
+# Same text BeautifulSoup's get_text() gives: comments, scripts and styles are left out
+def iter_text(element):
+    if element.text:
+        yield element.text
+    for child in element:
+        if isinstance(child.tag, str) and child.tag not in SKIP_TEXT_TAGS:
+            yield from iter_text(child)
+        if child.tail:
+            yield child.tail
+
+def get_text(element, strip=False):
+    if strip:
+        return "".join(text.strip() for text in iter_text(element))
+    return "".join(iter_text(element))
+
+def first(elements):
+    return elements[0] if elements else None
+
+# PARSE POOL
+parse_pool = None
+
+def get_parse_pool():
+    global parse_pool
+    if parse_pool is None:
+        # spawn instead of fork: the API process runs threads, and forking those is unsafe
+        parse_pool = ProcessPoolExecutor(max_workers=PARSE_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return parse_pool
+
+def shutdown_parse_pool():
+    global parse_pool
+    if parse_pool is not None:
+        parse_pool.shutdown(cancel_futures=True)
+        parse_pool = None
+
+async def run_parser(fn, *args):
+    if PARSE_WORKERS <= 0:
+        return fn(*args)
+    return await asyncio.get_running_loop().run_in_executor(get_parse_pool(), fn, *args)
+
+# CAMERA-WIKI
+def is_digital_camera(content):
+    if content is not None:
+        text = get_text(content, strip=True).lower()
+        for keyword in DIGITAL_KEYWORDS:
+            if keyword in text:
+                return True
+    return False
+
+def is_not_a_camera(camera_name, camera_url):
+    name_lower = camera_name.lower()
+    url_lower = camera_url.lower()
+    if any(keyword in name_lower for keyword in ["film", "category", "template", "format", "cartridge", "encoding"]):
+        return True
+    if any(keyword in url_lower for keyword in ["category", "film", "cartridge"]):
+        return True
+    if name_lower in ["110 film", "126 film", "127 film", "120 film", "35mm film", "instant film", "dx encoding"]:
+        return True
+    if "led" in name_lower:
+        return True
+    if name_lower.isdigit() or name_lower in ["126", "110"]:
+        return True
+    return False
+
+# PARSE CATEGORY PAGE
+# Returns the (name, url) camera links on the page and the url of the next page, if any
+def parse_category_page(html, base_url=CAMERA_WIKI_URL):
+    root = lxml.html.fromstring(html)
+    camera_links = [
+        (get_text(link, strip=True), base_url + link.get("href"))
+        for link in root.xpath("//div[@id='mw-pages']//li//a[@href]")
+    ]
+    next_page = first(root.xpath("//a[contains(@href, 'pagefrom')]"))
+    next_url = base_url + next_page.get("href") if next_page is not None else None
+    return camera_links, next_url
+
+# PARSE CAMERA PAGE
+# Returns the camera data, or None when the page is not an analog camera we want
+def parse_camera_page(html, camera_name, camera_url, category_url):
+    root = lxml.html.fromstring(html)
+    content = first(root.xpath("//div[@id='mw-content-text']"))
+    if is_digital_camera(content):
+        print(f"Skipping digital camera: {camera_name} at {camera_url}")
+        return None
+
+    format = "Unknown"
+    camera_type = "Unknown"
+    years = None
+    lens_mount = None
+
+    # Inferir el formato desde la categoría
+    category_name = category_url.split("/")[-1].lower()
+    if "35mm_film" in category_name:
+        format = "35mm"
+    elif "120_film" in category_name:
+        format = "120"
+    elif "127_film" in category_name:
+        format = "127"
+    elif "110_film" in category_name:
+        format = "110"
+    elif "126_film" in category_name:
+        format = "126"
+    elif "large_format" in category_name:
+        format = "Large Format"
+    elif "aps" in category_name:
+        format = "APS"
+    elif "disc_film" in category_name:
+        format = "Disc Film"
+    elif "instant" in category_name:
+        format = "Instant"
+    elif "minox" in category_name:
+        format = "Minox"
+
+    if content is not None:
+        infobox = first(content.xpath(INFOBOX_XPATH))
+        if infobox is not None:
+            rows = infobox.xpath(".//tr")
+            for row in rows:
+                cells = row.xpath(".//td")
+                if len(cells) >= 2:
+                    label = get_text(cells[0], strip=True).lower()
+                    value = get_text(cells[1], strip=True).lower()
+                    if "format" in label and format == "Unknown":
+                        if "35mm" in value:
+                            format = "35mm"
+                        elif "medium format" in value or "120" in value:
+                            format = "120"
+                        elif "large format" in value:
+                            format = "Large Format"
+                        elif "110" in value:
+                            format = "110"
+                        elif "126" in value:
+                            format = "126"
+                        elif "127" in value:
+                            format = "127"
+                        elif "aps" in value:
+                            format = "APS"
+                        elif "disc film" in value:
+                            format = "Disc Film"
+                        elif "instant" in value or "polaroid" in value:
+                            format = "Instant"
+                        elif "minox" in value:
+                            format = "Minox"
+                        else:
+                            format = value
+                    if "type" in label:
+                        camera_type = value.title()
+                    if "years" in label or "produced" in label:
+                        years = value
+                    if "lens mount" in label:
+                        lens_mount = value.title()
+
+        paragraphs = content.xpath(".//p")
+        for p in paragraphs:
+            text = get_text(p, strip=True).lower()
+            # Extraer formato
+            if "format" in text and format == "Unknown":
+                if "35mm" in text:
+                    format = "35mm"
+                elif "medium format" in text or "120" in text:
+                    format = "120"
+                elif "large format" in text:
+                    format = "Large Format"
+                elif "110" in text:
+                    format = "110"
+                elif "126" in text:
+                    format = "126"
+                elif "127" in text:
+                    format = "127"
+                elif "aps" in text:
+                    format = "APS"
+                elif "disc film" in text:
+                    format = "Disc Film"
+                elif "instant" in text or "polaroid" in text:
+                    format = "Instant"
+                elif "minox" in text:
+                    format = "Minox"
+            if format == "Unknown":
+                if "35mm" in text:
+                    format = "35mm"
+                elif "medium format" in text or "120" in text:
+                    format = "120"
+                elif "large format" in text:
+                    format = "Large Format"
+                elif "110" in text:
+                    format = "110"
+                elif "126" in text:
+                    format = "126"
+                elif "127" in text:
+                    format = "127"
+                elif "aps" in text:
+                    format = "APS"
+                elif "disc film" in text:
+                    format = "Disc Film"
+                elif "instant" in text or "polaroid" in text:
+                    format = "Instant"
+                elif "minox" in text:
+                    format = "Minox"
+            # Extraer tipo
+            if ("type" in text or "camera" in text) and camera_type == "Unknown":
+                if "slr" in text:
+                    camera_type = "SLR"
+                elif "rangefinder" in text:
+                    camera_type = "Rangefinder"
+                elif "compact" in text or "point and shoot" in text:
+                    camera_type = "Point and Shoot"
+                elif "folding" in text:
+                    camera_type = "Folding"
+                elif "box" in text:
+                    camera_type = "Box"
+                elif "instant" in text or "polaroid" in text:
+                    camera_type = "Instant"
+                elif "tlr" in text:
+                    camera_type = "TLR"
+                elif "view camera" in text:
+                    camera_type = "View Camera"
+            # Extraer años
+            year_match = YEAR_RE.search(text)
+            if year_match and not years:
+                years = year_match.group(2)
+            range_match = YEAR_RANGE_RE.search(text)
+            if range_match and not years:
+                years = f"{range_match.group(2)}-{range_match.group(3)}"
+            if not years:
+                year_solo = YEAR_SOLO_RE.search(text)
+                if year_solo:
+                    years = year_solo.group(1)
+            # Extraer montura de lente
+            if "lens mount" in text and not lens_mount:
+                mount_match = LENS_MOUNT_RE.search(text)
+                if mount_match:
+                    lens_mount = mount_match.group(1).strip().title()[:50]
+            elif "mount" in text and not lens_mount:
+                mount_match = MOUNT_RE.search(text)
+                if mount_match:
+                    lens_mount = mount_match.group(1).strip().title()[:50]
+            if not lens_mount:
+                for mount in KNOWN_MOUNTS:
+                    if mount in text:
+                        lens_mount = mount.title()
+                        break
+            if not lens_mount:
+                for pattern in MOUNT_PATTERNS:
+                    mount_match = pattern.search(text)
+                    if mount_match:
+                        lens_mount = mount_match.group(0).title()
+                        break
+            if not lens_mount and camera_type in ["Folding", "Box", "TLR"]:
+                lens_mount = "Fixed Lens"
+
+    if format != "Unknown" and not any(desired_format in format for desired_format in DESIRED_CAMERA_FORMATS):
+        print(f"Skipping camera with non-desired format: {camera_name} (format: {format})")
+        return None
+
+    name_parts = camera_name.split(" ", 1)
+    brand = name_parts[0] if name_parts[0] in KNOWN_BRANDS else "Unknown"
+    model = name_parts[1] if len(name_parts) > 1 and name_parts[0] in KNOWN_BRANDS else camera_name
+
+    if brand.isdigit() or "film" in model.lower():
+        print(f"Skipping camera with invalid brand or model: {camera_name} ({camera_url})")
+        return None
+
+    camera_data = {
+        "brand": brand,
+        "model": model,
+        "format": format,
+        "type": camera_type,
+        "years": years,
+        "lens_mount": lens_mount,
+        "source_url": camera_url
+    }
+
+    return camera_data
+
+# WIKIPEDIA FILM LIST
+# Returns the raw cells of every film row; rows with fewer than 8 cells are not films
+def parse_film_list(html):
+    root = lxml.html.fromstring(html)
+    rows = []
+    for table in root.xpath(WIKITABLE_XPATH):
+        for row in table.xpath(".//tr")[1:]:
+            cells = row.xpath(".//td")
+            if len(cells) < 8:
+                continue
+            link = first(cells[0].xpath(".//a"))
+            rows.append({
+                "maker": get_text(cells[0], strip=True),
+                "name": get_text(cells[1], strip=True),
+                "type": get_text(cells[4], strip=True).lower(),
+                "process": get_text(cells[5], strip=True),
+                "iso": get_text(cells[6], strip=True),
+                "formats": get_text(cells[7], strip=True).lower(),
+                "grain": get_text(cells[8], strip=True).lower() if len(cells) > 8 else "Unknown",
+                "brand_href": link.get("href") if link is not None else None,
+            })
+    return rows
+
+# Whole brand page text, lowercased and without spaces, as the color/ISO/format fallbacks expect
+def parse_brand_page(html):
+    return get_text(lxml.html.fromstring(html)).replace(" ", "").lower()
+
+def match_format(text):
+    if "35mm" in text or "35 mm" in text:
+        return "35mm"
+    elif "120" in text:
+        return "120"
+    elif "110" in text:
+        return "110"
+    elif "126" in text:
+        return "126"
+    elif "127" in text:
+        return "127"
+    elif "instant" in text or "polaroid" in text:
+        return "Instant"
+    elif "sheetfilm" in text or "largeformat" in text:
+        return "Large Format"
+    return "Unknown"
+
+# PARSE FILM ROW
+# brand_page_text feeds the fallbacks for color, ISO and format; without it they stay "Unknown"
+def parse_film_row(row, source_url, brand_page_text=None):
+    extracted_maker = row["maker"]
+    name = row["name"] if row["name"] else "Unknown"
+    type_film = row["type"]
+    process = row["process"]
+    iso = row["iso"]
+    formats = row["formats"]
+    grain = row["grain"]
+
+    brand = (extracted_maker if extracted_maker else "Unknown").strip().title()
+    normalized_brand = "Unknown"
+    for known_brand, aliases in FILM_BRAND_CORRECTIONS.items():
+        if any(alias.lower() in brand.lower() for alias in aliases):
+            normalized_brand = known_brand
+            break
+    brand = normalized_brand
+    if brand == "Unknown":
+        brand = extracted_maker.strip().title()
+
+    color = "Unknown"
+    name_cleaned = name.replace(" ", "").lower()
+    type_film_cleaned = type_film.replace(" ", "").lower()
+    process_cleaned = process.replace(" ", "").lower()
+    if ("colornegative" in type_film_cleaned or
+        "colorreversal" in type_film_cleaned or
+        "colorslide" in type_film_cleaned or
+        "color" in type_film_cleaned or
+        "color" in name_cleaned or
+        "c-41" in process_cleaned or
+        "e-6" in process_cleaned):
+        color = "Color"
+    elif ("blackandwhite" in type_film_cleaned or
+          "b&w" in type_film_cleaned or
+          "b/w" in type_film_cleaned or
+          "monochrome" in type_film_cleaned or
+          "b&w" in name_cleaned or
+          "b/w" in name_cleaned or
+          "b&w" in process_cleaned or
+          "b/w" in process_cleaned):
+        color = "Black and White"
+
+    if "slidefilm" in type_film_cleaned or "slide" in name_cleaned:
+        color = "Slide Film"
+    elif "cinefilm" in type_film_cleaned or "cine" in name_cleaned or "motionpicture" in type_film_cleaned or "motionpicture" in name_cleaned:
+        color = "Cine Film"
+
+    if color == "Unknown" and brand_page_text:
+        if "colornegative" in brand_page_text or "colorreversal" in brand_page_text or "colorslide" in brand_page_text or "color" in brand_page_text or "c-41" in brand_page_text or "e-6" in brand_page_text:
+            color = "Color"
+        elif "blackandwhite" in brand_page_text or "b&w" in brand_page_text or "b/w" in brand_page_text or "monochrome" in brand_page_text:
+            color = "Black and White"
+
+    iso_value = "Unknown"
+    iso_match = NUMBER_RE.search(iso)
+    if iso_match:
+        iso_value = iso_match.group()
+
+    if iso_value == "Unknown":
+        iso_match = ISO_RE.search(formats.replace(" ", "").lower())
+        if iso_match:
+            iso_value = iso_match.group(1)
+
+    if iso_value == "Unknown":
+        iso_match = NUMBER_RE.search(name_cleaned)
+        if iso_match:
+            iso_value = iso_match.group()
+
+    if iso_value == "Unknown" and brand_page_text:
+        iso_match = ISO_RE.search(brand_page_text)
+        if iso_match:
+            iso_value = iso_match.group(1)
+
+    format_value = "Unknown"
+    for fmt in formats.split(","):
+        format_value = match_format(fmt.strip().replace(" ", "").lower())
+        if format_value != "Unknown":
+            break
+
+    if format_value == "Unknown":
+        format_value = match_format(formats.replace(" ", "").lower())
+
+    if format_value == "Unknown" and brand_page_text:
+        format_value = match_format(brand_page_text)
+
+    grain_value = "Unknown"
+    if "fine" in grain or "very fine" in grain:
+        grain_value = "Fine"
+    elif "medium" in grain or "medium-fine" in grain:
+        grain_value = "Medium"
+    elif "coarse" in grain:
+        grain_value = "Coarse"
+
+    return {
+        "brand": brand,
+        "name": name,
+        "format": format_value,
+        "color": color,
+        "iso": iso_value,
+        "grain": grain_value,
+        "source_url": source_url
+    }
+
+def needs_brand_page(row, film_data):
+    return bool(row["brand_href"]) and "Unknown" in (film_data["color"], film_data["iso"], film_data["format"])
+
+# Parses the list page and its first max_films films in one pool task
+def parse_film_page(html, source_url, max_films):
+    films = []
+    for row in parse_film_list(html):
+        if len(films) >= max_films:
+            break
+        try:
+            films.append((row, parse_film_row(row, source_url)))
+        except Exception as e:
+            print(f"Error processing film row: {e}")
+    return films
@@ -0,0 +1,138 @@
+import os
+import re
+from collections import Counter, defaultdict
+from sqlalchemy import select, func, literal, literal_column, union_all, or_, cast, text
+from sqlalchemy.dialects.postgresql import TSQUERY
+from .cache import TTLCache
+from .models.camera import Camera
+from .models.film import Film
+from .models.tag import Tag
+
+# SEARCH SETTINGS (ENVIRONMENT)
+SEARCH_LIMIT = int(os.getenv("SEARCH_LIMIT", "20"))
+SEARCH_VOCABULARY_TTL = float(os.getenv("SEARCH_VOCABULARY_TTL", "300"))
+# Trigram similarity (0-1) a word needs to count as a typo of a query word
+SEARCH_FUZZY_THRESHOLD = float(os.getenv("SEARCH_FUZZY_THRESHOLD", "0.3"))
+SEARCH_FUZZY_TERMS = int(os.getenv("SEARCH_FUZZY_TERMS", "3"))
+
+# kind -> name text for pg_trgm. These must match the expression indexes created by
+# migration 0006, so they are spelled out as SQL.
+TRIGRAM_TEXTS = {
+    "cameras": "lower(cameras.brand || ' ' || cameras.model || ' ' || coalesce(cameras.lens_mount, ''))",
+    "films": "lower(films.brand || ' ' || films.name)",
+    "tags": "lower(tags.name)",
+}
+# kind -> (model, result title)
+SEARCH_TARGETS = {
+    "cameras": (Camera, Camera.brand + " " + Camera.model),
+    "films": (Film, Film.brand + " " + Film.name),
+    "tags": (Tag, Tag.name),
+}
+
+# QUERY WORDS
+# Same split as the search_vector documents: lowercase, punctuation breaks words
+def words(value):
+    return re.findall(r"[^\W_]+", value.lower())
+
+# pg_trgm's trigrams: each word padded with two spaces in front and one behind
+def trigrams(word):
+    padded = f"  {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+# VOCABULARY (TYPO CORRECTION WITHOUT pg_trgm)
+# Every distinct word of the indexed documents, with a trigram -> words index. A query word
+# that isn't in the catalog is expanded with its closest words before the full-text query,
+# so "hasselbald" also searches "hasselblad".
+class Vocabulary:
+    def __init__(self, words):
+        self.words = sorted(set(words))
+        self.known = set(self.words)
+        self.sizes = []
+        self.postings = defaultdict(list)
+        for position, word in enumerate(self.words):
+            word_trigrams = trigrams(word)
+            self.sizes.append(len(word_trigrams))
+            for trigram in word_trigrams:
+                self.postings[trigram].append(position)
+
+    # Closest words by trigram similarity (shared / union, like pg_trgm's similarity()),
+    # best first; empty for words the catalog already has
+    def corrections(self, word, limit=SEARCH_FUZZY_TERMS, threshold=SEARCH_FUZZY_THRESHOLD):
+        if word in self.known:
+            return []
+        word_trigrams = trigrams(word)
+        shared = Counter()
+        for trigram in word_trigrams:
+            shared.update(self.postings.get(trigram, ()))
+        scored = []
+        for position, count in shared.items():
+            similarity = count / (len(word_trigrams) + self.sizes[position] - count)
+            if similarity >= threshold:
+                scored.append((-similarity, self.words[position]))
+        return [word for _, word in sorted(scored)[:limit]]
+
+vocabulary_cache = TTLCache(maxsize=1, ttl=SEARCH_VOCABULARY_TTL)
+
+async def get_vocabulary(db):
+    vocabulary = vocabulary_cache.get("vocabulary")
+    if vocabulary is None:
+        documents = " UNION ALL ".join(f"SELECT search_vector FROM {kind}" for kind in SEARCH_TARGETS)
+        rows = await db.execute(select(literal_column("word")).select_from(func.ts_stat(documents)))
+        vocabulary = Vocabulary(word for word, in rows)
+        vocabulary_cache.set("vocabulary", vocabulary)
+    return vocabulary
+
+def invalidate_vocabulary():
+    vocabulary_cache.clear()
+
+# pg_trgm is optional (see migration 0006); checked once per process
+trigram_support = {}
+
+async def has_trigram(db):
+    if "pg_trgm" not in trigram_support:
+        trigram_support["pg_trgm"] = await db.scalar(text("SELECT EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm')"))
+    return trigram_support["pg_trgm"]
+
+# QUERY
+# Every query word must match, as a prefix ("hassel" finds "hasselblad") or through one of its
+# corrections; lexemes are quoted so the text is taken as-is
+def tsquery_text(terms):
+    def lexeme(word):
+        return "'" + word.replace("\\", "\\\\").replace("'", "''") + "'"
+
+    return " & ".join(
+        "(" + " | ".join([lexeme(word) + ":*"] + [lexeme(correction) for correction in corrections]) + ")"
+        for word, corrections in terms
+    )
+
+def search_query(kinds, tsquery, trigram_query=None):
+    selects = []
+    for kind in kinds:
+        model, title = SEARCH_TARGETS[kind]
+        score = func.ts_rank(model.search_vector, tsquery)
+        match = model.search_vector.op("@@")(tsquery)
+        if trigram_query is not None:
+            # pg_trgm: the query words may also be close to a part of the name
+            trigram_text = literal_column(TRIGRAM_TEXTS[kind])
+            score = score + func.word_similarity(trigram_query, trigram_text)
+            match = or_(match, literal(trigram_query).op("<%")(trigram_text))
+        selects.append(select(literal(kind).label("kind"), model.id, title.label("title"), score.label("score")).where(match))
+    return union_all(*selects).subquery()
+
+# Ranked page of {kind, id, title, score}, best first
+async def search(db, q, kinds=tuple(SEARCH_TARGETS), limit=SEARCH_LIMIT, offset=0):
+    query_words = words(q)
+    if not query_words:
+        return []
+    if await has_trigram(db):
+        terms = [(word, []) for word in query_words]
+        trigram_query = " ".join(query_words)
+    else:
+        vocabulary = await get_vocabulary(db)
+        terms = [(word, vocabulary.corrections(word)) for word in query_words]
+        trigram_query = None
+    results = search_query(kinds, cast(tsquery_text(terms), TSQUERY), trigram_query)
+    rows = await db.execute(
+        select(results).order_by(results.c.score.desc(), results.c.kind, results.c.id).limit(limit).offset(offset)
+    )
+    return [dict(row._mapping) for row in rows]
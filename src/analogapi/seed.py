@@ -1,12 +1,14 @@
 import os
 from sqlalchemy.orm import Session
 from sqlalchemy.sql import text
-from .database import get_engine, get_session, SessionLocal
-from .base import Base
+from .database import get_engine, get_session, run_migrations
 from .models.camera import Camera
 from .models.film import Film
 from .models.tag import Tag, camera_tags, film_tags 
 
+# Rows owned by the migrations, kept when clearing (catalog_version is the ETag counter's single row)
+REFERENCE_TABLES = {"formats", "format_compatibility", "catalog_version"}
+
 def seed_database(db_url=None, clear=True):
     engine = get_engine(db_url)
     SessionLocal = get_session(db_url)
@@ -15,12 +17,14 @@ def seed_database(db_url=None, clear=True):
     try:
         print("Seeding database...")
 
-        print("Creating tables if they don't exist...")
-        Base.metadata.create_all(bind=engine)
+        print("Migrating the schema to the latest revision...")
+        run_migrations(db_url)
 
         if clear:
             print("Clearing database before seeding...")
             for table in reversed(Camera.__table__.metadata.sorted_tables):
+                if table.name in REFERENCE_TABLES:
+                    continue
                 db.execute(table.delete())
             db.commit()
 
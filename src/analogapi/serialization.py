@@ -0,0 +1,72 @@
+import orjson
+from fastapi import Response
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import select, func, true
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+from .loaders import TAG_LINKS
+from .models.film import Film
+from .models.tag import Tag
+
+# FAST JSON PATH FOR LISTS
+# List pages select the response fields as plain columns, with each item's tags folded into
+# id/name arrays by one LATERAL subquery, and encode the rows with orjson: no ORM instances and
+# no per-row Pydantic models. Keys and their order follow the response schema, so bodies match
+# what the schema would produce; routes keep their response_model for the OpenAPI schema.
+
+# schema field -> model attribute, where they differ (films.iso is text; iso_value is its number)
+FIELD_ATTRIBUTES = {Film: {"iso": "iso_value"}}
+
+def tag_arrays(model):
+    link_table, link_column = TAG_LINKS[model]
+    return (
+        select(
+            func.array_agg(aggregate_order_by(Tag.id, Tag.id)).label("tag_ids"),
+            func.array_agg(aggregate_order_by(Tag.name, Tag.id)).label("tag_names"),
+        )
+        .select_from(link_table.join(Tag, Tag.id == link_table.c.tag_id))
+        .where(link_table.c[link_column] == model.id)
+        .lateral("item_tags")
+    )
+
+# Whole-table reads (exports): one GROUP BY over the links, hash-joined to the items, is about
+# 3x faster than a LATERAL lookup per item
+def tag_groups(model):
+    link_table, link_column = TAG_LINKS[model]
+    return (
+        select(
+            link_table.c[link_column].label("item_id"),
+            func.array_agg(aggregate_order_by(Tag.id, Tag.id)).label("tag_ids"),
+            func.array_agg(aggregate_order_by(Tag.name, Tag.id)).label("tag_names"),
+        )
+        .select_from(link_table.join(Tag, Tag.id == link_table.c.tag_id))
+        .group_by(link_table.c[link_column])
+        .subquery("item_tags")
+    )
+
+def item_fields(schema):
+    return [name for name in schema.model_fields if name != "tags"]
+
+# SELECT of the schema's fields plus tag_ids/tag_names, FROM the model's table
+def item_select(model, schema, grouped=False):
+    attributes = FIELD_ATTRIBUTES.get(model, {})
+    columns = [getattr(model, attributes.get(name, name)).label(name) for name in item_fields(schema)]
+    tags = tag_groups(model) if grouped else tag_arrays(model)
+    on = tags.c.item_id == model.id if grouped else true()
+    return select(*columns, tags.c.tag_ids, tags.c.tag_names).select_from(model).outerjoin(tags, on)
+
+def item_dicts(rows, schema):
+    fields = item_fields(schema)
+    items = []
+    for row in rows:
+        item = dict(zip(fields, row))
+        item["tags"] = [{"name": name, "id": tag_id} for tag_id, name in zip(row.tag_ids, row.tag_names)] if row.tag_ids else []
+        items.append(item)
+    return items
+
+def ndjson_lines(rows, schema):
+    return b"".join(orjson.dumps(item) + b"\n" for item in item_dicts(rows, schema))
+
+# Returning a Response skips FastAPI's response_model serialization, and with it the headers
+# set on the injected Response (X-Next-Cursor, ETag), so those are copied over
+def json_response(content, response: Response):
+    return ORJSONResponse(content, headers=dict(response.headers))
@@ -0,0 +1,304 @@
+import asyncio
+import math
+import os
+import numpy as np
+from scipy import sparse
+from sqlalchemy import select
+from .database import get_async_session
+from .loaders import with_tags
+from .models.camera import Camera, favorite_cameras
+from .models.film import Film, favorite_films
+from .models.tag import camera_tags, film_tags
+
+# SIMILARITY SETTINGS (ENVIRONMENT)
+SIMILAR_TOP_K = int(os.getenv("SIMILAR_TOP_K", "20"))
+SIMILARITY_BLOCK_ROWS = int(os.getenv("SIMILARITY_BLOCK_ROWS", "16"))
+# Above this share of changed rows an incremental refresh falls back to a full rebuild
+SIMILARITY_REBUILD_RATIO = float(os.getenv("SIMILARITY_REBUILD_RATIO", "0.2"))
+
+# Weight of each feature group in the item vectors
+CAMERA_FEATURE_WEIGHTS = {"tag": 1.0, "format": 2.0, "type": 1.5, "lens_mount": 2.0, "favorited_by": 0.5}
+FILM_FEATURE_WEIGHTS = {"tag": 1.0, "format": 2.0, "color": 1.5, "iso": 1.5, "grain": 1.0, "favorited_by": 0.5}
+
+UNKNOWN_VALUES = {"", "unknown", "n/a"}
+
+# FEATURES
+# Every item is a bag of "group:value" tokens; scraped "Unknown" values are left out so they
+# don't make unrelated items look alike
+def add_feature(features, weights, group, value, scale=1.0):
+    if value is None:
+        return
+    value = str(value).strip().lower()
+    if value not in UNKNOWN_VALUES:
+        features[f"{group}:{value}"] = weights[group] * scale
+
+def iso_stop(iso):
+    # Whole stops from ISO 100 (100 -> 0, 400 -> 2); None when iso isn't a number
+    try:
+        iso = float(iso)
+    except (TypeError, ValueError):
+        return None
+    return round(math.log2(iso / 100)) if iso > 0 else None
+
+def camera_features(row, weights=CAMERA_FEATURE_WEIGHTS):
+    features = {}
+    add_feature(features, weights, "format", row.format_id if row.format_id is not None else row.format)
+    add_feature(features, weights, "type", row.type)
+    add_feature(features, weights, "lens_mount", row.lens_mount)
+    return features
+
+def film_features(row, weights=FILM_FEATURE_WEIGHTS):
+    features = {}
+    add_feature(features, weights, "format", row.format_id if row.format_id is not None else row.format)
+    add_feature(features, weights, "color", row.color)
+    add_feature(features, weights, "grain", row.grain)
+    stop = iso_stop(row.iso)
+    if stop is not None:
+        # Neighbouring stops count half, so ISO 400 is closer to 200 than to 3200
+        add_feature(features, weights, "iso", stop)
+        add_feature(features, weights, "iso", stop - 1, 0.5)
+        add_feature(features, weights, "iso", stop + 1, 0.5)
+    return features
+
+# Cosine scores of the given rows against every row, as a (rows x items) array with self-matches zeroed.
+# Sparse x dense is ~3x faster than sparse x sparse here: shared format/type features make
+# the result nearly dense anyway.
+def block_scores(matrix, rows):
+    scores = np.ascontiguousarray((matrix @ matrix[rows].T.toarray()).T)
+    scores[np.arange(len(rows)), rows] = 0
+    return scores
+
+# SIMILARITY INDEX
+# Rows are L2-normalised sparse feature vectors, so a dot product is the cosine similarity.
+# Each item's top-K neighbours are computed in blocks of rows and kept as two arrays
+# (ids, scores), which makes a lookup a binary search plus a slice.
+# Writes mark items dirty; a background refresh then recomputes only the dirty rows and the
+# rows whose top-K they can enter or leave. Lookups keep answering from the previous state.
+class SimilarityIndex:
+    def __init__(self, model, columns, feature_fn, weights, link_table, favorites_table, item_column,
+                 top_k=SIMILAR_TOP_K, block_rows=SIMILARITY_BLOCK_ROWS, rebuild_ratio=SIMILARITY_REBUILD_RATIO):
+        self.model = model
+        self.columns = columns
+        self.feature_fn = feature_fn
+        self.weights = weights
+        self.link_table = link_table
+        self.favorites_table = favorites_table
+        self.item_column = item_column
+        self.top_k = top_k
+        self.block_rows = block_rows
+        self.rebuild_ratio = rebuild_ratio
+        self.vocab = {}
+        self.rows = {}
+        # (ids, matrix, neighbor_ids, neighbor_scores), swapped in one assignment
+        self.state = (np.empty(0, np.int64), None, np.empty((0, top_k), np.int64), np.empty((0, top_k), np.float32))
+        self.stale = True
+        self.dirty = set()
+        self.lock = None
+        self.task = None
+
+    def mark_changed(self, ids):
+        self.dirty.update(ids)
+
+    def mark_all(self):
+        self.stale = True
+
+    # LOADING
+    async def load(self, db, ids=None):
+        link = self.link_table.c[self.item_column]
+        favorite = self.favorites_table.c[self.item_column]
+        items = select(self.model.id, *self.columns)
+        tags = select(link, self.link_table.c.tag_id)
+        favorites = select(favorite, self.favorites_table.c.user_id)
+        if ids is not None:
+            items = items.where(self.model.id.in_(ids))
+            tags = tags.where(link.in_(ids))
+            favorites = favorites.where(favorite.in_(ids))
+
+        features = {row.id: self.feature_fn(row, self.weights) for row in await db.execute(items)}
+        for item_id, tag_id in await db.execute(tags):
+            if item_id in features:
+                add_feature(features[item_id], self.weights, "tag", tag_id)
+        for item_id, user_id in await db.execute(favorites):
+            if item_id in features:
+                add_feature(features[item_id], self.weights, "favorited_by", user_id)
+        return features
+
+    async def refresh(self, db):
+        if self.lock is None:
+            self.lock = asyncio.Lock()
+        async with self.lock:
+            if self.stale:
+                # Cleared before loading, so writes that land meanwhile trigger another refresh
+                self.stale = False
+                self.dirty = set()
+                try:
+                    features = await self.load(db)
+                    await asyncio.to_thread(self.build, features)
+                except BaseException:
+                    self.stale = True
+                    raise
+            elif self.dirty:
+                ids, self.dirty = self.dirty, set()
+                try:
+                    features = await self.load(db, ids)
+                    await asyncio.to_thread(self.update, features, ids - features.keys())
+                except BaseException:
+                    self.dirty |= ids
+                    raise
+
+    def schedule_refresh(self):
+        if self.task is None or self.task.done():
+            self.task = asyncio.get_running_loop().create_task(self.refresh_in_background())
+
+    async def refresh_in_background(self):
+        try:
+            async with get_async_session()() as db:
+                await self.refresh(db)
+        except Exception as e:
+            print(f"Similarity refresh for {self.model.__tablename__} failed: {e}")
+
+    async def wait(self):
+        if self.task is not None:
+            await asyncio.gather(self.task, return_exceptions=True)
+
+    async def shutdown(self):
+        if self.task is not None:
+            self.task.cancel()
+        await self.wait()
+
+    # MATRIX
+    def row_vector(self, features):
+        columns = np.fromiter((self.vocab.setdefault(token, len(self.vocab)) for token in features), np.int64, len(features))
+        values = np.fromiter(features.values(), np.float32, len(features))
+        norm = np.sqrt(values @ values)
+        return columns, values / norm if norm else values
+
+    def assemble(self):
+        ids = np.array(sorted(self.rows), dtype=np.int64)
+        vectors = [self.rows[item_id] for item_id in ids.tolist()]
+        indptr = np.zeros(len(ids) + 1, np.int64)
+        np.cumsum([len(columns) for columns, _ in vectors], out=indptr[1:])
+        indices = np.concatenate([columns for columns, _ in vectors]) if vectors else np.empty(0, np.int64)
+        data = np.concatenate([values for _, values in vectors]) if vectors else np.empty(0, np.float32)
+        return ids, sparse.csr_matrix((data, indices, indptr), shape=(len(ids), len(self.vocab)))
+
+    def neighbors(self, ids, matrix, rows):
+        # Top-K (by score, then id) for the given row positions, computed block by block
+        k = self.top_k
+        neighbor_ids = np.full((len(rows), k), -1, np.int64)
+        neighbor_scores = np.zeros((len(rows), k), np.float32)
+        candidates = min(k, len(ids))
+        if candidates == 0:
+            return neighbor_ids, neighbor_scores
+        for start in range(0, len(rows), self.block_rows):
+            block = rows[start:start + self.block_rows]
+            scores = block_scores(matrix, block)
+            top = np.argpartition(-scores, candidates - 1, axis=1)[:, :candidates]
+            top_scores = np.take_along_axis(scores, top, axis=1)
+            top_ids = ids[top]
+            order = np.lexsort((top_ids, -top_scores), axis=1)
+            top_ids = np.take_along_axis(top_ids, order, axis=1)
+            top_scores = np.take_along_axis(top_scores, order, axis=1)
+            top_ids[top_scores <= 0] = -1
+            neighbor_ids[start:start + len(block), :candidates] = top_ids
+            neighbor_scores[start:start + len(block), :candidates] = np.maximum(top_scores, 0)
+        return neighbor_ids, neighbor_scores
+
+    def build(self, features):
+        self.vocab = {}
+        self.rows = {item_id: self.row_vector(item_features) for item_id, item_features in features.items()}
+        ids, matrix = self.assemble()
+        self.state = (ids, matrix, *self.neighbors(ids, matrix, np.arange(len(ids))))
+
+    def update(self, features, deleted):
+        old_ids, _, old_neighbor_ids, old_neighbor_scores = self.state
+        for item_id in deleted:
+            self.rows.pop(item_id, None)
+        for item_id, item_features in features.items():
+            self.rows[item_id] = self.row_vector(item_features)
+        ids, matrix = self.assemble()
+        if len(features) + len(deleted) > self.rebuild_ratio * max(len(old_ids), 1):
+            self.state = (ids, matrix, *self.neighbors(ids, matrix, np.arange(len(ids))))
+            return
+
+        # Carry the existing neighbour lists over to the new row positions
+        neighbor_ids = np.full((len(ids), self.top_k), -1, np.int64)
+        neighbor_scores = np.zeros((len(ids), self.top_k), np.float32)
+        old_positions = np.searchsorted(old_ids, ids)
+        kept = old_positions < len(old_ids)
+        kept[kept] = old_ids[old_positions[kept]] == ids[kept]
+        neighbor_ids[kept] = old_neighbor_ids[old_positions[kept]]
+        neighbor_scores[kept] = old_neighbor_scores[old_positions[kept]]
+
+        changed = np.array(sorted(features), dtype=np.int64)
+        touched = np.concatenate([changed, np.array(sorted(deleted), dtype=np.int64)])
+        # Rows to recompute: new or changed rows, rows listing a changed/deleted item, and rows
+        # where a changed item now beats their current K-th neighbour
+        affected = ~kept | np.isin(ids, changed) | np.isin(neighbor_ids, touched).any(axis=1)
+        changed_positions = np.searchsorted(ids, changed)
+        kth_scores = neighbor_scores[:, -1]
+        for start in range(0, len(changed_positions), self.block_rows):
+            block = changed_positions[start:start + self.block_rows]
+            scores = block_scores(matrix, block)
+            affected |= (scores > kth_scores).any(axis=0)
+
+        rows = np.flatnonzero(affected)
+        neighbor_ids[rows], neighbor_scores[rows] = self.neighbors(ids, matrix, rows)
+        self.state = (ids, matrix, neighbor_ids, neighbor_scores)
+
+    # LOOKUP
+    def lookup(self, item_id, limit):
+        ids, _, neighbor_ids, neighbor_scores = self.state
+        position = np.searchsorted(ids, item_id)
+        if position == len(ids) or ids[position] != item_id:
+            return None
+        found = neighbor_ids[position] >= 0
+        return list(zip(neighbor_ids[position][found][:limit].tolist(), neighbor_scores[position][found][:limit].tolist()))
+
+    async def similar(self, db, item_id, limit):
+        # [(id, score)] best first, or None when the item doesn't exist
+        if self.state[1] is None or item_id in self.dirty:
+            # Nothing to answer from until the first build; an item that just changed is never
+            # answered from its old row
+            await self.refresh(db)
+        elif self.stale or self.dirty:
+            self.schedule_refresh()
+        neighbors = self.lookup(item_id, limit)
+        if neighbors is None:
+            # A primary-key check, so unknown ids answer 404 without a refresh; an existing item
+            # is new since the last refresh or was written behind the API's back: index it now
+            if await db.scalar(select(self.model.id).where(self.model.id == item_id)) is None:
+                return None
+            self.mark_changed([item_id])
+            await self.refresh(db)
+            neighbors = self.lookup(item_id, limit)
+        return neighbors
+
+# Loads the scored rows (with tags) in the given order, each with its score; extra criteria
+# filter the rows further
+async def load_scored(db, model, scored, *criteria):
+    if not scored:
+        return []
+    query = with_tags(select(model), model).where(model.id.in_([item_id for item_id, _ in scored]), *criteria)
+    items = {item.id: item for item in await db.scalars(query)}
+    results = []
+    for item_id, score in scored:
+        item = items.get(item_id)
+        if item is not None:
+            item.score = score
+            results.append(item)
+    return results
+
+camera_similarity = SimilarityIndex(
+    Camera, [Camera.format_id, Camera.format, Camera.type, Camera.lens_mount], camera_features,
+    CAMERA_FEATURE_WEIGHTS, camera_tags, favorite_cameras, "camera_id",
+)
+film_similarity = SimilarityIndex(
+    Film, [Film.format_id, Film.format, Film.color, Film.iso, Film.grain], film_features,
+    FILM_FEATURE_WEIGHTS, film_tags, favorite_films, "film_id",
+)
+similarity_indexes = {Camera: camera_similarity, Film: film_similarity}
+
+async def shutdown_similarity():
+    for index in similarity_indexes.values():
+        await index.shutdown()
@@ -0,0 +1,58 @@
+import os
+from sqlalchemy import or_, literal_column
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+# UPSERT SETTINGS (ENVIRONMENT)
+UPSERT_BATCH_SIZE = int(os.getenv("UPSERT_BATCH_SIZE", "500"))
+
+# BULK UPSERT
+# One INSERT ... ON CONFLICT (key) DO UPDATE per batch, committed per batch.
+# Rows whose values already match are left alone, and xmax = 0 tells fresh inserts from updates.
+# ignore: columns written on insert/update but not compared (e.g. scraped_at)
+# changed: optional list that collects the ids of inserted and updated rows
+def bulk_upsert(db: Session, model, rows, key, ignore=(), batch_size=UPSERT_BATCH_SIZE, changed=None):
+    counts = {"inserted": 0, "updated": 0, "skipped": 0}
+
+    # A statement can't touch the same row twice, so keep only the last row per key
+    unique_rows = {}
+    for row in rows:
+        unique_rows[tuple(row[column] for column in key)] = row
+    counts["skipped"] += len(rows) - len(unique_rows)
+    rows = list(unique_rows.values())
+
+    if not rows:
+        return counts
+
+    # Built once and run executemany-style: SQLAlchemy packs each batch into multi-row VALUES
+    # ("insertmanyvalues") and the compiled statement is cached across batches
+    table = model.__table__
+    stmt = insert(table)
+    update_columns = [column for column in rows[0] if column not in key]
+    compare_columns = [column for column in update_columns if column not in ignore]
+    if compare_columns:
+        stmt = stmt.on_conflict_do_update(
+            index_elements=list(key),
+            set_={column: stmt.excluded[column] for column in update_columns},
+            where=or_(*(table.c[column].is_distinct_from(stmt.excluded[column]) for column in compare_columns)),
+        )
+    else:
+        stmt = stmt.on_conflict_do_nothing(index_elements=list(key))
+    stmt = stmt.returning(table.c.id, literal_column("xmax = 0").label("inserted"))
+
+    for start in range(0, len(rows), batch_size):
+        batch = rows[start:start + batch_size]
+        try:
+            results = db.execute(stmt, batch).all()
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+
+        if changed is not None:
+            changed.extend(result.id for result in results)
+        inserted = sum(1 for result in results if result.inserted)
+        counts["inserted"] += inserted
+        counts["updated"] += len(results) - inserted
+        counts["skipped"] += len(batch) - len(results)
+    return counts
@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+from scipy import sparse
+from src.analogapi.collaborative import recommend, ranked_top
+
+# user -> favorited items
+FAVORITES = {1: [10, 20], 2: [10, 20, 30], 3: [10], 4: [40]}
+
+def pairs(favorites):
+    return zip(*[(user_id, item_id) for user_id, item_ids in favorites.items() for item_id in item_ids])
+
+def test_item_cooccurrence_scores():
+    recommendations = recommend(*pairs(FAVORITES), block_users=2)
+
+    # 10 and 20 share two of their users: 2 / sqrt(3 * 2); 10/30 share one: 1 / sqrt(3); 20/30: 1 / sqrt(2)
+    items, scores = recommendations[3]
+    assert items == [20, 30]
+    assert scores == pytest.approx([2 / np.sqrt(6), 1 / np.sqrt(3)], abs=1e-6)
+    # Scores add up over everything the user favorited; favorited items are never recommended
+    assert recommendations[1][0] == [30]
+    assert recommendations[1][1] == pytest.approx([1 / np.sqrt(3) + 1 / np.sqrt(2)], abs=1e-6)
+    # Nothing left to recommend, or no co-occurrence at all
+    assert 2 not in recommendations
+    assert 4 not in recommendations
+
+def test_top_n_and_neighbors_limits():
+    assert recommend(*pairs(FAVORITES), top_n=1)[3] == ([20], [pytest.approx(2 / np.sqrt(6), abs=1e-6)])
+    # With one neighbour per item, 10 only passes its score on to 20
+    assert recommend(*pairs(FAVORITES), neighbors=1)[3][0] == [20]
+
+def test_ranked_top_breaks_ties_by_column():
+    matrix = sparse.csr_matrix(np.array([[0.5, 0.9, 0.5, 0.0], [0.0, 0.0, 0.0, 0.0], [0.1, 0.2, 0.3, 0.4]], np.float32))
+    rows, columns, scores = ranked_top(matrix, 2)
+    assert rows.tolist() == [0, 0, 2, 2]
+    assert columns.tolist() == [1, 0, 3, 2]
+    assert scores.tolist() == pytest.approx([0.9, 0.5, 0.4, 0.3])
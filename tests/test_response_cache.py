@@ -0,0 +1,161 @@
+import asyncio
+import fnmatch
+import pytest
+from fastapi import HTTPException
+from starlette.requests import Request
+from src.analogapi.response_cache import ResponseCache, LocalBackend, RedisBackend, RedisError
+
+HEADERS = {"ETag": '"catalog-1"', "Last-Modified": "Sat, 17 Oct 2026 10:00:00 GMT", "Cache-Control": "no-cache"}
+
+def make_request(headers=None):
+    raw = [(name.lower().encode(), value.encode()) for name, value in (headers or {}).items()]
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": raw})
+
+def test_concurrent_misses_share_one_build():
+    cache = ResponseCache(LocalBackend())
+    builds = []
+
+    async def build():
+        builds.append(1)
+        await asyncio.sleep(0.01)
+        return HEADERS, b'{"id": 1}'
+
+    async def run():
+        responses = await asyncio.gather(*(cache.serve(make_request(), "cameras:1", build) for _ in range(10)))
+        assert [response.body for response in responses] == [b'{"id": 1}'] * 10
+        response = await cache.serve(make_request({"If-None-Match": HEADERS["ETag"]}), "cameras:1", build)
+        assert response.status_code == 304
+
+    asyncio.run(run())
+    assert len(builds) == 1
+    assert cache.counters["misses"] == 10 and cache.counters["coalesced"] == 9 and cache.counters["hits"] == 1
+
+def test_failed_builds_are_shared_and_not_cached():
+    cache = ResponseCache(LocalBackend())
+
+    async def build():
+        await asyncio.sleep(0.01)
+        raise HTTPException(status_code=404, detail="Camera not found")
+
+    async def run():
+        results = await asyncio.gather(*(cache.serve(make_request(), "cameras:2", build) for _ in range(3)), return_exceptions=True)
+        assert all(isinstance(result, HTTPException) and result.status_code == 404 for result in results)
+        assert await cache.backend.get_many(["cameras:2"]) == [None]
+
+    asyncio.run(run())
+    assert cache.counters["coalesced"] == 2
+
+def test_namespace_generation_and_overlapping_invalidation():
+    cache = ResponseCache(LocalBackend())
+    version = [0]
+
+    async def build():
+        version[0] += 1
+        return HEADERS, str(version[0]).encode()
+
+    async def slow_build():
+        # The catalog changes while this build runs: its result must not be stored
+        await cache.invalidate(namespaces=["films"])
+        return await build()
+
+    async def run():
+        key = "cameras:1:compatible-films"
+        assert (await cache.serve(make_request(), key, build, namespace="films")).body == b"1"
+        assert (await cache.serve(make_request(), key, build, namespace="films")).body == b"1"
+        await cache.invalidate(namespaces=["films"])
+        assert (await cache.serve(make_request(), key, slow_build, namespace="films")).body == b"2"
+        assert (await cache.serve(make_request(), key, build, namespace="films")).body == b"3"
+        assert (await cache.serve(make_request(), key, build, namespace="films")).body == b"3"
+        await cache.invalidate([key])
+        assert (await cache.serve(make_request(), key, build, namespace="films")).body == b"4"
+
+    asyncio.run(run())
+
+# A stand-in for a Redis-protocol server, enough for the backend's commands
+async def start_stand_in(store):
+    async def handle(reader, writer):
+        while True:
+            try:
+                args = await RedisBackend.read_reply(reader)
+            except asyncio.IncompleteReadError:
+                break
+            command = args[0].upper()
+            if command == b"MGET":
+                reply = [store.get(key) for key in args[1:]]
+            elif command == b"SET":
+                store[args[1]] = args[2]
+                reply = "OK"
+            elif command == b"DEL":
+                reply = sum(store.pop(key, None) is not None for key in args[1:])
+            elif command == b"SCAN":
+                pattern = args[3].decode()
+                reply = [b"0", [key for key in store if fnmatch.fnmatch(key.decode(), pattern)]]
+            else:
+                reply = RuntimeError("unknown command")
+            writer.write(encode_reply(reply))
+            await writer.drain()
+        writer.close()
+
+    return await asyncio.start_server(handle, "127.0.0.1", 0)
+
+def encode_reply(reply):
+    if reply is None:
+        return b"$-1\r\n"
+    if isinstance(reply, Exception):
+        return b"-ERR %s\r\n" % str(reply).encode()
+    if isinstance(reply, str):
+        return b"+%s\r\n" % reply.encode()
+    if isinstance(reply, int):
+        return b":%d\r\n" % reply
+    if isinstance(reply, bytes):
+        return b"$%d\r\n%s\r\n" % (len(reply), reply)
+    return b"*%d\r\n" % len(reply) + b"".join(encode_reply(item) for item in reply)
+
+def test_redis_backend_against_stand_in():
+    store = {}
+
+    async def run():
+        server = await start_stand_in(store)
+        port = server.sockets[0].getsockname()[1]
+        cache = ResponseCache(RedisBackend(f"redis://127.0.0.1:{port}/0", prefix="test:"))
+        builds = []
+
+        async def build():
+            builds.append(1)
+            return HEADERS, b'[{"id": 1}]'
+
+        for _ in range(3):
+            response = await cache.serve(make_request(), "cameras:1:compatible-films", build, namespace="films")
+            assert response.body == b'[{"id": 1}]'
+        assert len(builds) == 1
+        assert b"test:cameras:1:compatible-films" in store
+
+        await cache.invalidate(namespaces=["films"])
+        await cache.serve(make_request(), "cameras:1:compatible-films", build, namespace="films")
+        assert len(builds) == 2
+        await cache.invalidate(["cameras:1:compatible-films"])
+        assert b"test:cameras:1:compatible-films" not in store
+        await cache.clear()
+        assert store == {}
+        server.close()
+        await server.wait_closed()
+
+        # An unreachable backend is a miss, not an error
+        cache = ResponseCache(RedisBackend(f"redis://127.0.0.1:{port}"))
+        response = await cache.serve(make_request(), "cameras:1", build)
+        assert response.status_code == 200
+        assert cache.counters["errors"] >= 1
+
+    asyncio.run(run())
+
+def test_redis_backend_error_reply():
+    async def run():
+        server = await start_stand_in({})
+        port = server.sockets[0].getsockname()[1]
+        backend = RedisBackend(f"redis://127.0.0.1:{port}")
+        with pytest.raises(RedisError, match="unknown command"):
+            await backend.command("PING")
+        server.close()
+        await server.wait_closed()
+
+    asyncio.run(run())
@@ -0,0 +1,269 @@
+import asyncio
+import hashlib
+import ssl
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import lxml.html
+import pytest
+from bs4 import BeautifulSoup
+from src.analogapi.scrapers.crawler import AsyncCrawler, TokenBucket
+from src.analogapi.scrapers.http_cache import HTTPCache
+from src.analogapi.scrapers.incremental import ScrapeState
+from src.analogapi.scrapers.parsing import get_text, parse_camera_page
+from src.analogapi.scrapers.scrape_cameras import camera_wiki_crawler, scrape_cameras
+from src.analogapi.scrapers.scrape_films import film_crawler, scrape_films
+
+def camera_page(rows, text):
+    cells = "".join(f"<tr><td>{label}</td><td>{value}</td></tr>" for label, value in rows)
+    return f'<html><body><div id="mw-content-text"><table class="infobox">{cells}</table><p>{text}</p></div></body></html>'
+
+def category_page(links, next_page=None):
+    items = "".join(f'<li><a href="{href}">{name}</a></li>' for name, href in links)
+    pager = f'<a href="{next_page}">next page</a>' if next_page else ""
+    return f'<html><body><div id="mw-pages"><ul>{items}</ul></div>{pager}</body></html>'
+
+def film_table(rows):
+    header = "<tr>" + "<th>col</th>" * 9 + "</tr>"
+    body = "".join("<tr>" + "".join(f"<td>{cell}</td>" for cell in row) + "</tr>" for row in rows)
+    return f'<html><body><table class="wikitable sortable">{header}{body}</table></body></html>'
+
+# FIXTURE CAMERA-WIKI
+PAGES = {
+    "/wiki/Category:35mm_film": category_page([
+        ("Canon AE-1", "/wiki/Canon_AE-1"),
+        ("35mm film", "/wiki/35mm_film"),
+        ("Nikon D70", "/wiki/Nikon_D70"),
+        ("Pentax K1000", "/wiki/Pentax_K1000"),
+    ], next_page="/wiki/Category:35mm_film?pagefrom=Ricoh"),
+    "/wiki/Category:35mm_film?pagefrom=Ricoh": category_page([("Ricoh KR-5", "/wiki/Ricoh_KR-5")]),
+    "/wiki/Category:120_film": category_page([
+        ("Mamiya RB67", "/wiki/Mamiya_RB67"),
+        ("Hasselblad 500C/M", "/wiki/Hasselblad_500C/M"),
+    ]),
+    "/wiki/Canon_AE-1": camera_page([("Type", "SLR"), ("Lens mount", "Canon FD"), ("Years", "1976-1984")], "The Canon AE-1 is a 35mm SLR."),
+    "/wiki/Nikon_D70": camera_page([("Type", "DSLR")], "A 6 megapixel digital SLR."),
+    "/wiki/Pentax_K1000": camera_page([("Type", "SLR")], "Produced from 1976 to 1997 with the Pentax K mount."),
+    "/wiki/Ricoh_KR-5": camera_page([("Type", "SLR"), ("Lens mount", "Pentax K")], "Introduced in 1978."),
+    "/wiki/Mamiya_RB67": camera_page([("Type", "SLR"), ("Lens mount", "Mamiya RB")], "Medium format camera."),
+    "/wiki/Hasselblad_500C/M": camera_page([("Type", "SLR"), ("Lens mount", "Hasselblad V")], "Made from 1970."),
+    "/wiki/List_of_photographic_films": film_table([
+        ["Kodak", "Portra 400", "", "", "Color negative", "C-41", "400", "35mm, 120", "Fine"],
+        ['<a href="/wiki/Foma">Foma</a>', "Fomapan", "", "", "", "", "", "", ""],
+        ['<a href="/wiki/Foma">Foma</a>', "Retropan 320", "", "", "Black and white", "", "320", "Sheet film", "Medium"],
+        ["Ilford", "HP5"],
+        ['<a href="/wiki/Foma">Foma</a>', "Fomapan Action", "", "", "", "", "", "", ""],
+    ]),
+    "/wiki/Foma": "<html><head><script>var color = 1;</script></head><body><p>Foma makes black and white film in 35mm, ISO 100.</p></body></html>",
+}
+# Number of 503 responses served before the real page
+FLAKY = {"/wiki/Pentax_K1000": 1}
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.server.requests.append(self.path)
+        if self.server.flaky.get(self.path, 0) > 0:
+            self.server.flaky[self.path] -= 1
+            return self.reply(503, "busy")
+        if self.path not in PAGES:
+            return self.reply(404, "not found")
+        etag = '"' + hashlib.sha256(PAGES[self.path].encode()).hexdigest()[:16] + '"'
+        if self.headers.get("If-None-Match") == etag:
+            return self.reply(304, "", etag)
+        self.reply(200, PAGES[self.path], etag)
+
+    def reply(self, status_code, body, etag=None):
+        self.server.statuses.append(status_code)
+        data = body.encode()
+        self.send_response(status_code)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        if etag:
+            self.send_header("ETag", etag)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def wiki_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FixtureHandler)
+    server.requests = []
+    server.statuses = []
+    server.flaky = dict(FLAKY)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server, f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+def test_scrape_cameras_offline(wiki_server):
+    server, base_url = wiki_server
+    crawler = AsyncCrawler(concurrency=4, rate=100, burst=10, backoff=0.01)
+    cameras = scrape_cameras(max_cameras_per_category=3, max_categories=2, max_category_pages=2, base_url=base_url, crawler=crawler)
+
+    assert [(c["brand"], c["model"]) for c in cameras] == [
+        ("Canon", "AE-1"), ("Pentax", "K1000"), ("Ricoh", "KR-5"),
+        ("Mamiya", "RB67"), ("Hasselblad", "500C/M"),
+    ]
+    # Same result as parsing the pages directly
+    category_url = f"{base_url}/wiki/Category:35mm_film"
+    expected = parse_camera_page(PAGES["/wiki/Canon_AE-1"], "Canon AE-1", f"{base_url}/wiki/Canon_AE-1", category_url)
+    assert {k: v for k, v in cameras[0].items() if k != "content_hash"} == expected
+    assert expected["format"] == "35mm"
+    assert expected["lens_mount"] == "Canon Fd"
+    assert cameras[3]["format"] == "120"
+
+    # The flaky page was retried, non-camera pages and other categories were never requested
+    assert server.requests.count("/wiki/Pentax_K1000") == 2
+    assert "/wiki/35mm_film" not in server.requests
+    assert not any("Category:127_film" in path for path in server.requests)
+
+def test_scrape_cameras_gives_up_after_retries(wiki_server):
+    server, base_url = wiki_server
+    server.flaky["/wiki/Pentax_K1000"] = 10
+    crawler = AsyncCrawler(concurrency=4, rate=100, burst=10, retries=2, backoff=0.01)
+    cameras = scrape_cameras(max_cameras_per_category=2, max_categories=1, max_category_pages=1, base_url=base_url, crawler=crawler)
+
+    assert [(c["brand"], c["model"]) for c in cameras] == [("Canon", "AE-1")]
+    assert server.requests.count("/wiki/Pentax_K1000") == 3
+
+def test_scrape_films_offline(wiki_server):
+    server, base_url = wiki_server
+    films = scrape_films(max_films=10, base_url=base_url, crawler=AsyncCrawler(rate=100, burst=10))
+
+    assert [(f["brand"], f["name"], f["color"], f["iso"], f["format"], f["grain"]) for f in films] == [
+        ("Kodak", "Portra 400", "Color", "400", "35mm", "Fine"),
+        ("Foma", "Fomapan", "Black and White", "100", "35mm", "Unknown"),
+        ("Foma", "Retropan 320", "Black and White", "320", "Large Format", "Medium"),
+        ("Foma", "Fomapan Action", "Black and White", "100", "35mm", "Unknown"),
+    ]
+    # Two rows fall back to the same brand page, which is fetched once
+    assert server.requests.count("/wiki/Foma") == 1
+
+    films = scrape_films(max_films=1, base_url=base_url, crawler=AsyncCrawler(rate=100, burst=10))
+    assert [f["name"] for f in films] == ["Portra 400"]
+
+def test_rescrape_revalidates_from_cache(wiki_server, tmp_path):
+    server, base_url = wiki_server
+    first_run = AsyncCrawler(rate=100, burst=10, cache=HTTPCache(tmp_path))
+    films = scrape_films(max_films=10, base_url=base_url, crawler=first_run)
+    assert first_run.stats["downloaded"] == 2
+    assert first_run.stats["memo_hits"] == 0
+
+    server.statuses.clear()
+    second_run = AsyncCrawler(rate=100, burst=10, cache=HTTPCache(tmp_path))
+    assert scrape_films(max_films=10, base_url=base_url, crawler=second_run) == films
+    assert server.statuses == [304, 304]
+    assert second_run.stats == {"downloaded": 0, "not_modified": 2, "cache_hits": 0, "memo_hits": 0}
+
+    # Within the TTL nothing is requested at all
+    server.statuses.clear()
+    third_run = AsyncCrawler(rate=100, burst=10, cache=HTTPCache(tmp_path, ttl=3600))
+    third_run.cache.clear()
+    scrape_films(max_films=10, base_url=base_url, crawler=third_run)
+    fourth_run = AsyncCrawler(rate=100, burst=10, cache=HTTPCache(tmp_path, ttl=3600))
+    assert scrape_films(max_films=10, base_url=base_url, crawler=fourth_run) == films
+    assert server.statuses == [200, 200]
+    assert fourth_run.stats["cache_hits"] == 2
+
+def test_crawler_fetches_each_url_once(wiki_server):
+    server, base_url = wiki_server
+
+    async def fetch_twice():
+        async with AsyncCrawler(rate=100, burst=10) as crawler:
+            url = f"{base_url}/wiki/Canon_AE-1"
+            pages = await asyncio.gather(crawler.fetch(url), crawler.fetch(url), crawler.fetch(url))
+            return pages, crawler.stats
+
+    pages, stats = asyncio.run(fetch_twice())
+    assert pages == [PAGES["/wiki/Canon_AE-1"]] * 3
+    assert server.requests.count("/wiki/Canon_AE-1") == 1
+    assert stats["memo_hits"] == 2
+
+def test_only_camera_wiki_skips_certificate_checks():
+    async def verify_modes():
+        modes = []
+        for crawler in [film_crawler(), AsyncCrawler(), camera_wiki_crawler()]:
+            async with crawler:
+                modes.append(crawler.client._transport._pool._ssl_context.verify_mode)
+        return modes
+
+    assert asyncio.run(verify_modes()) == [ssl.CERT_REQUIRED, ssl.CERT_REQUIRED, ssl.CERT_NONE]
+
+def test_http_cache_lru_eviction(tmp_path):
+    cache = HTTPCache(tmp_path, max_bytes=250)
+    cache.store("http://a/1", {}, "a" * 100)
+    cache.store("http://a/2", {}, "b" * 100)
+    # Same body as /1: stored once, so it takes no extra space
+    cache.store("http://a/3", {}, "a" * 100)
+    assert cache.total_size() == 200
+    cache.read(cache.lookup("http://a/1"))
+    time.sleep(0.01)
+    cache.read(cache.lookup("http://a/3"))
+
+    cache.store("http://a/4", {}, "c" * 100)
+    assert cache.total_size() == 200
+    assert cache.lookup("http://a/2") is None
+    assert cache.read(cache.lookup("http://a/1")) == "a" * 100
+    assert cache.read(cache.lookup("http://a/4")) == "c" * 100
+
+def test_http_cache_drops_replaced_bodies(tmp_path):
+    cache = HTTPCache(tmp_path, max_bytes=10_000)
+    cache.store("http://a/other", {}, "o" * 1000)
+    for version in range(30):
+        cache.store("http://a/page", {}, f"{version:04d}" * 250)
+
+    # Old bodies of the re-stored page are swept before any live entry is evicted
+    objects = list((tmp_path / "objects").glob("*/*"))
+    assert cache.total_size() == sum(path.stat().st_size for path in objects) <= 10_000
+    assert len(list((tmp_path / "index").glob("*.json"))) == 2
+    assert cache.read(cache.lookup("http://a/page")) == "0029" * 250
+    assert cache.read(cache.lookup("http://a/other")) == "o" * 1000
+
+def test_incremental_scrape_skips_fresh_and_unchanged(wiki_server):
+    server, base_url = wiki_server
+    server.flaky.clear()
+    crawl = dict(max_cameras_per_category=3, max_categories=2, max_category_pages=2, base_url=base_url)
+    cameras = scrape_cameras(**crawl, crawler=AsyncCrawler(rate=100, burst=10))
+    assert all(len(camera["content_hash"]) == 64 for camera in cameras)
+
+    # AE-1 was scraped within the window, the other pages are unchanged since the last scrape
+    server.requests.clear()
+    state = ScrapeState(
+        scraped_at={f"{base_url}/wiki/Canon_AE-1": datetime.now(timezone.utc)},
+        hashes={camera["content_hash"] for camera in cameras},
+    )
+    assert scrape_cameras(**crawl, crawler=AsyncCrawler(rate=100, burst=10), state=state) == []
+    assert state.fresh == [f"{base_url}/wiki/Canon_AE-1"]
+    assert len(state.unchanged) == 4
+    assert "/wiki/Canon_AE-1" not in server.requests
+
+    films = scrape_films(max_films=10, base_url=base_url, crawler=AsyncCrawler(rate=100, burst=10))
+    server.requests.clear()
+    state = ScrapeState(hashes={film["content_hash"] for film in films[:2]})
+    changed = scrape_films(max_films=10, base_url=base_url, crawler=AsyncCrawler(rate=100, burst=10), state=state)
+    assert [film["name"] for film in changed] == ["Retropan 320", "Fomapan Action"]
+    assert len(state.unchanged) == 2
+
+def test_get_text_matches_beautifulsoup():
+    html = '<div>Canon <b>AE-1</b><!-- note --> <script>x = 1</script>\n  35mm <i> SLR </i>tail</div>'
+    soup = BeautifulSoup(html, "html.parser")
+    element = lxml.html.fromstring(html)
+    assert get_text(element) == soup.get_text()
+    assert get_text(element, strip=True) == soup.get_text(strip=True)
+
+def test_token_bucket_rate_limit():
+    async def acquire_all():
+        bucket = TokenBucket(rate=20, capacity=1)
+        start = time.monotonic()
+        for _ in range(5):
+            await bucket.acquire()
+        return time.monotonic() - start
+
+    # First token is free, the other four are spaced 1/20s apart
+    assert asyncio.run(acquire_all()) >= 0.19
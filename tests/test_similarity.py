@@ -0,0 +1,62 @@
+import random
+import numpy as np
+import pytest
+from types import SimpleNamespace
+from src.analogapi.models.camera import Camera, favorite_cameras
+from src.analogapi.models.tag import camera_tags
+from src.analogapi.similarity import SimilarityIndex, camera_features, add_feature, CAMERA_FEATURE_WEIGHTS
+
+def make_index(**kwargs):
+    return SimilarityIndex(Camera, [], camera_features, CAMERA_FEATURE_WEIGHTS, camera_tags, favorite_cameras, "camera_id", **kwargs)
+
+def random_features(rng, item_ids):
+    features = {}
+    for item_id in item_ids:
+        row = SimpleNamespace(format_id=None, format=rng.choice(["35mm", "120", "Large Format"]),
+                              type=rng.choice(["SLR", "Rangefinder", "TLR", "Unknown"]), lens_mount=f"Mount {rng.randrange(15)}")
+        item_features = camera_features(row)
+        for tag_id in rng.sample(range(30), rng.randrange(4)):
+            add_feature(item_features, CAMERA_FEATURE_WEIGHTS, "tag", tag_id)
+        for user_id in rng.sample(range(50), rng.randrange(3)):
+            add_feature(item_features, CAMERA_FEATURE_WEIGHTS, "favorited_by", user_id)
+        features[item_id] = item_features
+    return features
+
+def neighbor_scores(index):
+    ids, _, _, scores = index.state
+    return dict(zip(ids.tolist(), scores))
+
+def test_cosine_top_k():
+    index = make_index(top_k=3)
+    index.build({
+        1: {"format:35mm": 1.0, "type:slr": 1.0},
+        2: {"format:35mm": 1.0, "type:slr": 1.0},
+        3: {"format:35mm": 1.0},
+        4: {"format:120": 1.0},
+    })
+    assert index.lookup(1, 10) == [(2, pytest.approx(1.0)), (3, pytest.approx(2 ** -0.5))]
+    assert index.lookup(4, 10) == []
+    assert index.lookup(5, 10) is None
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_incremental_update_matches_full_build(seed):
+    rng = random.Random(seed)
+    features = random_features(rng, range(1, 301))
+    index = make_index(top_k=5, block_rows=7)
+    index.build(features)
+
+    for _ in range(3):
+        changed = random_features(rng, rng.sample(range(1, 331), 12))
+        deleted = set(rng.sample(sorted(features.keys() - changed.keys()), 4))
+        index.update(changed, deleted)
+        features.update(changed)
+        for item_id in deleted:
+            del features[item_id]
+
+        rebuilt = make_index(top_k=5)
+        rebuilt.build(features)
+        assert index.state[0].tolist() == rebuilt.state[0].tolist()
+        incremental, full = neighbor_scores(index), neighbor_scores(rebuilt)
+        for item_id in full:
+            # Ties can be broken by either side, so compare the scores of the top-K
+            np.testing.assert_allclose(incremental[item_id], full[item_id], rtol=1e-5, err_msg=f"item {item_id}")